@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Call Graph Digest
+
+Compresses a call graph artifact (<repo>.graph.json from generate_callgraph.py)
+into a short plain-text summary an LLM can read for a few hundred tokens,
+instead of the raw DOT file:
+
+- module dependencies: the heaviest calls between modules
+- entry points: __main__ blocks, console scripts, routes and exports
+- hubs: the highest ranked functions with their fan-in and fan-out
+- call chains: the main paths from entry points (or top-level callers) down
+
+Every part has its own size knob; a knob of 0 leaves the part out.
+
+Usage:
+  python callgraph_digest.py CALLGRAPHS_FOLDER/repo.graph.json --hubs 5 --chains 3
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+
+from callgraph_views import collapse, CALLABLE_KINDS
+
+
+DEFAULT_MODULE_EDGES = 12
+DEFAULT_ENTRY_POINTS = 8
+DEFAULT_HUBS = 8
+DEFAULT_CHAINS = 4
+DEFAULT_CHAIN_DEPTH = 5
+
+
+def _function_name(node):
+    """Return ``Class.method`` or ``function`` for a callable node."""
+    if node.get('class_name'):
+        return f"{node['class_name']}.{node['name']}"
+    return node.get('name', node['label'])
+
+
+def _pagerank(node):
+    return node.get('scores', {}).get('pagerank', 0.0)
+
+
+def _call_adjacency(graph):
+    """Return the callees of every node, as {source: {target: count}}."""
+    callees = defaultdict(dict)
+    for edge in graph['edges']:
+        if edge['kind'] == 'calls':
+            callees[edge['source']][edge['target']] = edge.get('count', 1)
+    return callees
+
+
+def module_dependencies(graph, max_edges=DEFAULT_MODULE_EDGES):
+    """Return the heaviest module-to-module call edges as 'a.py -> b.py (calls)' lines."""
+    modules = collapse(graph, 'module')
+    edges = sorted(modules['edges'], key=lambda edge: (-edge['count'], edge['source'], edge['target']))
+    return [f"{modules['nodes'][edge['source']]['file']} -> {modules['nodes'][edge['target']]['file']} ({edge['count']})"
+            for edge in edges[:max_edges]]
+
+
+def entry_point_lines(graph, max_items=DEFAULT_ENTRY_POINTS):
+    """Return the entry points stored in the artifact, highest ranked first."""
+    nodes = graph['nodes']
+    entry_points = {node_id: reason for node_id, reason in graph.get('entry_points', {}).items() if node_id in nodes}
+    ordered = sorted(entry_points, key=lambda node_id: (-_pagerank(nodes[node_id]), node_id))
+    return [f"{_function_name(nodes[node_id])} ({nodes[node_id]['file']}, {entry_points[node_id]})"
+            for node_id in ordered[:max_items]]
+
+
+def hub_lines(graph, max_items=DEFAULT_HUBS):
+    """Return the highest PageRank functions with their fan-in and fan-out."""
+    callees = _call_adjacency(graph)
+    fan_in = defaultdict(int)
+    for targets in callees.values():
+        for target in targets:
+            fan_in[target] += 1
+
+    callables = [node_id for node_id, node in graph['nodes'].items() if node['kind'] in CALLABLE_KINDS]
+    ranked = sorted(callables, key=lambda node_id: (-_pagerank(graph['nodes'][node_id]), -fan_in[node_id], node_id))
+    return [f"{_function_name(graph['nodes'][node_id])} ({graph['nodes'][node_id]['file']}) "
+            f"in={fan_in[node_id]} out={len(callees.get(node_id, {}))}"
+            for node_id in ranked[:max_items] if fan_in[node_id] or callees.get(node_id)]
+
+
+def call_chains(graph, max_chains=DEFAULT_CHAINS, max_depth=DEFAULT_CHAIN_DEPTH):
+    """
+    Return the main call chains as 'a -> b -> c' lines.
+
+    Chains start at the entry points, or at the highest ranked functions nobody
+    calls when no entry point is known. Each step follows the heaviest call to
+    a function not yet shown, preferring higher PageRank on ties.
+    """
+    nodes = graph['nodes']
+    callees = _call_adjacency(graph)
+    called = {target for targets in callees.values() for target in targets}
+
+    starts = [node_id for node_id in graph.get('entry_points', {}) if node_id in nodes]
+    if not starts:
+        starts = [node_id for node_id, node in nodes.items()
+                  if node['kind'] in CALLABLE_KINDS and node_id not in called]
+    starts.sort(key=lambda node_id: (-_pagerank(nodes[node_id]), node_id))
+
+    chains = []
+    shown = set()
+    for start in starts:
+        if len(chains) >= max_chains:
+            break
+        if start in shown or not callees.get(start):
+            continue
+        chain = [start]
+        while len(chain) < max_depth:
+            options = [target for target in callees.get(chain[-1], {}) if target not in chain and target not in shown]
+            if not options:
+                break
+            chain.append(max(options, key=lambda target: (callees[chain[-1]][target], _pagerank(nodes[target]))))
+        if len(chain) > 1:
+            shown.update(chain)
+            names = [_function_name(nodes[node_id]) for node_id in chain]
+            # Name the file of the first function; chains often start at a generic main()
+            names[0] += f" ({nodes[start]['file']})"
+            chains.append(" -> ".join(names))
+    return chains
+
+
+def build_digest(graph, module_edges=DEFAULT_MODULE_EDGES, entry_points=DEFAULT_ENTRY_POINTS,
+                 hubs=DEFAULT_HUBS, chains=DEFAULT_CHAINS, chain_depth=DEFAULT_CHAIN_DEPTH):
+    """
+    Summarize a call graph model as compact text.
+
+    Args:
+        graph: Call graph model or artifact
+        module_edges: Number of module dependency edges to list
+        entry_points: Number of entry points to list
+        hubs: Number of hub functions to list
+        chains: Number of call chains to list
+        chain_depth: Maximum number of functions per chain
+
+    Returns:
+        The digest, or an empty string if the graph has nothing to show
+    """
+    parts = [
+        ("Module dependencies (calls)", module_dependencies(graph, module_edges) if module_edges else []),
+        ("Entry points", entry_point_lines(graph, entry_points) if entry_points else []),
+        ("Hub functions", hub_lines(graph, hubs) if hubs else []),
+        ("Main call chains", call_chains(graph, chains, chain_depth) if chains else []),
+    ]
+    return "\n".join(f"{title}:\n" + "\n".join(f"- {line}" for line in lines)
+                     for title, lines in parts if lines)
+
+
+def load_digest(artifact_path, **knobs):
+    """Build the digest of a call graph artifact, or return '' if it doesn't exist."""
+    if not os.path.exists(artifact_path):
+        return ""
+    with open(artifact_path, 'r', encoding='utf-8') as f:
+        return build_digest(json.load(f), **knobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print a compact text digest of a call graph artifact')
+    parser.add_argument('artifact', help='Path to a <repo>.graph.json file')
+    parser.add_argument('--module-edges', type=int, default=DEFAULT_MODULE_EDGES)
+    parser.add_argument('--entry-points', type=int, default=DEFAULT_ENTRY_POINTS)
+    parser.add_argument('--hubs', type=int, default=DEFAULT_HUBS)
+    parser.add_argument('--chains', type=int, default=DEFAULT_CHAINS)
+    parser.add_argument('--chain-depth', type=int, default=DEFAULT_CHAIN_DEPTH)
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.artifact):
+        print(f"Error: {args.artifact} not found", file=sys.stderr)
+        return 1
+    print(load_digest(args.artifact, module_edges=args.module_edges, entry_points=args.entry_points,
+                      hubs=args.hubs, chains=args.chains, chain_depth=args.chain_depth))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
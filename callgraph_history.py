@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Call Graph History
+
+Charts how a repository's structure evolved over a range of commits without
+checking out or re-analyzing every commit. For each commit the tree is listed
+with ``git ls-tree`` and every Python file is looked up in the parse store by
+its git blob SHA, so a file is parsed once per distinct content no matter how
+many commits contain it. Blobs that were never parsed are streamed from a
+single ``git cat-file --batch`` process.
+
+The graph is not rebuilt for every commit: only the files whose blob changed
+since the previous commit are re-merged, and calls from the other files are
+re-checked only where they point at nodes that appeared or disappeared. For
+every commit the history records node/edge counts and the delta against the
+previous commit: added and removed nodes and call edges.
+
+Usage:
+  python callgraph_history.py /path/to/repo --range v1.0..HEAD --output history.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from generate_callgraph import add_file_nodes, build_module_index, resolve_call_sites
+from parse_store import load_cached, store, parse_source
+
+
+# Empty analysis for files that fail to parse, like analyze_python_file returns
+EMPTY_ANALYSIS = {'functions': [], 'classes': {}, 'function_calls': {}, 'call_sites': {}, 'imports': {},
+                  'decorators': {}, 'main_calls': [], 'exports': []}
+
+
+def _git(repo_path, *args):
+    """Run a git command in a repository and return its stdout as text."""
+    result = subprocess.run(['git', '-C', repo_path] + list(args),
+                            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def list_commits(repo_path, commit_range='HEAD', max_commits=None):
+    """
+    List the commits of a range from oldest to newest, following first parents.
+
+    Returns:
+        List of dictionaries with the commit sha, timestamp and subject
+    """
+    args = ['log', '--first-parent', '--reverse', '--format=%H%x00%ct%x00%s']
+    if max_commits:
+        # --max-count is applied before --reverse, so this keeps the newest commits
+        args.append(f'--max-count={max_commits}')
+    args.append(commit_range)
+
+    commits = []
+    for line in _git(repo_path, *args).splitlines():
+        sha, timestamp, subject = line.split('\0', 2)
+        commits.append({'sha': sha, 'timestamp': int(timestamp), 'subject': subject})
+    return commits
+
+
+def list_python_blobs(repo_path, commit):
+    """Return (path, blob sha) pairs for the Python files in a commit, sorted by path."""
+    blobs = []
+    for entry in _git(repo_path, 'ls-tree', '-r', '-z', commit).split('\0'):
+        if not entry:
+            continue
+        info, path = entry.split('\t', 1)
+        _, kind, sha = info.split()
+        if kind == 'blob' and path.endswith('.py'):
+            blobs.append((path, sha))
+    return blobs
+
+
+class BlobReader:
+    """Reads blob contents through one long-running ``git cat-file --batch`` process."""
+
+    def __init__(self, repo_path):
+        self.process = subprocess.Popen(['git', '-C', repo_path, 'cat-file', '--batch'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, sha):
+        """Return the content of a blob as bytes."""
+        self.process.stdin.write(f"{sha}\n".encode('ascii'))
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise ValueError(f"Blob not found: {sha}")
+        content = self.process.stdout.read(int(header[2]))
+        # Every object is followed by a newline
+        self.process.stdout.read(1)
+        return content
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class IncrementalGraph:
+    """
+    Node ids and call edges of a repository, updated file by file from one commit to the next.
+
+    Nodes and edges are the ones ``build_graph_from_analyses`` would produce.
+    Calls of unchanged files are re-resolved only when files are added or
+    removed, since that changes what their imports resolve to.
+    """
+
+    def __init__(self):
+        self.blobs = {}       # path -> blob sha
+        self.analyses = {}    # path -> analysis
+        self.file_node = {}   # path -> file node
+        self.file_nodes = {}  # path -> {node id: kind}
+        self.file_calls = {}  # path -> set of (caller, callee) pairs
+        self.nodes = {}       # node id -> kind
+        self.callers = {}     # callee node -> set of (caller, callee) pairs resolved to it
+        self.edges = set()
+        self.module_index = {}
+        self.functions = 0
+
+    def _set_nodes(self, path, nodes):
+        for node, kind in self.file_nodes.pop(path, {}).items():
+            del self.nodes[node]
+            self.functions -= kind in ('function', 'method')
+        if nodes is not None:
+            self.file_nodes[path] = nodes
+            self.nodes.update(nodes)
+            self.functions += sum(kind in ('function', 'method') for kind in nodes.values())
+
+    def _set_calls(self, path, calls):
+        for pair in self.file_calls.pop(path, set()):
+            self.callers[pair[1]].discard(pair)
+        if calls is not None:
+            self.file_calls[path] = calls
+            for pair in calls:
+                self.callers.setdefault(pair[1], set()).add(pair)
+
+    def update(self, files):
+        """
+        Move to the files of the next commit.
+
+        Args:
+            files: List of (path, blob sha, analysis) triples
+
+        Returns:
+            Sets of added nodes, removed nodes, added call edges and removed call edges
+        """
+        current = {path: (sha, analysis) for path, sha, analysis in files}
+        removed = [path for path in self.blobs if path not in current]
+        changed = [path for path, (sha, _) in current.items() if self.blobs.get(path) != sha]
+        paths_changed = removed or any(path not in self.blobs for path in current)
+
+        old_nodes = set()
+        new_nodes = set()
+        for path in removed:
+            old_nodes.update(self.file_nodes[path])
+            self._set_nodes(path, None)
+            del self.blobs[path], self.analyses[path], self.file_node[path]
+        for path in changed:
+            sha, analysis = current[path]
+            old_nodes.update(self.file_nodes.get(path, ()))
+            scratch = {'nodes': {}, 'edges': []}
+            self.file_node[path] = add_file_nodes(scratch, path, analysis)
+            nodes = {node: info['kind'] for node, info in scratch['nodes'].items()}
+            self._set_nodes(path, nodes)
+            new_nodes.update(nodes)
+            self.blobs[path] = sha
+            self.analyses[path] = analysis
+        added_nodes = new_nodes - old_nodes
+        removed_nodes = old_nodes - new_nodes
+
+        if paths_changed:
+            # The set of files changed, and with it what imports resolve to
+            self.module_index = build_module_index(self.file_node.values())
+            resolve = list(current)
+        else:
+            resolve = changed
+
+        # Calls whose edge may have appeared or disappeared
+        touched = set()
+        for path in removed:
+            touched.update(self.file_calls.get(path, ()))
+            self._set_calls(path, None)
+        for path in resolve:
+            touched.update(self.file_calls.get(path, ()))
+            calls = {(caller, callee) for caller, callee, _ in
+                     resolve_call_sites(self.file_node[path], self.analyses[path], self.module_index)}
+            self._set_calls(path, calls)
+            touched.update(calls)
+        for node in added_nodes | removed_nodes:
+            touched.update(self.callers.get(node, ()))
+
+        before = touched & self.edges
+        after = {pair for pair in touched if pair[1] in self.nodes and pair in self.callers.get(pair[1], ())}
+        self.edges -= before
+        self.edges |= after
+        return added_nodes, removed_nodes, after - before, before - after
+
+
+def analyze_history(repo_path, commit_range='HEAD', max_commits=None):
+    """
+    Build the call graph of every commit in a range and record how it changed.
+
+    Args:
+        repo_path: Path to a git repository (a full clone, not a shallow one)
+        commit_range: Anything ``git log`` accepts, e.g. 'v1.0..HEAD'
+        max_commits: Only analyze the newest N commits of the range
+
+    Returns:
+        Dictionary with per-commit counts and deltas, and blob statistics
+    """
+    repo_name = os.path.basename(os.path.abspath(repo_path))
+    commits = list_commits(repo_path, commit_range, max_commits)
+    reader = BlobReader(repo_path)
+    analyses = {}
+    parsed_blobs = 0
+
+    history = []
+    graph = IncrementalGraph()
+    try:
+        for i, commit in enumerate(commits):
+            files = []
+            for path, sha in list_python_blobs(repo_path, commit['sha']):
+                if sha not in analyses:
+                    parsed = load_cached(sha)
+                    if parsed is None:
+                        parsed = parse_source(reader.read(sha).decode('utf-8', errors='replace'))
+                        parsed['blob'] = sha
+                        store(sha, parsed)
+                        parsed_blobs += 1
+                    analyses[sha] = EMPTY_ANALYSIS if parsed['error'] else parsed['callgraph']
+                files.append((path, sha, analyses[sha]))
+
+            added_nodes, removed_nodes, added_edges, removed_edges = graph.update(files)
+
+            entry = dict(commit,
+                         files=len(files),
+                         functions=graph.functions,
+                         nodes=len(graph.nodes),
+                         edges=len(graph.edges))
+            if i == 0:
+                # The first commit is the baseline; listing every node as added says nothing
+                entry['baseline'] = True
+            else:
+                entry['added_nodes'] = sorted(added_nodes)
+                entry['removed_nodes'] = sorted(removed_nodes)
+                entry['added_edges'] = sorted(added_edges)
+                entry['removed_edges'] = sorted(removed_edges)
+            history.append(entry)
+
+            print(f"[{i + 1}/{len(commits)}] {commit['sha'][:8]}: {entry['nodes']} nodes, {entry['edges']} call edges",
+                  file=sys.stderr)
+    finally:
+        reader.close()
+
+    return {
+        'repository': repo_name,
+        'range': commit_range,
+        'commits': history,
+        'distinct_blobs': len(analyses),
+        'parsed_blobs': parsed_blobs
+    }
+
+
+def save_history(history, output_file):
+    """Write a history to a JSON file."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chart the call graph of a repository across its history')
+    parser.add_argument('repo_path', help='Path to a git repository')
+    parser.add_argument('--range', default='HEAD', help='Commit range, as accepted by git log (default: HEAD)')
+    parser.add_argument('--max-commits', type=int, help='Only analyze the newest N commits of the range')
+    parser.add_argument('--output', help='Path of the history JSON file (default: print to stdout)')
+
+    args = parser.parse_args()
+
+    try:
+        history = analyze_history(args.repo_path, args.range, args.max_commits)
+    except subprocess.CalledProcessError as e:
+        print(f"Error reading git history: {e.stderr.decode(errors='replace')}", file=sys.stderr)
+        return 1
+
+    print(f"Analyzed {len(history['commits'])} commits: {history['distinct_blobs']} distinct Python blobs, "
+          f"{history['parsed_blobs']} parsed", file=sys.stderr)
+    if args.output:
+        save_history(history, args.output)
+        print(f"History saved to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(history, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
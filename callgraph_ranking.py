@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Call Graph Ranking
+
+Scores the functions and methods of a call graph model so prompt builders and
+UI views can pick the most important ones. Three scores are computed:
+
+- pagerank: importance propagated along weighted call edges
+- in_degree: number of call sites that reach a function
+- betweenness: how often a function lies on shortest call chains, estimated
+  from a sample of source functions
+
+Everything runs on NumPy edge arrays (a sparse adjacency matrix in COO/CSR form)
+so ranking stays well under a second for graphs with 100k nodes. Results are
+stored as score lists sorted from highest to lowest, so taking the top-k is a
+slice.
+"""
+
+import numpy as np
+
+
+# Node kinds that get ranked
+RANKED_KINDS = ('function', 'method')
+
+DEFAULT_DAMPING = 0.85
+DEFAULT_TOLERANCE = 1e-8
+DEFAULT_MAX_ITERATIONS = 100
+
+# Number of source nodes sampled for the betweenness estimate
+DEFAULT_BETWEENNESS_SAMPLES = 16
+
+
+def graph_to_arrays(graph):
+    """
+    Convert the call edges of a graph model to NumPy arrays.
+
+    Returns:
+        Tuple of (node_ids, sources, targets, weights) where sources/targets are
+        indices into node_ids and weights are call site counts
+    """
+    node_ids = [node_id for node_id, node in graph['nodes'].items() if node['kind'] in RANKED_KINDS]
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    sources, targets, weights = [], [], []
+    for edge in graph['edges']:
+        if edge['kind'] != 'calls':
+            continue
+        source = index.get(edge['source'])
+        target = index.get(edge['target'])
+        if source is None or target is None:
+            continue
+        sources.append(source)
+        targets.append(target)
+        weights.append(edge.get('count', 1))
+
+    return (node_ids,
+            np.asarray(sources, dtype=np.int64),
+            np.asarray(targets, dtype=np.int64),
+            np.asarray(weights, dtype=np.float64))
+
+
+def pagerank(n, sources, targets, weights, damping=DEFAULT_DAMPING,
+             tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS):
+    """
+    Compute weighted PageRank by power iteration over the edge arrays.
+
+    Each iteration is one sparse matrix-vector product done with ``np.bincount``.
+    Rank held by functions that call nothing is spread evenly over all nodes.
+    """
+    if n == 0:
+        return np.zeros(0)
+
+    out_weight = np.bincount(sources, weights=weights, minlength=n)
+    edge_share = weights / out_weight[sources]
+    dangling = out_weight == 0
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        incoming = np.bincount(targets, weights=edge_share * rank[sources], minlength=n)
+        new_rank = (1.0 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+        converged = np.abs(new_rank - rank).sum() < tolerance
+        rank = new_rank
+        if converged:
+            break
+
+    return rank
+
+
+def in_degree(n, targets, weights):
+    """Count the incoming call sites of every node."""
+    return np.bincount(targets, weights=weights, minlength=n)
+
+
+def _to_csr(n, sources, targets):
+    """Build CSR row pointers and column indices for the unweighted adjacency matrix."""
+    order = np.argsort(sources, kind='stable')
+    indices = targets[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return indptr, indices
+
+
+def _expand_frontier(indptr, indices, frontier):
+    """Return (edge_sources, edge_targets) for every edge leaving the frontier."""
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = counts.sum()
+    if total == 0:
+        return frontier[:0], frontier[:0]
+
+    # Position of every edge inside its row, added to the row start
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    edge_positions = np.repeat(starts, counts) + offsets
+    return np.repeat(frontier, counts), indices[edge_positions]
+
+
+def betweenness(n, sources, targets, samples=DEFAULT_BETWEENNESS_SAMPLES, seed=0):
+    """
+    Estimate betweenness centrality with Brandes' algorithm from sampled sources.
+
+    Shortest paths ignore call counts. Every breadth-first search expands one
+    whole level at a time with array operations, and the dependency
+    accumulation walks the levels backwards the same way. Only functions that
+    call something are sampled as sources, since the others reach nothing.
+    """
+    scores = np.zeros(n)
+    if n == 0 or len(sources) == 0:
+        return scores
+
+    indptr, indices = _to_csr(n, sources, targets)
+    candidates = np.flatnonzero(np.diff(indptr))
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(candidates, size=min(samples, len(candidates)), replace=False)
+
+    for source in picked:
+        distance = np.full(n, -1, dtype=np.int64)
+        sigma = np.zeros(n)
+        distance[source] = 0
+        sigma[source] = 1.0
+
+        frontier = np.array([source], dtype=np.int64)
+        levels = []
+        depth = 0
+        while len(frontier):
+            edge_sources, edge_targets = _expand_frontier(indptr, indices, frontier)
+            unseen = distance[edge_targets] == -1
+            distance[edge_targets[unseen]] = depth + 1
+
+            # Edges that lie on a shortest path into the next level
+            on_path = distance[edge_targets] == depth + 1
+            edge_sources, edge_targets = edge_sources[on_path], edge_targets[on_path]
+            sigma += np.bincount(edge_targets, weights=sigma[edge_sources], minlength=n)
+            levels.append((edge_sources, edge_targets))
+
+            # The nodes reached at this level, without sorting the edge targets
+            frontier = np.flatnonzero(distance == depth + 1)
+            depth += 1
+
+        delta = np.zeros(n)
+        for edge_sources, edge_targets in reversed(levels):
+            delta += np.bincount(edge_sources, minlength=n,
+                                 weights=sigma[edge_sources] / sigma[edge_targets] * (1.0 + delta[edge_targets]))
+        delta[source] = 0.0
+        scores += delta
+
+    # Scale the sample up to the number of possible sources
+    return scores * (len(candidates) / len(picked))
+
+
+def rank_graph(graph, betweenness_samples=DEFAULT_BETWEENNESS_SAMPLES):
+    """
+    Rank the functions and methods of a call graph model.
+
+    Scores are written into each ranked node under ``scores`` and returned as
+    lists of [node_id, score] pairs sorted from highest to lowest score.
+
+    Returns:
+        Dictionary mapping 'pagerank', 'in_degree' and 'betweenness' to sorted lists
+    """
+    node_ids, sources, targets, weights = graph_to_arrays(graph)
+    n = len(node_ids)
+
+    all_scores = {
+        'pagerank': pagerank(n, sources, targets, weights),
+        'in_degree': in_degree(n, targets, weights),
+        'betweenness': betweenness(n, sources, targets, betweenness_samples),
+    }
+
+    rankings = {}
+    for name, scores in all_scores.items():
+        for node_id, score in zip(node_ids, scores.tolist()):
+            graph['nodes'][node_id].setdefault('scores', {})[name] = score
+        # Stable sort so equal scores keep the graph's node order
+        order = np.argsort(-scores, kind='stable')
+        rankings[name] = [[node_ids[i], float(scores[i])] for i in order]
+
+    return rankings
+
+
+def top_k(rankings, k, score='pagerank'):
+    """Return the k highest ranked node ids for a score."""
+    return [node_id for node_id, _ in rankings.get(score, [])[:k]]
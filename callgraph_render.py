@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Call Graph Rendering
+
+Renders call graph DOT files to images with Graphviz. Rendered images are cached
+by a hash of the DOT content, the layout engine and the output format, so an
+unchanged call graph is never laid out twice. The "Generated on" timestamp of
+the graph label is left out of both the hash and the rendered image, so a cached
+image never shows the date of an earlier run. Cached images expire after a TTL,
+and the least recently used ones are removed beyond a size cap. Several files or
+formats can be rendered concurrently in a bounded worker pool, each with its own
+timeout.
+
+Large graphs are laid out with ``sfdp`` instead of ``dot``: ``dot`` does a
+hierarchical layout that gets very slow past a few thousand nodes, while
+``sfdp`` is a force-directed layout that scales to much larger graphs.
+"""
+
+import os
+import re
+import sys
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Switch from dot to sfdp above this many nodes when the engine is 'auto'
+SFDP_NODE_THRESHOLD = 1000
+
+# Seconds a single Graphviz call may take before it is killed
+DEFAULT_RENDER_TIMEOUT = 120
+
+# Number of Graphviz processes run at the same time
+DEFAULT_RENDER_WORKERS = 4
+
+# Node declarations look like:  "node id" [label=...]
+NODE_LINE = re.compile(r'^\s*"[^"]*"\s*\[', re.MULTILINE)
+
+# The graph label carries a timestamp that changes on every run
+TIMESTAMP = re.compile(r'(\\n)?Generated on [0-9: -]+')
+
+# Cached images expire after this many seconds, and at most this many are kept per cache directory
+DEFAULT_RENDER_CACHE_TTL = int(os.getenv("RENDER_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", 500))
+
+
+def count_dot_nodes(dot_content):
+    """Count the node declarations in a DOT file written by generate_callgraph."""
+    return len(NODE_LINE.findall(dot_content))
+
+
+def choose_engine(dot_content, engine='auto'):
+    """Pick the Graphviz layout engine for a DOT file."""
+    if engine != 'auto':
+        return engine
+    return 'sfdp' if count_dot_nodes(dot_content) > SFDP_NODE_THRESHOLD else 'dot'
+
+
+def strip_timestamp(dot_content):
+    """Remove the "Generated on" timestamp from the graph label."""
+    return TIMESTAMP.sub('', dot_content)
+
+
+def render_cache_key(dot_content, engine, fmt):
+    """Hash the DOT content as rendered (without its timestamp), the engine and the format."""
+    digest = hashlib.sha256()
+    digest.update(f"{engine}\0{fmt}\0".encode('utf-8'))
+    digest.update(strip_timestamp(dot_content).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def prune_render_cache(cache_dir, ttl=DEFAULT_RENDER_CACHE_TTL, max_entries=DEFAULT_RENDER_CACHE_MAX_ENTRIES):
+    """Delete expired cached images, then the least recently used ones beyond the cap."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.partial'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            # Removed by a concurrent prune
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - ttl
+    for i, (mtime, path) in enumerate(entries):
+        if i >= max_entries or mtime < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def render_dot(dot_file, fmt, engine='auto', timeout=DEFAULT_RENDER_TIMEOUT, cache_dir=None):
+    """
+    Render a DOT file to an image next to it, reusing a cached image when possible.
+
+    Args:
+        dot_file: Path to the DOT file
+        fmt: Output format ('png' or 'svg')
+        engine: Graphviz layout engine, or 'auto' to pick one by graph size
+        timeout: Seconds before the Graphviz process is killed
+        cache_dir: Directory for cached images (defaults to .render_cache next to the DOT file)
+
+    Returns:
+        Dictionary with the output image path, the engine used and whether the cache was hit
+    """
+    with open(dot_file, 'r', encoding='utf-8') as f:
+        dot_content = f.read()
+
+    engine = choose_engine(dot_content, engine)
+    output_image = os.path.splitext(dot_file)[0] + f".{fmt}"
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(dot_file)), '.render_cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    cached_image = os.path.join(cache_dir, f"{render_cache_key(dot_content, engine, fmt)}.{fmt}")
+
+    if os.path.exists(cached_image):
+        shutil.copyfile(cached_image, output_image)
+        try:
+            # Mark it recently used for pruning
+            os.utime(cached_image)
+        except OSError:
+            pass
+        return {'image': output_image, 'engine': engine, 'cached': True}
+
+    # Render to a temporary name so a killed process never leaves a partial cache entry
+    partial_image = f"{cached_image}.{threading.get_ident()}.partial"
+    try:
+        # Render the content the cache key was computed from, read from stdin
+        subprocess.run([engine, f'-T{fmt}', '-o', partial_image], input=strip_timestamp(dot_content).encode('utf-8'),
+                       check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        os.replace(partial_image, cached_image)
+    finally:
+        if os.path.exists(partial_image):
+            os.remove(partial_image)
+    shutil.copyfile(cached_image, output_image)
+    prune_render_cache(cache_dir)
+    return {'image': output_image, 'engine': engine, 'cached': False}
+
+
+def render_many(jobs, engine='auto', timeout=DEFAULT_RENDER_TIMEOUT, max_workers=DEFAULT_RENDER_WORKERS):
+    """
+    Render several (dot_file, format) pairs concurrently.
+
+    Failures are reported per job instead of aborting the whole batch.
+
+    Returns:
+        List of result dictionaries in the order the jobs were given
+    """
+    results = [None] * len(jobs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(render_dot, dot_file, fmt, engine, timeout): i
+            for i, (dot_file, fmt) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            dot_file, fmt = jobs[i]
+            try:
+                result = future.result()
+                result['success'] = True
+                status = "cached" if result['cached'] else f"rendered with {result['engine']}"
+                print(f"Generated {fmt.upper()} file: {result['image']} ({status})")
+            except subprocess.TimeoutExpired:
+                result = {'success': False, 'error': f"Rendering timed out after {timeout}s"}
+                print(f"Warning: Rendering {dot_file} to {fmt.upper()} timed out after {timeout}s", file=sys.stderr)
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                result = {'success': False, 'error': "Graphviz failed"}
+                print(f"Warning: Failed to convert DOT to {fmt.upper()}. Is Graphviz installed?", file=sys.stderr)
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+                print(f"Error converting to {fmt.upper()}: {e}", file=sys.stderr)
+            result['dot_file'] = dot_file
+            result['format'] = fmt
+            results[i] = result
+
+    return results
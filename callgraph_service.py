@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Call Graph Service
+
+Serves bounded JSON subgraphs from the call graph artifact that
+generate_callgraph.py writes next to each DOT file (<repo>.graph.json), so the
+UI can explore graphs with tens of thousands of nodes without downloading them:
+
+- clusters: paginated module summaries (size, top functions, dependencies)
+- cluster: the paginated members of one module with their edges
+- neighborhood: the N-hop call neighborhood of a function
+- path: the shortest call chain between two functions
+
+Indexes and cluster summaries are built once per artifact and kept in memory
+for the most recently used artifacts, and every response is capped in nodes and
+edges regardless of repository size.
+
+Usage:
+  python callgraph_service.py CALLGRAPHS_FOLDER/repo.graph.json clusters --page 1
+  python callgraph_service.py CALLGRAPHS_FOLDER/repo.graph.json neighborhood --node "pkg.mod->func" --hops 2
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict, defaultdict, deque
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_NEIGHBORHOOD_NODES = 500
+MAX_RESPONSE_EDGES = 2000
+MAX_HOPS = 5
+
+# Path searches give up after visiting this many nodes
+MAX_PATH_VISITS = 100000
+
+# Number of functions and of dependencies listed in each cluster summary
+CLUSTER_TOP_FUNCTIONS = 5
+CLUSTER_TOP_DEPENDENCIES = 10
+
+# Indexed graphs kept in memory; the least recently used is dropped beyond this
+MAX_CACHED_SERVICES = int(os.environ.get("CALLGRAPH_SERVICE_CACHE_SIZE", 8))
+
+
+class CallGraphService:
+    """Query layer over one call graph artifact."""
+
+    def __init__(self, artifact_path):
+        """
+        Load a call graph artifact and build its indexes.
+
+        Args:
+            artifact_path: Path to a <repo>.graph.json file
+        """
+        with open(artifact_path, 'r', encoding='utf-8') as f:
+            graph = json.load(f)
+
+        self.name = graph.get('name', '')
+        self.nodes = graph['nodes']
+        self.callees = defaultdict(dict)
+        self.callers = defaultdict(dict)
+        self.members = defaultdict(list)
+
+        for node_id, node in self.nodes.items():
+            self.members[node['module']].append(node_id)
+
+        for edge in graph['edges']:
+            if edge['kind'] == 'calls':
+                count = edge.get('count', 1)
+                self.callees[edge['source']][edge['target']] = count
+                self.callers[edge['target']][edge['source']] = count
+
+        self.cluster_summaries = self._summarize_clusters()
+        self.cluster_order = sorted(self.cluster_summaries,
+                                    key=lambda module: (-self.cluster_summaries[module]['pagerank'], module))
+
+    def _pagerank(self, node_id):
+        """Return the PageRank score of a node (0 for containers)."""
+        return self.nodes[node_id].get('scores', {}).get('pagerank', 0.0)
+
+    def _summarize_clusters(self):
+        """Build the module-level summaries the client starts from."""
+        summaries = {}
+        for module, member_ids in self.members.items():
+            callables = [node_id for node_id in member_ids
+                         if self.nodes[node_id]['kind'] in ('function', 'method')]
+            dependencies = defaultdict(int)
+            internal_calls = 0
+            for node_id in callables:
+                for target, count in self.callees[node_id].items():
+                    target_module = self.nodes[target]['module']
+                    if target_module == module:
+                        internal_calls += count
+                    else:
+                        dependencies[target_module] += count
+
+            top_functions = sorted(callables, key=lambda node_id: -self._pagerank(node_id))[:CLUSTER_TOP_FUNCTIONS]
+            first = self.nodes[member_ids[0]]
+            summaries[module] = {
+                'id': module,
+                'file': first['file'],
+                'package': first['package'],
+                'size': len(member_ids),
+                'functions': len(callables),
+                'internal_calls': internal_calls,
+                'pagerank': sum(self._pagerank(node_id) for node_id in callables),
+                'top_functions': [self._node_payload(node_id) for node_id in top_functions],
+                # The most called modules; dependency_count tells how many there are in all
+                'dependencies': [{'module': target, 'count': count}
+                                 for target, count in sorted(dependencies.items(),
+                                                             key=lambda item: (-item[1], item[0]))[:CLUSTER_TOP_DEPENDENCIES]],
+                'dependency_count': len(dependencies)
+            }
+        return summaries
+
+    def _node_payload(self, node_id):
+        """Return the JSON form of a node, with its call degrees."""
+        node = self.nodes[node_id]
+        return {
+            'id': node_id,
+            'label': node['label'],
+            'kind': node['kind'],
+            'module': node['module'],
+            'file': node['file'],
+            'pagerank': node.get('scores', {}).get('pagerank'),
+            'fan_in': len(self.callers.get(node_id, ())),
+            'fan_out': len(self.callees.get(node_id, ())),
+            # Lets the client know whether expanding this node can show anything new
+            'expandable': bool(self.callers.get(node_id) or self.callees.get(node_id))
+        }
+
+    def _edges_between(self, node_ids):
+        """Return the call edges among a set of nodes, capped in number."""
+        edges = []
+        for source in node_ids:
+            for target, count in self.callees.get(source, {}).items():
+                if target in node_ids:
+                    edges.append({'source': source, 'target': target, 'count': count})
+                    if len(edges) >= MAX_RESPONSE_EDGES:
+                        return edges, True
+        return edges, False
+
+    def _require_node(self, node_id):
+        """Raise KeyError with a readable message for unknown nodes."""
+        if node_id not in self.nodes:
+            raise KeyError(f"Unknown node: {node_id}")
+
+    @staticmethod
+    def _page_bounds(page, page_size):
+        """Clamp pagination arguments and return (page, page_size, start)."""
+        page = max(1, int(page))
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        return page, page_size, (page - 1) * page_size
+
+    def clusters(self, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """Return a page of module summaries, most important modules first."""
+        page, page_size, start = self._page_bounds(page, page_size)
+        modules = self.cluster_order[start:start + page_size]
+        return {
+            'repository': self.name,
+            'page': page,
+            'page_size': page_size,
+            'total': len(self.cluster_order),
+            'clusters': [self.cluster_summaries[module] for module in modules]
+        }
+
+    def cluster(self, module, page=1, page_size=DEFAULT_PAGE_SIZE):
+        """Return a page of the members of one module, with the calls among them."""
+        if module not in self.members:
+            raise KeyError(f"Unknown module: {module}")
+
+        page, page_size, start = self._page_bounds(page, page_size)
+        member_ids = self.members[module][start:start + page_size]
+        edges, truncated = self._edges_between(set(member_ids))
+        return {
+            'module': module,
+            'summary': self.cluster_summaries[module],
+            'page': page,
+            'page_size': page_size,
+            'total': len(self.members[module]),
+            'nodes': [self._node_payload(node_id) for node_id in member_ids],
+            'edges': edges,
+            'edges_truncated': truncated
+        }
+
+    def neighborhood(self, node_id, hops=1, direction='both', limit=MAX_NEIGHBORHOOD_NODES):
+        """
+        Return the nodes within ``hops`` calls of a node.
+
+        Args:
+            node_id: Center node
+            hops: Number of call hops to follow (capped at MAX_HOPS)
+            direction: 'callees', 'callers' or 'both'
+            limit: Maximum number of nodes returned (capped at MAX_NEIGHBORHOOD_NODES)
+        """
+        self._require_node(node_id)
+        hops = max(0, min(int(hops), MAX_HOPS))
+        limit = max(1, min(int(limit), MAX_NEIGHBORHOOD_NODES))
+
+        distance = {node_id: 0}
+        queue = deque([node_id])
+        truncated = False
+        while queue and not truncated:
+            current = queue.popleft()
+            if distance[current] >= hops:
+                continue
+            neighbors = []
+            if direction in ('callees', 'both'):
+                neighbors.extend(self.callees.get(current, {}))
+            if direction in ('callers', 'both'):
+                neighbors.extend(self.callers.get(current, {}))
+            for neighbor in neighbors:
+                if neighbor in distance:
+                    continue
+                if len(distance) >= limit:
+                    truncated = True
+                    break
+                distance[neighbor] = distance[current] + 1
+                queue.append(neighbor)
+
+        edges, edges_truncated = self._edges_between(set(distance))
+        return {
+            'center': node_id,
+            'hops': hops,
+            'direction': direction,
+            'nodes': [dict(self._node_payload(other), distance=hop) for other, hop in distance.items()],
+            'edges': edges,
+            'truncated': truncated or edges_truncated
+        }
+
+    def path(self, source, target, max_depth=20):
+        """
+        Return the shortest call chain from ``source`` to ``target``, if any.
+
+        When no chain is found, ``truncated`` tells whether the search gave up
+        (visit or depth limit reached) rather than proving there is none.
+        """
+        self._require_node(source)
+        self._require_node(target)
+
+        parents = {source: None}
+        queue = deque([(source, 0)])
+        truncated = False
+        while queue:
+            if len(parents) >= MAX_PATH_VISITS:
+                truncated = True
+                break
+            current, depth = queue.popleft()
+            if current == target:
+                break
+            if depth >= max_depth:
+                truncated = truncated or any(callee not in parents for callee in self.callees.get(current, {}))
+                continue
+            for callee in self.callees.get(current, {}):
+                if callee not in parents:
+                    parents[callee] = current
+                    queue.append((callee, depth + 1))
+
+        if target not in parents:
+            return {'source': source, 'target': target, 'found': False, 'truncated': truncated,
+                    'nodes': [], 'edges': []}
+
+        chain = []
+        current = target
+        while current is not None:
+            chain.append(current)
+            current = parents[current]
+        chain.reverse()
+
+        return {
+            'source': source,
+            'target': target,
+            'found': True,
+            'truncated': False,
+            'nodes': [self._node_payload(node_id) for node_id in chain],
+            'edges': [{'source': a, 'target': b, 'count': self.callees[a][b]} for a, b in zip(chain, chain[1:])]
+        }
+
+
+# Loaded services keyed by artifact path, least recently used first, reloaded when the artifact changes
+_services = OrderedDict()
+_services_lock = threading.Lock()
+
+
+def get_service(artifact_path):
+    """Return a cached service for an artifact, rebuilding it if the file changed."""
+    mtime = os.path.getmtime(artifact_path)
+    with _services_lock:
+        cached = _services.get(artifact_path)
+        if cached and cached[0] == mtime:
+            _services.move_to_end(artifact_path)
+            return cached[1]
+        # Don't hold on to the outdated graph while the new one is built
+        _services.pop(artifact_path, None)
+
+    # Built outside the lock, so queries on other artifacts aren't held up
+    service = CallGraphService(artifact_path)
+    with _services_lock:
+        cached = _services.get(artifact_path)
+        # Another request may have built a newer version meanwhile
+        if cached is None or cached[0] <= mtime:
+            _services[artifact_path] = (mtime, service)
+            _services.move_to_end(artifact_path)
+        while len(_services) > MAX_CACHED_SERVICES:
+            _services.popitem(last=False)
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query a call graph artifact and print JSON')
+    parser.add_argument('artifact', help='Path to a <repo>.graph.json file')
+    parser.add_argument('query', choices=['clusters', 'cluster', 'neighborhood', 'path'])
+    parser.add_argument('--module', help='Module to list for the cluster query')
+    parser.add_argument('--node', help='Center node for the neighborhood query')
+    parser.add_argument('--hops', type=int, default=1)
+    parser.add_argument('--direction', choices=['callees', 'callers', 'both'], default='both')
+    parser.add_argument('--source', help='Start node for the path query')
+    parser.add_argument('--target', help='End node for the path query')
+    parser.add_argument('--page', type=int, default=1)
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+
+    args = parser.parse_args()
+
+    try:
+        service = get_service(args.artifact)
+        if args.query == 'clusters':
+            result = service.clusters(args.page, args.page_size)
+        elif args.query == 'cluster':
+            result = service.cluster(args.module, args.page, args.page_size)
+        elif args.query == 'neighborhood':
+            result = service.neighborhood(args.node, args.hops, args.direction)
+        else:
+            result = service.path(args.source, args.target)
+    except (OSError, KeyError) as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
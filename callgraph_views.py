@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Call Graph Views
+
+Reduces the call graph model built by generate_callgraph.py to something Graphviz
+can lay out quickly on large repositories. Views can be combined:
+
+- collapse: merge functions, classes and files into module or package nodes
+- top_k: keep only the k highest scoring nodes (by fan-in or centrality)
+- drop_leaves: remove leaf utilities (called by others, calling nothing)
+- max_edges_per_node: keep only the heaviest outgoing call edges of each node
+
+Every view works on the plain-dict graph model and returns a new one, so the
+size of a view can be estimated before anything is written or rendered.
+"""
+
+from collections import defaultdict
+
+
+# Node kinds that represent callable code (as opposed to containers)
+CALLABLE_KINDS = ('function', 'method')
+
+# Approximate DOT bytes written per node/edge besides the ids and labels
+NODE_OVERHEAD_BYTES = 60
+EDGE_OVERHEAD_BYTES = 40
+
+
+def _copy_graph(graph, nodes, edges):
+    """Return a new graph model that shares metadata with the original."""
+    view = {key: value for key, value in graph.items() if key not in ('nodes', 'edges', 'rankings')}
+    view['nodes'] = nodes
+    view['edges'] = edges
+    return view
+
+
+def _call_degrees(graph):
+    """Return (fan_in, fan_out) dicts counting weighted call edges per node."""
+    fan_in = defaultdict(int)
+    fan_out = defaultdict(int)
+    for edge in graph['edges']:
+        if edge['kind'] != 'calls':
+            continue
+        count = edge.get('count', 1)
+        fan_out[edge['source']] += count
+        fan_in[edge['target']] += count
+    return fan_in, fan_out
+
+
+def drop_leaves(graph):
+    """Remove leaf utilities: callables that are called by others but call nothing."""
+    fan_in, fan_out = _call_degrees(graph)
+    leaves = {
+        node_id for node_id, node in graph['nodes'].items()
+        if node['kind'] in CALLABLE_KINDS and fan_in[node_id] > 0 and fan_out[node_id] == 0
+    }
+
+    nodes = {node_id: node for node_id, node in graph['nodes'].items() if node_id not in leaves}
+    edges = [edge for edge in graph['edges']
+             if edge['source'] not in leaves and edge['target'] not in leaves]
+    return _copy_graph(graph, nodes, edges)
+
+
+def collapse(graph, level='module'):
+    """
+    Collapse the graph to module or package level.
+
+    Every node is replaced by the module (file) or package (directory) it lives
+    in. Call edges between different groups are merged into a single edge whose
+    ``count`` sums the underlying call sites; calls inside a group are dropped.
+    """
+    if level not in ('module', 'package'):
+        raise ValueError(f"Unknown collapse level: {level}")
+
+    nodes = {}
+    group_of = {}
+    for node_id, node in graph['nodes'].items():
+        group = node[level]
+        group_of[node_id] = group
+        if group not in nodes:
+            label = node['file'] if level == 'module' else group
+            nodes[group] = {'kind': level, 'label': label, 'file': node['file'],
+                            'module': node['module'], 'package': node['package'], 'size': 0}
+        if node['kind'] in CALLABLE_KINDS:
+            nodes[group]['size'] += 1
+            # Groups carry the summed scores of their members
+            group_scores = nodes[group].setdefault('scores', {})
+            for name, score in node.get('scores', {}).items():
+                group_scores[name] = group_scores.get(name, 0.0) + score
+
+    counts = defaultdict(int)
+    for edge in graph['edges']:
+        if edge['kind'] != 'calls':
+            continue
+        source = group_of.get(edge['source'])
+        target = group_of.get(edge['target'])
+        if source is None or target is None or source == target:
+            continue
+        counts[(source, target)] += edge.get('count', 1)
+
+    edges = [{'source': source, 'target': target, 'kind': 'calls', 'count': count}
+             for (source, target), count in counts.items()]
+    return _copy_graph(graph, nodes, edges)
+
+
+def score_nodes(graph, rank_by='fanin'):
+    """
+    Score the rankable nodes of a graph.
+
+    ``fanin`` counts incoming calls. ``centrality`` uses weighted degree
+    centrality (incoming plus outgoing calls). ``pagerank`` and ``betweenness``
+    use the scores from ``callgraph_ranking.rank_graph`` (summed per group in
+    collapsed views). Containers are only scored in collapsed views, where they
+    are the only nodes.
+    """
+    fan_in, fan_out = _call_degrees(graph)
+    collapsed = all(node['kind'] in ('module', 'package') for node in graph['nodes'].values())
+
+    scores = {}
+    for node_id, node in graph['nodes'].items():
+        if not collapsed and node['kind'] not in CALLABLE_KINDS:
+            continue
+        if rank_by == 'fanin':
+            scores[node_id] = fan_in[node_id]
+        elif rank_by == 'centrality':
+            scores[node_id] = fan_in[node_id] + fan_out[node_id]
+        elif rank_by in ('pagerank', 'betweenness'):
+            scores[node_id] = node.get('scores', {}).get(rank_by, 0.0)
+        else:
+            raise ValueError(f"Unknown ranking: {rank_by}")
+    return scores
+
+
+def top_k(graph, k, rank_by='fanin'):
+    """
+    Keep the k highest scoring nodes.
+
+    The files and classes that contain a kept function are kept as well, so the
+    hierarchy still renders. Ties are broken by node id for stable output.
+    """
+    scores = score_nodes(graph, rank_by)
+    ranked = sorted(scores, key=lambda node_id: (-scores[node_id], node_id))
+    keep = set(ranked[:k])
+
+    # Pull in the containers of the kept nodes
+    parents = {edge['target']: edge['source'] for edge in graph['edges'] if edge['kind'] == 'contains'}
+    for node_id in list(keep):
+        parent = parents.get(node_id)
+        while parent is not None and parent not in keep:
+            keep.add(parent)
+            parent = parents.get(parent)
+
+    nodes = {node_id: node for node_id, node in graph['nodes'].items() if node_id in keep}
+    edges = [edge for edge in graph['edges'] if edge['source'] in keep and edge['target'] in keep]
+    return _copy_graph(graph, nodes, edges)
+
+
+def cap_edges(graph, max_edges_per_node):
+    """Keep at most ``max_edges_per_node`` outgoing call edges per node, heaviest first."""
+    outgoing = defaultdict(list)
+    edges = []
+    for edge in graph['edges']:
+        if edge['kind'] == 'calls':
+            outgoing[edge['source']].append(edge)
+        else:
+            edges.append(edge)
+
+    for source_edges in outgoing.values():
+        source_edges.sort(key=lambda edge: -edge.get('count', 1))
+        edges.extend(source_edges[:max_edges_per_node])
+
+    return _copy_graph(graph, dict(graph['nodes']), edges)
+
+
+def apply_view(graph, collapse_to=None, top_k_nodes=None, rank_by='fanin',
+               drop_leaf_nodes=False, max_edges_per_node=None):
+    """
+    Apply a combination of views to a call graph model.
+
+    Views are applied in a fixed order: leaf removal (on the full graph), then
+    collapsing, then top-k pruning, then the per-node edge cap.
+
+    Args:
+        graph: Call graph model from ``generate_callgraph.build_call_graph``
+        collapse_to: 'module' or 'package' to collapse the graph, or None
+        top_k_nodes: Number of nodes to keep, or None to keep all
+        rank_by: 'fanin', 'centrality', 'pagerank' or 'betweenness', used by top-k pruning
+        drop_leaf_nodes: Whether to remove leaf utilities
+        max_edges_per_node: Maximum outgoing call edges per node, or None
+
+    Returns:
+        A new graph model
+    """
+    if drop_leaf_nodes:
+        graph = drop_leaves(graph)
+    if collapse_to:
+        graph = collapse(graph, collapse_to)
+    if top_k_nodes:
+        graph = top_k(graph, top_k_nodes, rank_by)
+    if max_edges_per_node:
+        graph = cap_edges(graph, max_edges_per_node)
+    return graph
+
+
+def estimate_view_size(graph):
+    """
+    Estimate how large a view will be once written as DOT.
+
+    Returns:
+        Dictionary with node and edge counts and the approximate DOT size in bytes
+    """
+    dot_bytes = 0
+    for node_id, node in graph['nodes'].items():
+        dot_bytes += len(node_id) + len(node['label']) + NODE_OVERHEAD_BYTES
+    for edge in graph['edges']:
+        dot_bytes += len(edge['source']) + len(edge['target']) + EDGE_OVERHEAD_BYTES
+
+    return {
+        'nodes': len(graph['nodes']),
+        'edges': len(graph['edges']),
+        'dot_bytes': dot_bytes
+    }
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Change Impact Analysis
+
+Works out which generated artifacts need refreshing after a push, at the level
+of single functions instead of whole files. A snapshot records a body hash for
+every function, method and class (from the parse store) together with the
+reverse call graph. Diffing two snapshots gives the symbols that were added,
+removed or modified; walking the callers of those symbols a configurable number
+of hops gives the code whose behavior may have changed with them.
+
+The result lists the smallest set of:
+- function summaries to regenerate (and the ones to drop)
+- files whose comments to regenerate, with the functions concerned
+- README sections to revisit (Usage when entry points are affected, Features
+  when the public API is)
+
+Usage:
+  python change_impact.py snapshot /path/to/repo --output before.json
+  python change_impact.py diff before.json /path/to/repo --hops 2
+"""
+
+import os
+import sys
+import json
+import argparse
+from collections import defaultdict
+
+from generate_callgraph import build_call_graph, build_module_index
+from parse_store import load_parsed_file
+from reachability import load_analyses, find_entry_points, call_successors
+
+
+# Number of caller hops followed by default
+DEFAULT_HOPS = 1
+
+
+def _symbol_node(file_node, symbol):
+    """
+    Return the call graph node id of a parse store symbol.
+
+    Definitions nested in a function (or in a nested class) have no call graph
+    node; they are keyed by their enclosing scope, e.g. ``file->outer.helper``,
+    so they don't overwrite a top-level symbol of the same name.
+    """
+    scope = symbol.get('scope')
+    if scope and scope != symbol.get('class_name'):
+        return f"{file_node}->{scope}.{symbol['name']}"
+    if symbol['type'] == 'class':
+        return f"{file_node}_{symbol['name']}"
+    if symbol.get('class_name'):
+        return f"{file_node}_{symbol['class_name']}->{symbol['name']}"
+    return f"{file_node}->{symbol['name']}"
+
+
+def snapshot_symbols(file_node, rel_path, parsed):
+    """Return the snapshot entries of the symbols of one parsed file, keyed by node id."""
+    symbols = {}
+    for symbol in parsed['symbols']:
+        symbols[_symbol_node(file_node, symbol)] = {
+            'kind': 'class' if symbol['type'] == 'class' else ('method' if symbol.get('class_name') else 'function'),
+            'file': rel_path,
+            'name': symbol['name'],
+            'class_name': symbol.get('class_name'),
+            'hash': symbol['body_hash']
+        }
+    return symbols
+
+
+def take_snapshot(repo_path):
+    """
+    Record the symbols, callers and entry points of a repository.
+
+    Returns:
+        JSON-serializable snapshot dictionary
+    """
+    graph = build_call_graph(repo_path)
+    analyses = load_analyses(repo_path, graph)
+    module_index = build_module_index(file_node for file_node, _ in analyses)
+
+    symbols = {}
+    for file_node, _ in analyses:
+        rel_path = graph['nodes'][file_node]['file']
+        parsed = load_parsed_file(os.path.join(repo_path, rel_path))
+        symbols.update(snapshot_symbols(file_node, rel_path, parsed))
+
+    callers = defaultdict(list)
+    for caller, callees in call_successors(graph, analyses, module_index).items():
+        for callee in callees:
+            callers[callee].append(caller)
+
+    return {
+        'name': graph['name'],
+        'symbols': symbols,
+        'callers': {callee: sorted(sources) for callee, sources in callers.items()},
+        'entry_points': sorted(find_entry_points(repo_path, graph, analyses, module_index))
+    }
+
+
+def save_snapshot(snapshot, path):
+    """Write a snapshot to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+
+
+def load_snapshot(path):
+    """Load a snapshot from a JSON file, or take one if ``path`` is a repository."""
+    if os.path.isdir(path):
+        return take_snapshot(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def diff_snapshots(old, new):
+    """
+    Compare two snapshots symbol by symbol.
+
+    Returns:
+        Dictionary with sorted 'added', 'removed' and 'modified' node id lists
+    """
+    old_symbols = old['symbols']
+    new_symbols = new['symbols']
+    return {
+        'added': sorted(set(new_symbols) - set(old_symbols)),
+        'removed': sorted(set(old_symbols) - set(new_symbols)),
+        'modified': sorted(node_id for node_id in set(old_symbols) & set(new_symbols)
+                           if old_symbols[node_id]['hash'] != new_symbols[node_id]['hash'])
+    }
+
+
+def impacted_callers(changed, callers, hops):
+    """
+    Walk the reverse call graph from the changed symbols.
+
+    Returns:
+        Dictionary mapping every impacted caller (not itself changed) to its hop distance
+    """
+    distance = {}
+    seen = set(changed)
+    frontier = list(changed)
+    for hop in range(1, hops + 1):
+        next_frontier = []
+        for node_id in frontier:
+            for caller in callers.get(node_id, ()):
+                if caller not in seen:
+                    seen.add(caller)
+                    distance[caller] = hop
+                    next_frontier.append(caller)
+        frontier = next_frontier
+    return distance
+
+
+def _is_public(symbol):
+    """Check whether a symbol is part of the public API (no leading underscore on it or its class)."""
+    names = [symbol['name'], symbol.get('class_name') or '']
+    return not any(name.startswith('_') for name in names)
+
+
+def analyze_impact(old, new, hops=DEFAULT_HOPS):
+    """
+    Compute what has to be regenerated between two snapshots.
+
+    Args:
+        old: Snapshot before the change
+        new: Snapshot after the change
+        hops: Number of caller hops whose behavior counts as changed
+
+    Returns:
+        Dictionary with the symbol diff, the summaries to regenerate and drop,
+        the files to re-comment and the README sections to revisit
+    """
+    diff = diff_snapshots(old, new)
+    changed = diff['added'] + diff['removed'] + diff['modified']
+
+    # Callers from both sides: removed code is only called in the old snapshot
+    callers = defaultdict(set)
+    for snapshot in (old, new):
+        for callee, sources in snapshot['callers'].items():
+            callers[callee].update(sources)
+    impacted = impacted_callers(changed, callers, hops)
+
+    reasons = {node_id: 'added' for node_id in diff['added']}
+    reasons.update({node_id: 'modified' for node_id in diff['modified']})
+    for node_id, hop in impacted.items():
+        reasons.setdefault(node_id, f"calls changed code ({hop} hop{'s' if hop > 1 else ''} away)")
+
+    summaries = []
+    comments = defaultdict(set)
+    for node_id in sorted(reasons):
+        symbol = new['symbols'].get(node_id)
+        if symbol is None:
+            # A caller that only existed before the change
+            continue
+        if symbol['kind'] != 'class':
+            summaries.append({'id': node_id, 'file': symbol['file'], 'name': symbol['name'], 'reason': reasons[node_id]})
+        comments[symbol['file']].add(symbol['name'])
+
+    readme_sections = set()
+    entry_points = set(old.get('entry_points', [])) | set(new.get('entry_points', []))
+    api_changes = set(diff['added']) | set(diff['removed'])
+    for node_id in list(reasons) + diff['removed']:
+        symbol = new['symbols'].get(node_id) or old['symbols'].get(node_id)
+        if symbol is None:
+            continue
+        if node_id in entry_points:
+            readme_sections.add('Usage')
+        # New or removed public symbols and changed entry points alter what the project offers
+        if _is_public(symbol) and (node_id in api_changes or (node_id in entry_points and node_id in changed)):
+            readme_sections.add('Features')
+
+    return {
+        'diff': diff,
+        'hops': hops,
+        'summaries': summaries,
+        'dropped_summaries': [{'id': node_id, 'file': old['symbols'][node_id]['file'], 'name': old['symbols'][node_id]['name']}
+                              for node_id in diff['removed'] if old['symbols'][node_id]['kind'] != 'class'],
+        'comments': {file_path: sorted(names) for file_path, names in sorted(comments.items())},
+        'readme_sections': sorted(readme_sections)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the summaries, comments and README sections a change invalidates')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    snapshot_parser = subparsers.add_parser('snapshot', help='Record a snapshot of a repository')
+    snapshot_parser.add_argument('repo_path', help='Path to the repository')
+    snapshot_parser.add_argument('--output', required=True, help='Path of the snapshot JSON file')
+
+    diff_parser = subparsers.add_parser('diff', help='Compare two snapshots (or repository checkouts)')
+    diff_parser.add_argument('old', help='Snapshot file or repository before the change')
+    diff_parser.add_argument('new', help='Snapshot file or repository after the change')
+    diff_parser.add_argument('--hops', type=int, default=DEFAULT_HOPS,
+                             help=f'Caller hops to invalidate (default: {DEFAULT_HOPS})')
+
+    args = parser.parse_args()
+
+    if args.command == 'snapshot':
+        snapshot = take_snapshot(args.repo_path)
+        save_snapshot(snapshot, args.output)
+        print(f"Snapshot of {len(snapshot['symbols'])} symbols saved to {args.output}")
+        return 0
+
+    impact = analyze_impact(load_snapshot(args.old), load_snapshot(args.new), args.hops)
+    print(json.dumps(impact, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
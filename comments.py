@@ -10,6 +10,9 @@ import argparse
 from dotenv import load_dotenv
 import traceback
 
+from parse_store import load_parsed_source, source_segment
+from response_cache import cached_post_json, get_cache
+
 # Load environment variables from .env file
 load_dotenv()
 FASTAPI_AUTH = os.getenv("FASTAPI_AUTH")
@@ -397,28 +400,31 @@ def get_file_content(download_url):
 def extract_code_structure(code_content):
     """Extract functions and classes from the Python code string."""
     try:
-        tree = ast.parse(code_content)
+        # Parse results are shared with the analyzer and call graph through the parse store
+        parsed = load_parsed_source(code_content)
+        if parsed['error']:
+            raise SyntaxError(parsed['error'])
         code_elements = []
         
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
+        for symbol in parsed['symbols']:
+            if symbol['type'] == 'function' and not symbol['is_async']:
                 code_elements.append({
                     "type": "function",
-                    "name": node.name,
-                    "line_number": node.lineno,
-                    "end_line": node.end_lineno,
-                    "args": [arg.arg for arg in node.args.args],
-                    "body": ast.get_source_segment(code_content, node),
-                    "existing_docstring": ast.get_docstring(node)
+                    "name": symbol['name'],
+                    "line_number": symbol['lineno'],
+                    "end_line": symbol['end_lineno'],
+                    "args": symbol['args'],
+                    "body": source_segment(code_content, symbol),
+                    "existing_docstring": symbol['docstring']
                 })
-            elif isinstance(node, ast.ClassDef):
+            elif symbol['type'] == 'class':
                 code_elements.append({
                     "type": "class",
-                    "name": node.name,
-                    "line_number": node.lineno,
-                    "end_line": node.end_lineno,
-                    "body": ast.get_source_segment(code_content, node),
-                    "existing_docstring": ast.get_docstring(node)
+                    "name": symbol['name'],
+                    "line_number": symbol['lineno'],
+                    "end_line": symbol['end_lineno'],
+                    "body": source_segment(code_content, symbol),
+                    "existing_docstring": symbol['docstring']
                 })
         
         return code_elements
@@ -519,10 +525,7 @@ def generate_comments(code_elements, file_name):
     
     try:
         print("Generating comments...")
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        result = response.json()
+        result = cached_post_json(url, headers, data)
         
         if "choices" in result and len(result["choices"]) > 0:
             comment_text = result["choices"][0]["message"]["content"]
@@ -559,14 +562,16 @@ def generate_comments(code_elements, file_name):
 def apply_comments_to_code(code_content, comments):
     """Apply the generated comments to the Python code string."""
     try:
-        # Parse the code
-        tree = ast.parse(code_content)
+        # Parse the code (already parsed by extract_code_structure, so this is a store hit)
+        parsed = load_parsed_source(code_content)
+        if parsed['error']:
+            raise SyntaxError(parsed['error'])
         
         # Build a mapping of line numbers to function/class definitions
         line_mapping = {}
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                line_mapping[node.lineno] = node.name
+        for symbol in parsed['symbols']:
+            if symbol['type'] == 'class' or not symbol['is_async']:
+                line_mapping[symbol['lineno']] = symbol['name']
         
         # Sort the line numbers in descending order to avoid position shifts
         sorted_lines = sorted(line_mapping.keys(), reverse=True)
@@ -808,10 +813,14 @@ if __name__ == "__main__":
     parser.add_argument("repo_url", help="URL of the GitHub repository")
     parser.add_argument("--list-files", action="store_true", help="List all Python files in the repository")
     parser.add_argument("--file", help="Specific Python file path to comment")
+    parser.add_argument("--no-cache", action="store_true", help="Ask the model again instead of reusing cached comments")
     
     try:
         args = parser.parse_args()
         
+        if args.no_cache:
+            get_cache().bypass = True
+        
         # If --list-files flag is provided, list all Python files and exit
         if args.list_files:
             try:
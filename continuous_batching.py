@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Continuous Batching for Causal Language Models
+
+An iteration-level scheduler: instead of running ``model.generate`` for a
+fixed batch until its longest sequence finishes, a decode loop advances every
+active sequence by one token per step, sharing one batched KV cache.
+
+- New requests are prefilled on their own and join the running batch at the
+  next token boundary; the shorter of the batch and the newcomer is padded on
+  the left (masked out) so their caches line up.
+- Finished sequences (EOS or max_new_tokens) leave immediately: their rows are
+  dropped from the cache and columns that became padding for everyone are trimmed.
+
+Prompts starting with a cached prefix (see prefix_cache.PrefixCache) start
+from its KV cache, so only the rest of the prompt is prefilled.
+
+A request can also pass a streamer (see model_streaming.TokenStream): it gets
+the prompt ids, then every token as it is sampled, and can cancel the request
+to free its slot.
+
+Short and long requests share the model: a 20-token answer doesn't wait for
+a 1,024-token README that started before it.
+
+Works with models using the standard [batch, heads, length, head_dim] KV cache
+layout (Llama, Mistral, GPT-2...).
+
+tests/test_continuous_batching.py checks greedy outputs against one-at-a-time
+generate on CPU with a tiny Llama.
+"""
+
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from model_batching import QueueFull, DEFAULT_MAX_QUEUE
+from prefix_cache import PrefixCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_PARAMS = {"max_new_tokens": 256, "temperature": 0.7, "top_p": 0.9, "top_k": 50}
+
+
+def _to_legacy(past):
+    """Return a model's KV cache as per-layer (key, value) tensors."""
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+
+def _from_legacy(past):
+    """Wrap per-layer (key, value) tensors in the cache object newer transformers versions expect."""
+    try:
+        from transformers.cache_utils import DynamicCache
+        return DynamicCache.from_legacy_cache(past)
+    except (ImportError, AttributeError):
+        return past
+
+
+def _left_pad(past, attention_mask, length):
+    """Pad a KV cache and its attention mask with ``length`` masked positions on the left."""
+    def pad(tensor):
+        return torch.cat([tensor.new_zeros(tensor.shape[0], tensor.shape[1], length, tensor.shape[3]), tensor], dim=2)
+
+    padded_mask = torch.cat([attention_mask.new_zeros(attention_mask.shape[0], length), attention_mask], dim=1)
+    return tuple((pad(key), pad(value)) for key, value in past), padded_mask
+
+
+def sample_token(logits: torch.Tensor, params: Dict[str, Any]) -> int:
+    """Pick the next token from one sequence's logits (greedy when temperature is 0)."""
+    if params["temperature"] <= 0:
+        return int(torch.argmax(logits))
+
+    logits = logits.float() / params["temperature"]
+    if params.get("top_k"):
+        kth = torch.topk(logits, min(params["top_k"], logits.shape[-1])).values[-1]
+        logits = logits.masked_fill(logits < kth, float("-inf"))
+    if params.get("top_p", 1.0) < 1.0:
+        sorted_logits, order = torch.sort(logits, descending=True)
+        probs = torch.softmax(sorted_logits, dim=-1)
+        # Keep the smallest set of tokens whose probability reaches top_p
+        outside = torch.cumsum(probs, dim=-1) - probs > params["top_p"]
+        logits = logits.scatter(0, order[outside], float("-inf"))
+    return int(torch.multinomial(torch.softmax(logits, dim=-1), 1))
+
+
+class _Sequence:
+    """A request and the tokens generated for it so far."""
+
+    def __init__(self, prompt: str, params: Dict[str, Any], future: Future, streamer=None):
+        self.prompt = prompt
+        self.params = params
+        self.future = future
+        self.streamer = streamer
+        self.tokens: List[int] = []
+
+
+class ContinuousBatcher:
+    """Runs generation requests for one causal LM with iteration-level batching."""
+
+    def __init__(self, model, tokenizer, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, name: str = "llama",
+                 max_queue: int = DEFAULT_MAX_QUEUE, prefix_cache: Optional[PrefixCache] = None):
+        """
+        Args:
+            model: Causal language model (transformers)
+            tokenizer: Its tokenizer
+            max_batch_size: Largest number of sequences decoded together
+            name: Model name, used in logs and for the decode thread
+            max_queue: Most requests waiting for a batch slot; more are rejected with QueueFull
+            prefix_cache: KV cache of shared prompt prefixes (default: a new PrefixCache)
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.name = name
+        self.max_queue = max_queue
+        self.queue: "queue.Queue[_Sequence]" = queue.Queue(maxsize=max_queue)
+        self.prefix_cache = PrefixCache() if prefix_cache is None else prefix_cache
+        self.rejected = 0
+        self.active: List[_Sequence] = []
+        # Per-layer (key, value) for the active sequences, [batch, heads, length, head_dim],
+        # and the matching attention mask with 0 on left padding
+        self.past = None
+        self.attention_mask: Optional[torch.Tensor] = None
+        self.steps = 0
+        self.completed = 0
+        self.generated_tokens = 0
+        self._active_total = 0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def start(self):
+        """Start the decode loop thread if it isn't running."""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"decode-{self.name}", daemon=True)
+                self._thread.start()
+
+    def submit_nowait(self, prompt: str, params: Optional[Dict[str, Any]] = None, streamer=None) -> Future:
+        """
+        Queue a prompt and return a future for its generated text.
+
+        A streamer, if given, receives the prompt ids, then each generated token,
+        then ``end()``; setting its ``cancelled`` attribute stops the request early.
+
+        Raises:
+            QueueFull: If ``max_queue`` requests are already waiting
+        """
+        self.start()
+        future = Future()
+        try:
+            self.queue.put_nowait(_Sequence(prompt, dict(DEFAULT_PARAMS, **(params or {})), future, streamer))
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFull(f"{self.name} queue is full ({self.max_queue} requests waiting)")
+        return future
+
+    async def submit(self, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Queue a prompt and wait for its generated text (without the prompt).
+
+        Args:
+            prompt: Model input
+            params: max_new_tokens, temperature, top_p and top_k
+        """
+        return await asyncio.wrap_future(self.submit_nowait(prompt, params))
+
+    def submit_stream(self, prompt: str, params: Dict[str, Any], streamer) -> asyncio.Future:
+        """Queue a prompt whose tokens go to ``streamer`` and return an awaitable for its text."""
+        return asyncio.wrap_future(self.submit_nowait(prompt, params, streamer))
+
+    def _run(self):
+        while True:
+            try:
+                # Wait for work only while idle; otherwise newcomers join between steps
+                self._admit(block=not self.active)
+                if self.active:
+                    self._step()
+            except Exception as e:
+                logger.exception(f"{self.name}: decode step failed")
+                for sequence in self.active:
+                    if not sequence.future.done():
+                        sequence.future.set_exception(e)
+                self.active = []
+                self.past = self.attention_mask = None
+
+    def _admit(self, block: bool):
+        """Prefill queued requests into free batch slots."""
+        while len(self.active) < self.max_batch_size:
+            try:
+                sequence = self.queue.get(block=block and not self.active)
+            except queue.Empty:
+                return
+            # Skip requests whose caller already gave up
+            if not sequence.future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._prefill(sequence)
+            except Exception as e:
+                sequence.future.set_exception(e)
+
+    def _prefill(self, sequence: _Sequence):
+        """Run a new prompt through the model and add it to the batch."""
+        input_ids = self.tokenizer(sequence.prompt, return_tensors="pt").input_ids.to(self.model.device)
+        if sequence.streamer is not None:
+            sequence.streamer.put(input_ids.cpu())
+        ids = input_ids[0].tolist()
+        reused, prefix = self.prefix_cache.lookup(ids)
+        with torch.no_grad():
+            if prefix is None:
+                outputs = self.model(input_ids=input_ids, use_cache=True)
+            else:
+                # Only the tokens after the cached prefix need to run
+                position_ids = torch.arange(reused, len(ids), device=input_ids.device).unsqueeze(0)
+                outputs = self.model(input_ids=input_ids[:, reused:], attention_mask=torch.ones_like(input_ids),
+                                     position_ids=position_ids, past_key_values=_from_legacy(prefix),
+                                     use_cache=True)
+        past = _to_legacy(outputs.past_key_values)
+        self.prefix_cache.remember(ids, past, self.tokenizer, reused)
+
+        if self._append(sequence, sample_token(outputs.logits[0, -1], sequence.params)):
+            self._finish(sequence)
+            return
+
+        attention_mask = torch.ones_like(input_ids)
+        if self.active:
+            # Line up the newcomer's cache with the batch by padding the shorter one on the left
+            difference = self.attention_mask.shape[1] - attention_mask.shape[1]
+            if difference > 0:
+                past, attention_mask = _left_pad(past, attention_mask, difference)
+            elif difference < 0:
+                self.past, self.attention_mask = _left_pad(self.past, self.attention_mask, -difference)
+            past = tuple((torch.cat([key, new_key]), torch.cat([value, new_value]))
+                         for (key, value), (new_key, new_value) in zip(self.past, past))
+            attention_mask = torch.cat([self.attention_mask, attention_mask])
+        self.past = past
+        self.attention_mask = attention_mask
+        self.active.append(sequence)
+
+    def _step(self):
+        """Generate one token for every active sequence."""
+        input_ids = torch.tensor([[sequence.tokens[-1]] for sequence in self.active], device=self.model.device)
+        # Each new token's position is the number of real (unpadded) tokens before it
+        position_ids = self.attention_mask.sum(dim=1, keepdim=True)
+        attention_mask = torch.cat([self.attention_mask, self.attention_mask.new_ones(len(self.active), 1)], dim=1)
+        with torch.no_grad():
+            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, position_ids=position_ids,
+                                 past_key_values=_from_legacy(self.past), use_cache=True)
+        self.past = _to_legacy(outputs.past_key_values)
+        self.attention_mask = attention_mask
+        self.steps += 1
+        self._active_total += len(self.active)
+
+        finished = [i for i, sequence in enumerate(self.active)
+                    if self._append(sequence, sample_token(outputs.logits[i, -1], sequence.params))
+                    or (sequence.streamer is not None and sequence.streamer.cancelled)]
+        if finished:
+            self._leave(finished)
+
+    def _append(self, sequence: _Sequence, token: int) -> bool:
+        """Add a generated token; return True if the sequence is complete."""
+        sequence.tokens.append(token)
+        self.generated_tokens += 1
+        if sequence.streamer is not None:
+            sequence.streamer.put([token])
+        return token == self.tokenizer.eos_token_id or len(sequence.tokens) >= sequence.params["max_new_tokens"]
+
+    def _finish(self, sequence: _Sequence):
+        self.completed += 1
+        if sequence.streamer is not None:
+            sequence.streamer.end()
+        if not sequence.future.done():
+            sequence.future.set_result(self.tokenizer.decode(sequence.tokens, skip_special_tokens=True))
+
+    def _leave(self, finished: List[int]):
+        """Complete finished sequences and drop them from the batch."""
+        for i in finished:
+            self._finish(self.active[i])
+        keep = [i for i in range(len(self.active)) if i not in set(finished)]
+        self.active = [self.active[i] for i in keep]
+        if not keep:
+            self.past = self.attention_mask = None
+            return
+
+        attention_mask = self.attention_mask[keep]
+        # Columns that are padding for every remaining sequence no longer need to be attended to
+        trim = int((attention_mask.shape[1] - attention_mask.sum(dim=1)).min())
+        self.attention_mask = attention_mask[:, trim:]
+        self.past = tuple((key[torch.tensor(keep, device=key.device)][:, :, trim:],
+                           value[torch.tensor(keep, device=value.device)][:, :, trim:])
+                          for key, value in self.past)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue length, active sequences and decode statistics."""
+        return {
+            "queued": self.queue.qsize(),
+            "active": len(self.active),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "steps": self.steps,
+            "completed": self.completed,
+            "generated_tokens": self.generated_tokens,
+            "mean_batch_size": self._active_total / self.steps if self.steps else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "prefix_cache": self.prefix_cache.stats()
+        }
@@ -10,14 +10,17 @@ Features:
 - Generate hierarchical call graphs with color-coded nodes
 - Support for direct GitHub repository URL input
 - Output in DOT format for visualization with Graphviz
+- Module/package collapse and top-k pruning for large repositories
+- Cached, concurrent PNG/SVG rendering with automatic layout engine choice
+- History mode charting the call graph across a commit range
 
 Usage:
   python generate_callgraph.py --single-repo https://github.com/username/repo --output /path/to/output
 """
 
 import os
-import ast
 import sys
+import math
 import json
 import argparse
 import tempfile
@@ -28,128 +31,25 @@ from pathlib import Path
 from urllib.parse import urlparse
 from datetime import datetime
 
-
-class FunctionVisitor(ast.NodeVisitor):
-    """AST visitor that extracts functions and methods within classes."""
-    
-    def __init__(self):
-        self.functions = []
-        self.classes = {}
-        self.current_class = None
-        self.imports = {}
-        self.function_calls = {}
-        self.current_function = None
-    
-    def visit_Import(self, node):
-        """Process import statements."""
-        for name in node.names:
-            self.imports[name.asname or name.name] = name.name
-        self.generic_visit(node)
-    
-    def visit_ImportFrom(self, node):
-        """Process from...import statements."""
-        module = node.module or ''
-        for name in node.names:
-            import_name = name.asname or name.name
-            self.imports[import_name] = f"{module}.{name.name}" if module else name.name
-        self.generic_visit(node)
-    
-    def visit_FunctionDef(self, node):
-        """Process function definitions."""
-        if self.current_class:
-            # This is a method in a class
-            self.classes[self.current_class].append(node.name)
-        else:
-            # This is a standalone function
-            self.functions.append(node.name)
-        
-        # Track the current function to record calls
-        prev_function = self.current_function
-        if self.current_class:
-            self.current_function = f"{self.current_class}.{node.name}"
-        else:
-            self.current_function = node.name
-        
-        # Initialize the function calls list for this function
-        if self.current_function not in self.function_calls:
-            self.function_calls[self.current_function] = []
-        
-        # Continue traversing the AST
-        self.generic_visit(node)
-        
-        # Restore the previous function context
-        self.current_function = prev_function
-    
-    def visit_AsyncFunctionDef(self, node):
-        """Handle async functions the same way as regular functions."""
-        self.visit_FunctionDef(node)
-    
-    def visit_ClassDef(self, node):
-        """Process class definitions."""
-        # Store the current class name
-        class_name = node.name
-        self.classes[class_name] = []
-        
-        # Save the previous class context
-        prev_class = self.current_class
-        self.current_class = class_name
-        
-        # Visit all nodes in the class body
-        self.generic_visit(node)
-        
-        # Restore the previous class context
-        self.current_class = prev_class
-    
-    def visit_Call(self, node):
-        """Process function calls."""
-        if self.current_function:
-            # Try to get the function name being called
-            func_name = None
-            if isinstance(node.func, ast.Name):
-                func_name = node.func.id
-            elif isinstance(node.func, ast.Attribute):
-                if isinstance(node.func.value, ast.Name):
-                    # Could be a method call on an object or module
-                    obj_name = node.func.value.id
-                    method_name = node.func.attr
-                    if obj_name in self.imports:
-                        # It's likely a module.function call
-                        func_name = f"{obj_name}.{method_name}"
-                    else:
-                        # It's likely an object.method call
-                        func_name = f"{obj_name}.{method_name}"
-                else:
-                    # This handles more complex cases like a.b.c()
-                    func_name = f"...{node.func.attr}"
-            
-            if func_name:
-                self.function_calls[self.current_function].append(func_name)
-        
-        # Continue traversing the call's arguments
-        self.generic_visit(node)
+from callgraph_views import apply_view, estimate_view_size
+from callgraph_render import render_many, DEFAULT_RENDER_TIMEOUT, DEFAULT_RENDER_WORKERS
+from callgraph_ranking import rank_graph
+from parse_store import load_parsed_file, MAX_CALL_SITE_LINES
 
 
 def analyze_python_file(file_path):
     """Analyze a Python file and extract functions, classes, and call information."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Parse the AST
-        tree = ast.parse(content)
+        # Parse results are shared with the analyzer and commenter through the parse store
+        parsed = load_parsed_file(file_path)
+        if parsed['error']:
+            raise SyntaxError(parsed['error'])
         
-        # Visit the AST to extract functions and classes
-        visitor = FunctionVisitor()
-        visitor.visit(tree)
-        
-        return {
-            'functions': visitor.functions,
-            'classes': visitor.classes,
-            'function_calls': visitor.function_calls
-        }
+        return parsed['callgraph']
     except Exception as e:
         print(f"Error analyzing {file_path}: {e}", file=sys.stderr)
-        return {'functions': [], 'classes': {}, 'function_calls': {}}
+        return {'functions': [], 'classes': {}, 'function_calls': {}, 'call_sites': {}, 'imports': {},
+                'decorators': {}, 'main_calls': [], 'exports': []}
 
 
 def find_python_files(repo_path):
@@ -164,8 +64,247 @@ def find_python_files(repo_path):
     return python_files
 
 
-def generate_dot_file(repo_path, output_file):
-    """Generate a DOT file showing the structure of the repository."""
+# DOT attributes for each node kind in the graph model
+NODE_STYLES = {
+    'file': 'style=filled, fillcolor=lightblue, shape=folder',
+    'class': 'style=filled, fillcolor="#D0F0C0", shape=box',
+    'function': 'style=filled, fillcolor="#E6F3FF"',
+    'method': 'style=filled, fillcolor="#F0F0F0"',
+    'module': 'style=filled, fillcolor=lightblue, shape=folder',
+    'package': 'style=filled, fillcolor=lightblue, shape=tab',
+}
+
+# DOT attributes for each edge kind in the graph model
+EDGE_STYLES = {
+    'contains': 'color="#666666"',
+    'calls': 'color="blue", style="dashed"',
+}
+
+# Upper bound for the line width of heavily used call edges
+MAX_PENWIDTH = 6
+
+# Above this many nodes, rendering images with Graphviz gets slow
+RENDER_NODE_WARNING = 2000
+
+
+def build_module_index(file_nodes):
+    """
+    Map dotted import names to file nodes.
+
+    Every dotted suffix of a file node is indexed (``src.pkg.mod`` is reachable
+    as ``pkg.mod`` and ``mod``), and packages are reachable through their
+    ``__init__`` file. Ambiguous suffixes are left out.
+    """
+    candidates = {}
+    for file_node in file_nodes:
+        parts = file_node.split('.')
+        if parts[-1] == '__init__':
+            parts = parts[:-1]
+        for i in range(len(parts)):
+            candidates.setdefault('.'.join(parts[i:]), set()).add(file_node)
+
+    return {name: nodes.pop() for name, nodes in candidates.items() if len(nodes) == 1}
+
+
+def resolve_callee(callee, file_node, analysis, module_index):
+    """Return the node id a call name refers to, or None if it can't be resolved."""
+    callee_parts = callee.split('.')
+
+    if len(callee_parts) > 1 and callee_parts[0] in analysis['classes']:
+        # It's a method in a class
+        return f"{file_node}_{callee_parts[0]}->{callee_parts[1]}"
+    if callee in analysis['functions']:
+        # It's a standalone function
+        return f"{file_node}->{callee}"
+
+    # Cross-file calls are resolved through the file's imports
+    imports = analysis.get('imports', {})
+    if len(callee_parts) == 1 and callee in imports and '.' in imports[callee]:
+        # from module import function
+        module, name = imports[callee].rsplit('.', 1)
+    elif len(callee_parts) == 2 and callee_parts[0] in imports:
+        # import module; module.function()
+        module, name = imports[callee_parts[0]], callee_parts[1]
+    else:
+        return None
+
+    target_file = module_index.get(module)
+    if target_file is None:
+        return None
+    return f"{target_file}->{name}"
+
+
+def build_call_graph(repo_path):
+    """
+    Build the in-memory call graph model for a repository.
+
+    The model is a plain dict with the repository name, a ``nodes`` dict keyed
+    by node id and an ``edges`` list. Every node records its ``kind`` (file,
+    class, function or method), its label, the relative file path and the
+    module/package it belongs to, so views can regroup it without re-parsing.
+    Call edges are deduplicated: each caller/callee pair appears once with the
+    number of call sites (``count``) and the first call site ``lines``.
+    """
+    python_files = find_python_files(repo_path)
+    repo_name = os.path.basename(os.path.abspath(repo_path))
+    files = [(os.path.relpath(file_path, repo_path), analyze_python_file(file_path)) for file_path in python_files]
+    return build_graph_from_analyses(repo_name, files)
+
+
+def add_file_nodes(graph, rel_path, analysis):
+    """Add the file, class, function and method nodes of one file and their 'contains' edges; return the file node."""
+    # Remove file extension for node names
+    file_node = os.path.splitext(rel_path)[0].replace('/', '.').replace('\\', '.')
+    package = os.path.dirname(rel_path).replace('/', '.').replace('\\', '.') or '.'
+    location = {'file': rel_path, 'module': file_node, 'package': package}
+
+    graph['nodes'][file_node] = dict(location, kind='file', label=rel_path)
+
+    for func in analysis['functions']:
+        func_node = f"{file_node}->{func}"
+        graph['nodes'][func_node] = dict(location, kind='function', label=f"{func}()", name=func)
+        graph['edges'].append({'source': file_node, 'target': func_node, 'kind': 'contains'})
+
+    for class_name, methods in analysis['classes'].items():
+        class_node = f"{file_node}_{class_name}"
+        graph['nodes'][class_node] = dict(location, kind='class', label=class_name, name=class_name)
+        graph['edges'].append({'source': file_node, 'target': class_node, 'kind': 'contains'})
+
+        for method in methods:
+            method_node = f"{class_node}->{method}"
+            graph['nodes'][method_node] = dict(location, kind='method', label=f"{method}()",
+                                               name=method, class_name=class_name)
+            graph['edges'].append({'source': class_node, 'target': method_node, 'kind': 'contains'})
+
+    return file_node
+
+
+def resolve_call_sites(file_node, analysis, module_index):
+    """
+    Resolve the calls made in one file.
+
+    Yields (caller node, callee node, call site) triples. The callee node may
+    not exist in the graph (e.g. a function the imported module doesn't define);
+    callers check that before adding an edge.
+    """
+    for caller, callees in analysis['call_sites'].items():
+        caller_parts = caller.split('.')
+
+        if len(caller_parts) > 1 and caller_parts[0] in analysis['classes']:
+            # It's a method in a class
+            caller_node = f"{file_node}_{caller_parts[0]}->{caller_parts[1]}"
+        else:
+            # It's a standalone function
+            caller_node = f"{file_node}->{caller}"
+
+        for callee, site in callees.items():
+            callee_node = resolve_callee(callee, file_node, analysis, module_index)
+            if callee_node is not None:
+                yield caller_node, callee_node, site
+
+
+def build_graph_from_analyses(repo_name, files):
+    """
+    Build the call graph model from already analyzed files.
+
+    Args:
+        repo_name: Repository name stored in the model
+        files: List of (relative path, analysis) pairs, where an analysis is
+               the output of ``analyze_python_file``
+
+    Returns:
+        The call graph model described in ``build_call_graph``
+    """
+    graph = {'name': repo_name, 'nodes': {}, 'edges': []}
+    analyses = [(add_file_nodes(graph, rel_path, analysis), analysis) for rel_path, analysis in files]
+    module_index = build_module_index(file_node for file_node, _ in analyses)
+    call_edges = {}
+
+    for file_node, analysis in analyses:
+        for caller_node, callee_node, site in resolve_call_sites(file_node, analysis, module_index):
+            # Add edge only if the callee node exists
+            if callee_node not in graph['nodes']:
+                continue
+
+            # Different call names can resolve to the same node (helper() and util.helper())
+            edge = call_edges.setdefault((caller_node, callee_node), {
+                'source': caller_node, 'target': callee_node, 'kind': 'calls', 'count': 0, 'lines': []
+            })
+            edge['count'] += site['count']
+            edge['lines'] = sorted(edge['lines'] + site['lines'])[:MAX_CALL_SITE_LINES]
+
+    # Call edges go after the structural edges, as in the original output
+    graph['edges'].extend(call_edges.values())
+    return graph
+
+
+def write_dot_file(graph, output_file):
+    """Write a call graph model (or a view of it) to a DOT file."""
+    repo_name = graph['name']
+
+    with open(output_file, 'w', encoding='utf-8') as dot_file:
+        # Write DOT file header
+        dot_file.write(f'digraph {repo_name.replace("-", "_").replace(".", "_")} {{\n')
+        dot_file.write('  node [shape=box, fontname="Arial", fontsize=10];\n')
+        dot_file.write('  edge [fontname="Arial", fontsize=9];\n')
+        dot_file.write('  rankdir=LR;\n')
+        dot_file.write(f'  label="Call Graph for {repo_name}\\nGenerated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}";\n')
+        dot_file.write('  labelloc="t";\n\n')
+
+        for node_id, node in graph['nodes'].items():
+            dot_file.write(f'  "{node_id}" [label="{node["label"]}", {NODE_STYLES[node["kind"]]}];\n')
+
+        for edge in graph['edges']:
+            attrs = EDGE_STYLES[edge['kind']]
+            count = edge.get('count', 1)
+            if count > 1:
+                # One weighted edge instead of one edge per call site
+                penwidth = min(1 + math.log2(count), MAX_PENWIDTH)
+                attrs += f', weight={count}, penwidth={penwidth:.1f}, label="{count}"'
+            if edge.get('lines'):
+                attrs += f', tooltip="lines {", ".join(str(line) for line in edge["lines"])}"'
+            dot_file.write(f'  "{edge["source"]}" -> "{edge["target"]}" [{attrs}];\n')
+
+        # Write DOT file footer
+        dot_file.write('}\n')
+
+
+def detect_entry_points(repo_path, graph):
+    """Return the entry points of a call graph model (node id to reason), for prompt builders."""
+    # Imported here because reachability builds on this module
+    from reachability import load_analyses, find_entry_points
+
+    analyses = load_analyses(repo_path, graph)
+    module_index = build_module_index(file_node for file_node, _ in analyses)
+    return find_entry_points(repo_path, graph, analyses, module_index)
+
+
+def graph_artifact_path(output_file):
+    """Return the path of the JSON graph artifact stored next to a DOT file."""
+    return os.path.splitext(output_file)[0] + ".graph.json"
+
+
+def save_graph_artifact(graph, artifact_file):
+    """
+    Save the call graph model, with its rankings, as JSON.
+
+    Rankings are stored sorted by score, so readers can take the top-k
+    functions without re-ranking the graph.
+    """
+    with open(artifact_file, 'w', encoding='utf-8') as f:
+        json.dump(graph, f)
+
+
+def generate_dot_file(repo_path, output_file, view=None):
+    """
+    Generate a DOT file showing the structure of the repository.
+
+    Args:
+        repo_path: Path to the repository
+        output_file: Path of the DOT file to write
+        view: Optional dict of view options passed to ``callgraph_views.apply_view``
+              (collapse_to, top_k_nodes, rank_by, drop_leaf_nodes, max_edges_per_node)
+    """
     python_files = find_python_files(repo_path)
     repo_name = os.path.basename(os.path.abspath(repo_path))
     
@@ -180,85 +319,27 @@ def generate_dot_file(repo_path, output_file):
             dot_file.write('}\n')
         return
     
-    with open(output_file, 'w', encoding='utf-8') as dot_file:
-        # Write DOT file header
-        dot_file.write(f'digraph {repo_name.replace("-", "_").replace(".", "_")} {{\n')
-        dot_file.write('  node [shape=box, fontname="Arial", fontsize=10];\n')
-        dot_file.write('  edge [fontname="Arial", fontsize=9];\n')
-        dot_file.write('  rankdir=LR;\n')
-        dot_file.write(f'  label="Call Graph for {repo_name}\\nGenerated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}";\n')
-        dot_file.write('  labelloc="t";\n\n')
-        
-        # Process each Python file
-        file_nodes = {}  # To keep track of created file nodes
-        for file_path in python_files:
-            # Get relative path from repo root
-            rel_path = os.path.relpath(file_path, repo_path)
-            
-            # Remove file extension for node names
-            file_node = os.path.splitext(rel_path)[0].replace('/', '.').replace('\\', '.')
-            file_nodes[rel_path] = file_node
-            
-            # Analyze the file
-            analysis = analyze_python_file(file_path)
-            
-            # Add file node with improved style
-            dot_file.write(f'  "{file_node}" [label="{rel_path}", style=filled, fillcolor=lightblue, shape=folder];\n')
-            
-            # Add function nodes and edges
-            for func in analysis['functions']:
-                func_node = f"{file_node}->{func}"
-                dot_file.write(f'  "{func_node}" [label="{func}()", style=filled, fillcolor="#E6F3FF"];\n')
-                dot_file.write(f'  "{file_node}" -> "{func_node}" [color="#666666"];\n')
-            
-            # Add class nodes and edges
-            for class_name, methods in analysis['classes'].items():
-                class_node = f"{file_node}_{class_name}"
-                dot_file.write(f'  "{class_node}" [label="{class_name}", style=filled, fillcolor="#D0F0C0", shape=box];\n')
-                dot_file.write(f'  "{file_node}" -> "{class_node}" [color="#666666"];\n')
-                
-                for method in methods:
-                    method_node = f"{class_node}->{method}"
-                    dot_file.write(f'  "{method_node}" [label="{method}()", style=filled, fillcolor="#F0F0F0"];\n')
-                    dot_file.write(f'  "{class_node}" -> "{method_node}" [color="#666666"];\n')
-        
-        # Add function call edges
-        for file_path in python_files:
-            rel_path = os.path.relpath(file_path, repo_path)
-            file_node = file_nodes[rel_path]
-            
-            analysis = analyze_python_file(file_path)
-            
-            # Process function calls
-            for caller, callees in analysis['function_calls'].items():
-                caller_parts = caller.split('.')
-                
-                if len(caller_parts) > 1 and caller_parts[0] in analysis['classes']:
-                    # It's a method in a class
-                    caller_node = f"{file_node}_{caller_parts[0]}->{caller_parts[1]}"
-                else:
-                    # It's a standalone function
-                    caller_node = f"{file_node}->{caller}"
-                
-                for callee in callees:
-                    # For now, we'll only add edges between functions within the same file
-                    # A more sophisticated approach would resolve cross-file calls
-                    callee_parts = callee.split('.')
-                    
-                    if len(callee_parts) > 1 and callee_parts[0] in analysis['classes']:
-                        # It's a method in a class
-                        callee_node = f"{file_node}_{callee_parts[0]}->{callee_parts[1]}"
-                        # Add edge only if the callee node exists
-                        dot_file.write(f'  "{caller_node}" -> "{callee_node}" [color="blue", style="dashed"];\n')
-                    elif callee in analysis['functions']:
-                        # It's a standalone function
-                        callee_node = f"{file_node}->{callee}"
-                        # Add edge
-                        dot_file.write(f'  "{caller_node}" -> "{callee_node}" [color="blue", style="dashed"];\n')
-        
-        # Write DOT file footer
-        dot_file.write('}\n')
-    
+    graph = build_call_graph(repo_path)
+
+    call_edges = [edge for edge in graph['edges'] if edge['kind'] == 'calls']
+    call_sites = sum(edge['count'] for edge in call_edges)
+    print(f"Merged {call_sites} call sites into {len(call_edges)} weighted call edges")
+
+    # Rank the full graph before any view prunes it, and keep the result as an artifact
+    graph['rankings'] = rank_graph(graph)
+    graph['entry_points'] = detect_entry_points(repo_path, graph)
+    save_graph_artifact(graph, graph_artifact_path(output_file))
+
+    if view:
+        graph = apply_view(graph, **view)
+
+    size = estimate_view_size(graph)
+    print(f"Call graph view: {size['nodes']} nodes, {size['edges']} edges, ~{size['dot_bytes'] // 1024} KB of DOT")
+    if size['nodes'] > RENDER_NODE_WARNING:
+        print(f"Warning: {size['nodes']} nodes will be slow to render. "
+              f"Consider --collapse, --top-k or --drop-leaves.", file=sys.stderr)
+
+    write_dot_file(graph, output_file)
     return True
 
 
@@ -311,8 +392,48 @@ def clone_github_repo(github_url, target_dir):
             raise ValueError(f"Failed to clone repository: {error_message}")
 
 
-def process_dataset(dataset_dir, output_dir):
-    """Process all repositories in the dataset directory."""
+def view_from_args(args):
+    """Build the view options for ``generate_dot_file`` from parsed CLI arguments."""
+    view = {
+        'collapse_to': args.collapse,
+        'top_k_nodes': args.top_k,
+        'rank_by': args.rank_by,
+        'drop_leaf_nodes': args.drop_leaves,
+        'max_edges_per_node': args.max_edges_per_node
+    }
+    # No view options means the full graph
+    if not any(value for key, value in view.items() if key != 'rank_by'):
+        return None
+    return view
+
+
+def render_formats(dot_files, args):
+    """Render DOT files to every requested image format concurrently."""
+    jobs = [(dot_file, fmt) for dot_file in dot_files for fmt in args.format if fmt != 'dot']
+    if not jobs:
+        return []
+    print(f"Rendering {len(jobs)} image(s) with up to {args.render_workers} workers...")
+    return render_many(jobs, engine=args.layout_engine, timeout=args.render_timeout,
+                       max_workers=args.render_workers)
+
+
+def generate_history_file(repo_path, output_dir, commit_range='HEAD', max_commits=None):
+    """Write the call graph history of a repository to <repo>.history.json and return its path."""
+    # Imported here because callgraph_history builds its graphs with this module
+    from callgraph_history import analyze_history, save_history
+
+    repo_name = os.path.basename(os.path.abspath(repo_path))
+    history = analyze_history(repo_path, commit_range, max_commits)
+    history_file = os.path.join(output_dir, f"{repo_name}.history.json")
+    save_history(history, history_file)
+    print(f"Analyzed {len(history['commits'])} commits ({history['distinct_blobs']} distinct Python files, "
+          f"{history['parsed_blobs']} newly parsed)")
+    print(f"Generated history file: {history_file}")
+    return history_file
+
+
+def process_dataset(dataset_dir, output_dir, view=None):
+    """Process all repositories in the dataset directory and return the generated DOT files."""
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
@@ -321,21 +442,25 @@ def process_dataset(dataset_dir, output_dir):
     
     if not repos:
         print(f"No repositories found in {dataset_dir}", file=sys.stderr)
-        return
+        return []
     
     print(f"Found {len(repos)} repositories in {dataset_dir}")
     
     # Process each repository
+    dot_files = []
     for repo_name in repos:
         repo_path = os.path.join(dataset_dir, repo_name)
         output_file = os.path.join(output_dir, f"{repo_name}.dot")
         
         print(f"Processing repository: {repo_name}")
         try:
-            generate_dot_file(repo_path, output_file)
+            if generate_dot_file(repo_path, output_file, view):
+                dot_files.append(output_file)
             print(f"Generated DOT file: {output_file}")
         except Exception as e:
             print(f"Error processing repository {repo_name}: {e}", file=sys.stderr)
+    
+    return dot_files
 
 
 def main():
@@ -351,12 +476,33 @@ def main():
                        help='Process a single repository (local path or GitHub URL)')
     parser.add_argument('--github-url', 
                        help='GitHub repository URL to clone and analyze')
-    parser.add_argument('--format', choices=['dot', 'png', 'svg'], default='dot',
-                       help='Output format (requires Graphviz for png/svg)')
+    parser.add_argument('--format', choices=['dot', 'png', 'svg'], nargs='+', default=['dot'],
+                       help='Output format(s) (requires Graphviz for png/svg)')
+    parser.add_argument('--layout-engine', choices=['auto', 'dot', 'sfdp'], default='auto',
+                       help='Graphviz layout engine (auto switches to sfdp for large graphs)')
+    parser.add_argument('--render-workers', type=int, default=DEFAULT_RENDER_WORKERS,
+                       help='Number of images rendered concurrently')
+    parser.add_argument('--render-timeout', type=int, default=DEFAULT_RENDER_TIMEOUT,
+                       help='Seconds before a single image render is aborted')
     parser.add_argument('--verbose', action='store_true',
                        help='Enable verbose output')
+    parser.add_argument('--collapse', choices=['module', 'package'],
+                       help='Collapse the call graph to module or package level')
+    parser.add_argument('--top-k', type=int,
+                       help='Keep only the top-k nodes by --rank-by')
+    parser.add_argument('--rank-by', choices=['fanin', 'centrality', 'pagerank', 'betweenness'], default='fanin',
+                       help='Ranking used by --top-k')
+    parser.add_argument('--drop-leaves', action='store_true',
+                       help='Drop leaf utilities (called by others, calling nothing)')
+    parser.add_argument('--max-edges-per-node', type=int,
+                       help='Keep at most this many outgoing call edges per node')
+    parser.add_argument('--history', metavar='RANGE',
+                       help='Also chart the call graph over a commit range (e.g. HEAD or v1.0..HEAD)')
+    parser.add_argument('--max-commits', type=int,
+                       help='Only chart the newest N commits of the --history range')
     
     args = parser.parse_args()
+    view = view_from_args(args)
     
     # Make sure the output directory exists
     os.makedirs(args.output, exist_ok=True)
@@ -378,21 +524,11 @@ def main():
                     
                     # Generate DOT file with simple naming convention as requested
                     output_file = os.path.join(args.output, f"{repo_name}.dot")
-                    if generate_dot_file(repo_path, output_file):
+                    if generate_dot_file(repo_path, output_file, view):
                         print(f"Generated DOT file: {output_file}")
                         
                         # Convert to other formats if requested
-                        if args.format in ['png', 'svg']:
-                            try:
-                                output_image = os.path.splitext(output_file)[0] + f".{args.format}"
-                                print(f"Converting DOT to {args.format.upper()}...")
-                                subprocess.run(['dot', f'-T{args.format}', output_file, '-o', output_image], 
-                                             check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                                print(f"Generated {args.format.upper()} file: {output_image}")
-                            except subprocess.CalledProcessError:
-                                print(f"Warning: Failed to convert DOT to {args.format.upper()}. Is Graphviz installed?", file=sys.stderr)
-                            except Exception as e:
-                                print(f"Error converting to {args.format.upper()}: {e}", file=sys.stderr)
+                        render_formats([output_file], args)
                     
                     # Return output information as JSON for API use
                     result = {
@@ -401,6 +537,9 @@ def main():
                         "dot_file": output_file,
                         "message": f"Callgraph generated successfully for {repo_name}"
                     }
+                    if args.history:
+                        result["history_file"] = generate_history_file(repo_path, args.output, args.history,
+                                                                       args.max_commits)
                     print(json.dumps(result))
                     
                 except Exception as e:
@@ -432,20 +571,14 @@ def main():
             os.makedirs(args.output, exist_ok=True)
             print(f"Processing single repository: {repo_path}")
             
-            if generate_dot_file(repo_path, output_file):
+            if generate_dot_file(repo_path, output_file, view):
                 print(f"Generated DOT file: {output_file}")
                 
                 # Convert to other formats if requested
-                if args.format in ['png', 'svg']:
-                    try:
-                        output_image = os.path.splitext(output_file)[0] + f".{args.format}"
-                        subprocess.run(['dot', f'-T{args.format}', output_file, '-o', output_image], 
-                                      check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        print(f"Generated {args.format.upper()} file: {output_image}")
-                    except subprocess.CalledProcessError:
-                        print(f"Warning: Failed to convert DOT to {args.format.upper()}. Is Graphviz installed?", file=sys.stderr)
-                    except Exception as e:
-                        print(f"Error converting to {args.format.upper()}: {e}", file=sys.stderr)
+                render_formats([output_file], args)
+            
+            if args.history:
+                generate_history_file(repo_path, args.output, args.history, args.max_commits)
             
         elif args.dataset:
             # Process all repositories in the dataset
@@ -456,7 +589,10 @@ def main():
                 print(f"Error: Dataset directory '{dataset_dir}' is not a valid directory.", file=sys.stderr)
                 sys.exit(1)
             
-            process_dataset(dataset_dir, output_dir)
+            dot_files = process_dataset(dataset_dir, output_dir, view)
+            
+            # Render all repositories together once their DOT files exist
+            render_formats(dot_files, args)
         else:
             print("Error: No input specified. Use --single-repo, --github-url, or --dataset.", file=sys.stderr)
             sys.exit(1)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP Client for Inference APIs
+
+One ``requests`` session per process with keep-alive connection pooling, so
+repeated calls reuse their TLS connections, plus:
+
+- explicit (connect, read) timeouts on every call
+- retries with jittered exponential backoff on connection errors (including
+  connect timeouts) and 429/5xx responses; a read timeout is not retried, as
+  the server already spent the whole timeout on the request
+- server hints honored before backing off blindly: ``Retry-After`` headers and
+  the ``estimated_time`` that Hugging Face returns with 503 "model is loading"
+- a latency record per call (duration, attempts, final status), summarized
+  when the process exits
+"""
+
+import time
+import atexit
+import random
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Seconds to wait for a connection and for the response
+DEFAULT_TIMEOUT = (10, 300)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+
+# Never sleep longer than this between attempts, whatever the server asks for
+MAX_RETRY_DELAY = 120.0
+
+# Responses worth retrying: rate limited, or the server/model isn't ready yet
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Number of latency records kept per client
+LATENCY_HISTORY = 1000
+
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class InferenceHTTPClient:
+    """Session-backed HTTP client with pooling, timeouts, retries and latency records."""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            pool_size: Keep-alive connections kept per host
+            max_retries: Retries after the first attempt
+            backoff: Base delay in seconds, doubled on every retry
+            timeout: Default (connect, read) timeout in seconds
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries are handled here, where server hints can be honored
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+        self._latencies_lock = threading.Lock()
+
+    def retry_delay(self, attempt, response=None):
+        """
+        Return the seconds to wait before retrying.
+
+        Server hints (Retry-After, estimated_time) are used when present, with a
+        little jitter; otherwise the delay is exponential with full jitter.
+        """
+        hint = None
+        if response is not None:
+            hint = _retry_after_seconds(response.headers.get("Retry-After"))
+            if hint is None and response.status_code == 503:
+                try:
+                    hint = float(response.json().get("estimated_time"))
+                except (ValueError, TypeError, AttributeError):
+                    hint = None
+
+        if hint is not None and hint > 0:
+            delay = hint + random.uniform(0, 1)
+        else:
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+        return min(delay, MAX_RETRY_DELAY)
+
+    def _record(self, url, started, attempts, status):
+        record = {
+            'url': url,
+            'seconds': time.time() - started,
+            'attempts': attempts,
+            'status': status
+        }
+        with self._latencies_lock:
+            self.latencies.append(record)
+        return record
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Send a request, retrying transient failures.
+
+        Returns:
+            The final response (which may still be an error status once retries run out),
+            with its latency record attached as ``response.latency``
+
+        Raises:
+            requests.RequestException: If every attempt failed to get a response
+        """
+        timeout = timeout or self.timeout
+        started = time.time()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                if attempt == self.max_retries:
+                    self._record(url, started, attempt + 1, None)
+                    raise
+                delay = self.retry_delay(attempt)
+                print(f"Request to {url} failed ({type(e).__name__}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self.retry_delay(attempt, response)
+                print(f"Request to {url} returned {response.status_code}; retrying in {delay:.1f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+
+            response.latency = self._record(url, started, attempt + 1, response.status_code)
+            return response
+
+    def post(self, url, **kwargs):
+        """Send a POST request (see ``request``)."""
+        return self.request("POST", url, **kwargs)
+
+    def latency_summary(self):
+        """Summarize the recorded calls: count, mean/p50/p95 seconds and retried calls."""
+        with self._latencies_lock:
+            records = list(self.latencies)
+        if not records:
+            return {'calls': 0}
+
+        durations = sorted(record['seconds'] for record in records)
+        return {
+            'calls': len(records),
+            'mean_seconds': sum(durations) / len(durations),
+            'p50_seconds': durations[len(durations) // 2],
+            'p95_seconds': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            'retried_calls': sum(1 for record in records if record['attempts'] > 1),
+            'failed_calls': sum(1 for record in records if record['status'] != 200)
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the client shared by this process."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceHTTPClient()
+            atexit.register(report_latency, _client)
+        return _client
+
+
+def report_latency(client):
+    """Print the latency summary of a client's calls, if it made any."""
+    summary = client.latency_summary()
+    if not summary['calls']:
+        return
+    print(f"API calls: {summary['calls']} (mean {summary['mean_seconds']:.2f}s, "
+          f"p50 {summary['p50_seconds']:.2f}s, p95 {summary['p95_seconds']:.2f}s, "
+          f"{summary['retried_calls']} retried, {summary['failed_calls']} failed)")
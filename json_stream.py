@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON Reader
+
+Reads selected fields from large JSON analysis artifacts without loading the
+whole document. The file is read in fixed-size chunks and walked object by
+object; values that aren't needed (function source code, mostly) are skipped
+by scanning past them, so they are never decoded or held in memory. Memory
+use depends on the chunk size and the fields kept, not on the file size.
+
+Usage:
+  python json_stream.py FUNCTION_SUMMARIES_FOLDER/repo.json --depth 3 --fields summary
+"""
+
+import re
+import sys
+import json
+import argparse
+
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Runs of string content: anything but quotes and backslashes, or an escape pair
+STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL)
+# Inside containers, only quotes and brackets matter for finding the end
+STRUCTURE = re.compile(r'[^"{}\[\]]*')
+SCALAR = re.compile(r'[^,}\]\s]*')
+
+
+class JSONStreamReader:
+    """Walks a JSON document from a text file, one value at a time."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def _fill(self):
+        """Drop the consumed part of the buffer and read another chunk; return False at EOF."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end of the file)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char):
+        if self.peek() != char:
+            raise self._error(f"Expected {char!r}")
+        self.pos += 1
+
+    def iter_object(self):
+        """
+        Iterate over the keys of the object at the current position.
+
+        The caller must consume each key's value (with ``read_value``,
+        ``skip_value`` or a nested ``iter_object``) before asking for the next key.
+        """
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise self._error("Expected an object key")
+            self._expect(':')
+            yield key
+            next_char = self.peek()
+            self.pos += 1
+            if next_char == '}':
+                return
+            if next_char != ',':
+                self.pos -= 1
+                raise self._error("Expected ',' or '}'")
+
+    def read_value(self):
+        """Decode and return the value at the current position."""
+        if self.peek() not in '"{[':
+            # A number or literal cut at the buffer edge can still decode ("1.5e" as 1.5)
+            while SCALAR.match(self.buffer, self.pos).end() == len(self.buffer) and self._fill():
+                pass
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                # The value may continue in the next chunk
+                if not self._fill():
+                    raise
+
+    def _skip_string(self):
+        """Move past the string starting at the current position without building it."""
+        self.pos += 1
+        while True:
+            self.pos = STRING_BODY.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) and self.buffer[self.pos] == '"':
+                self.pos += 1
+                return
+            # End of the buffer, possibly in the middle of an escape pair
+            if not self._fill():
+                raise self._error("Unterminated string")
+
+    def skip_value(self):
+        """Move past the value at the current position without decoding it."""
+        char = self.peek()
+        if char == '"':
+            self._skip_string()
+        elif char in '{[':
+            depth = 0
+            while True:
+                self.pos = STRUCTURE.match(self.buffer, self.pos).end()
+                if self.pos == len(self.buffer):
+                    if not self._fill():
+                        raise self._error("Unterminated object or array")
+                    continue
+                char = self.buffer[self.pos]
+                if char == '"':
+                    self._skip_string()
+                    continue
+                self.pos += 1
+                depth += 1 if char in '{[' else -1
+                if depth == 0:
+                    return
+        elif char:
+            while True:
+                self.pos = SCALAR.match(self.buffer, self.pos).end()
+                if self.pos < len(self.buffer) or not self._fill():
+                    return
+        else:
+            raise self._error("Unexpected end of file")
+
+
+def _read_level(reader, depth, fields):
+    """Read ``depth`` levels of nested objects, keeping only ``fields`` of the innermost ones."""
+    result = {}
+    for key in reader.iter_object():
+        if reader.peek() != '{':
+            # Not the expected layout; keep going rather than failing the whole file
+            reader.skip_value()
+        elif depth > 1:
+            result[key] = _read_level(reader, depth - 1, fields)
+        else:
+            result[key] = leaf = {}
+            for field in reader.iter_object():
+                if field in fields:
+                    leaf[field] = reader.read_value()
+                else:
+                    reader.skip_value()
+    return result
+
+
+def load_fields(path, depth, fields, chunk_size=CHUNK_SIZE):
+    """
+    Load nested objects from a JSON file, keeping only some fields of the innermost objects.
+
+    Args:
+        path: JSON file whose top level is an object
+        depth: Levels of objects above the innermost ones, e.g. 3 for
+            {folder: {file: {function: {...}}}}
+        fields: Fields to keep from the innermost objects; all others are skipped
+        chunk_size: Characters read from the file at a time
+
+    Returns:
+        The nested dictionaries, with the innermost objects holding the kept fields
+
+    Raises:
+        json.JSONDecodeError: If the file isn't valid JSON
+    """
+    fields = set(fields)
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = JSONStreamReader(f, chunk_size)
+        result = _read_level(reader, depth, fields)
+        if reader.peek():
+            raise reader._error("Extra data after the top-level object")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print selected fields of a large nested JSON artifact')
+    parser.add_argument('path', help='Path to the JSON file')
+    parser.add_argument('--depth', type=int, required=True, help='Levels of objects above the innermost ones')
+    parser.add_argument('--fields', nargs='+', required=True, help='Fields to keep from the innermost objects')
+
+    args = parser.parse_args()
+
+    try:
+        print(json.dumps(load_fields(args.path, args.depth, args.fields), indent=2))
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.path}: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Llama Inference Backends
+
+Text generation backends for LlamaREADMEGenerator. Every backend exposes the
+same ``generate`` and ``stream`` methods and raises InferenceError when
+generation fails, so a failure can never end up saved as README content.
+``stream`` yields text as the model produces it.
+
+- hf-api: the hosted Hugging Face Inference API, through the shared pooled
+  client in http_client.py (timeouts, retries while the model is loading)
+- transformers: a local model on the CPU, with its linear layers dynamically
+  quantized to int8
+- llama-cpp: a local GGUF model through the llama-cpp-python bindings
+  (optional dependency: pip install llama-cpp-python)
+
+Local models are loaded once per process and shared by every backend instance
+that asks for the same model.
+"""
+
+import os
+import json
+import threading
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+import requests
+
+from http_client import get_client, DEFAULT_TIMEOUT
+
+
+DEFAULT_HF_MODEL = "meta-llama/Llama-2-7b-chat-hf"
+HF_API_URL = f"https://api-inference.huggingface.co/models/{DEFAULT_HF_MODEL}"
+
+# Context window for llama.cpp models (Llama 2 was trained with 4096 tokens)
+DEFAULT_CONTEXT_SIZE = 4096
+
+BACKENDS = ('hf-api', 'transformers', 'llama-cpp')
+
+# Local models already loaded by this process, keyed by backend and options
+_model_cache: Dict[Tuple, Any] = {}
+_model_cache_lock = threading.Lock()
+
+
+class InferenceError(Exception):
+    """Raised when a backend fails to generate text."""
+
+
+def _cached_model(key: Tuple, loader):
+    """Return the model cached under ``key``, loading it with ``loader`` on first use."""
+    with _model_cache_lock:
+        if key not in _model_cache:
+            _model_cache[key] = loader()
+        return _model_cache[key]
+
+
+class LlamaBackend:
+    """Interface shared by all text generation backends."""
+
+    name = "base"
+
+    def generate(self, prompt: str, max_new_tokens: int = 2048,
+                 temperature: float = 0.7, top_p: float = 0.9) -> str:
+        """
+        Generate a continuation of the prompt.
+
+        Returns:
+            The generated text, without the prompt
+
+        Raises:
+            InferenceError: If generation fails or produces no text
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str, max_new_tokens: int = 2048,
+               temperature: float = 0.7, top_p: float = 0.9) -> Iterator[str]:
+        """
+        Generate a continuation of the prompt, yielding text as it is produced.
+
+        Backends without incremental output yield the whole text at once.
+
+        Raises:
+            InferenceError: If generation fails, possibly after some text was yielded
+        """
+        yield self.generate(prompt, max_new_tokens, temperature, top_p)
+
+
+class HuggingFaceAPIBackend(LlamaBackend):
+    """Generates text with the hosted Hugging Face Inference API."""
+
+    name = "hf-api"
+
+    def __init__(self, hf_token: Optional[str] = None, api_url: str = HF_API_URL,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.headers = {
+            "Authorization": f"Bearer {hf_token}",
+            "Content-Type": "application/json"
+        }
+
+    def _post(self, prompt: str, max_new_tokens: int, temperature: float, top_p: float, stream: bool = False):
+        """
+        Send a generation request and return the successful response.
+
+        Connection errors and 429/5xx responses (including 503 while the model
+        is loading) are retried by the shared client before failing. A read
+        timeout is not retried, since the endpoint may still be generating and
+        a second POST would only queue more work; it fails with InferenceError.
+        """
+        payload = {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "top_p": top_p,
+                "do_sample": True
+            },
+            "stream": stream
+        }
+
+        try:
+            response = get_client().post(self.api_url, headers=self.headers, json=payload,
+                                         timeout=self.timeout, stream=stream)
+        except requests.Timeout:
+            raise InferenceError(f"API request timed out after {self.timeout[1]}s")
+        except requests.RequestException as e:
+            raise InferenceError(f"API request failed: {str(e)}")
+
+        latency = response.latency
+        print(f"API responded with {response.status_code} in {latency['seconds']:.1f}s "
+              f"after {latency['attempts']} attempt(s)")
+        if response.status_code != 200:
+            raise InferenceError(f"API returned status code {response.status_code}: {response.text[:200]}")
+        return response
+
+    def generate(self, prompt: str, max_new_tokens: int = 2048,
+                 temperature: float = 0.7, top_p: float = 0.9) -> str:
+        response = self._post(prompt, max_new_tokens, temperature, top_p)
+
+        result = response.json()
+        if not isinstance(result, list) or not result:
+            raise InferenceError(f"Unexpected API response format: {str(result)[:200]}")
+
+        generated_text = result[0].get('generated_text', '')
+        # Remove the input prompt from the generated text
+        if generated_text.startswith(prompt):
+            generated_text = generated_text[len(prompt):]
+        generated_text = generated_text.strip()
+        if not generated_text:
+            raise InferenceError("API returned no generated text")
+        return generated_text
+
+    def stream(self, prompt: str, max_new_tokens: int = 2048,
+               temperature: float = 0.7, top_p: float = 0.9) -> Iterator[str]:
+        """Stream tokens from the API's server-sent events (one ``data:`` line per token)."""
+        response = self._post(prompt, max_new_tokens, temperature, top_p, stream=True)
+        produced = False
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if "error" in event:
+                    raise InferenceError(f"API stream failed: {event['error']}")
+                token = event.get("token") or {}
+                if token.get("text") and not token.get("special"):
+                    produced = True
+                    yield token["text"]
+        except requests.RequestException as e:
+            raise InferenceError(f"API stream interrupted: {str(e)}")
+        except ValueError as e:
+            raise InferenceError(f"Malformed API stream event: {str(e)}")
+        finally:
+            response.close()
+
+        if not produced:
+            raise InferenceError("API returned no generated text")
+
+
+class TransformersCPUBackend(LlamaBackend):
+    """Generates text with a local transformers model quantized to int8 for the CPU."""
+
+    name = "transformers"
+
+    def __init__(self, model_path: str = DEFAULT_HF_MODEL, quantize: bool = True, num_threads: Optional[int] = None):
+        self.model_path = model_path
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.model, self.tokenizer = _cached_model((self.name, model_path, quantize), self._load)
+
+    def _load(self):
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError as e:
+            raise InferenceError(f"The transformers backend needs torch and transformers: {str(e)}")
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        print(f"Loading {self.model_path} on the CPU...")
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+            model = AutoModelForCausalLM.from_pretrained(self.model_path, torch_dtype=torch.float32)
+        except Exception as e:
+            raise InferenceError(f"Could not load model {self.model_path}: {str(e)}")
+        model.eval()
+
+        if self.quantize:
+            # Dynamic int8 quantization of the linear layers: no calibration data, runs on any CPU
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print("Model quantized to int8")
+        return model, tokenizer
+
+    def generate(self, prompt: str, max_new_tokens: int = 2048,
+                 temperature: float = 0.7, top_p: float = 0.9) -> str:
+        import torch
+
+        try:
+            inputs = self.tokenizer(prompt, return_tensors="pt")
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    temperature=temperature,
+                    top_p=top_p,
+                    do_sample=True
+                )
+        except Exception as e:
+            raise InferenceError(f"Local generation failed: {str(e)}")
+
+        # Decode only the new tokens so the prompt never leaks into the output
+        new_tokens = outputs[0][inputs["input_ids"].shape[1]:]
+        generated_text = self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+        if not generated_text:
+            raise InferenceError("Local model generated no text")
+        return generated_text
+
+    def stream(self, prompt: str, max_new_tokens: int = 2048,
+               temperature: float = 0.7, top_p: float = 0.9) -> Iterator[str]:
+        """Stream text through a TextIteratorStreamer while generate() runs in a thread."""
+        import torch
+        from transformers import TextIteratorStreamer
+
+        inputs = self.tokenizer(prompt, return_tensors="pt")
+        # skip_prompt works on token ids, so the prompt is never decoded back
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run():
+            try:
+                with torch.no_grad():
+                    self.model.generate(**inputs, streamer=streamer, max_new_tokens=max_new_tokens,
+                                        temperature=temperature, top_p=top_p, do_sample=True)
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        produced = False
+        for text in streamer:
+            if text:
+                produced = True
+                yield text
+        thread.join()
+
+        if errors:
+            raise InferenceError(f"Local generation failed: {str(errors[0])}")
+        if not produced:
+            raise InferenceError("Local model generated no text")
+
+
+class LlamaCppBackend(LlamaBackend):
+    """Generates text with a local quantized GGUF model through llama-cpp-python."""
+
+    name = "llama-cpp"
+
+    def __init__(self, model_path: str, n_ctx: int = DEFAULT_CONTEXT_SIZE, num_threads: Optional[int] = None):
+        if not model_path:
+            raise InferenceError("The llama-cpp backend needs --model-path pointing to a GGUF file")
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.num_threads = num_threads
+        self.llm = _cached_model((self.name, model_path, n_ctx, num_threads), self._load)
+
+    def _load(self):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise InferenceError("The llama-cpp backend needs llama-cpp-python (pip install llama-cpp-python)")
+
+        print(f"Loading {self.model_path} with llama.cpp...")
+        try:
+            return Llama(model_path=self.model_path, n_ctx=self.n_ctx,
+                         n_threads=self.num_threads or os.cpu_count(), verbose=False)
+        except Exception as e:
+            raise InferenceError(f"Could not load model {self.model_path}: {str(e)}")
+
+    def generate(self, prompt: str, max_new_tokens: int = 2048,
+                 temperature: float = 0.7, top_p: float = 0.9) -> str:
+        try:
+            result = self.llm(prompt, max_tokens=max_new_tokens, temperature=temperature, top_p=top_p)
+        except Exception as e:
+            raise InferenceError(f"llama.cpp generation failed: {str(e)}")
+
+        generated_text = result["choices"][0]["text"].strip()
+        if not generated_text:
+            raise InferenceError("llama.cpp generated no text")
+        return generated_text
+
+    def stream(self, prompt: str, max_new_tokens: int = 2048,
+               temperature: float = 0.7, top_p: float = 0.9) -> Iterator[str]:
+        produced = False
+        try:
+            for chunk in self.llm(prompt, max_tokens=max_new_tokens, temperature=temperature,
+                                  top_p=top_p, stream=True):
+                text = chunk["choices"][0]["text"]
+                if text:
+                    produced = True
+                    yield text
+        except Exception as e:
+            raise InferenceError(f"llama.cpp generation failed: {str(e)}")
+
+        if not produced:
+            raise InferenceError("llama.cpp generated no text")
+
+
+def get_backend(name: str = "hf-api", hf_token: Optional[str] = None, model_path: Optional[str] = None,
+                timeout: Tuple[float, float] = DEFAULT_TIMEOUT, num_threads: Optional[int] = None) -> LlamaBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: 'hf-api', 'transformers' or 'llama-cpp'
+        hf_token: HuggingFace API token (hf-api only)
+        model_path: Local model directory, hub id or GGUF file (local backends)
+        timeout: (connect, read) timeout in seconds (hf-api only)
+        num_threads: CPU threads used by local backends (default: all cores)
+
+    Raises:
+        InferenceError: If the backend is unknown or its model can't be loaded
+    """
+    if name == "hf-api":
+        return HuggingFaceAPIBackend(hf_token, timeout=timeout)
+    if name == "transformers":
+        return TransformersCPUBackend(model_path or DEFAULT_HF_MODEL, num_threads=num_threads)
+    if name == "llama-cpp":
+        return LlamaCppBackend(model_path, num_threads=num_threads)
+    raise InferenceError(f"Unknown backend: {name} (choose from {', '.join(BACKENDS)})")
@@ -3,7 +3,17 @@
 Llama Inference Script for README Generation
 
 This script takes repository analysis data, function summaries, and call graph information
-to generate comprehensive README files using the Meta Llama 2 model.
+to generate comprehensive README files using the Meta Llama 2 model, either through the
+Hugging Face Inference API or a local quantized CPU model (see llama_backends.py).
+
+For large repositories, map-reduce mode first summarizes every folder on its own
+(concurrently, with results cached by the hash of their inputs) and then writes
+the README from those folder summaries.
+
+With a deadline, the caller gets a README within N seconds: the template
+fallback (or the last generated README) if the model is still running. The
+model's README replaces it atomically once ready, and a version record next to
+the README (llama_<repo>.md.version.json) tells pollers when that happened.
 """
 
 import os
@@ -11,47 +21,148 @@ import json
 import sys
 import argparse
 import re
-from typing import Dict, Any, List, Optional
-import requests
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 from urllib.parse import urlparse
 
+from llama_backends import get_backend, InferenceError, BACKENDS, DEFAULT_TIMEOUT
+from prompt_packer import PromptPacker, TokenCounter
+from callgraph_digest import build_digest
+from json_stream import load_fields
+from response_cache import get_cache
+
+# Llama 2 context window, shared by the prompt and the generated README
+DEFAULT_CONTEXT_WINDOW = 4096
+DEFAULT_MAX_NEW_TOKENS = 2048
+
+# Packed prompt sections, in the order they appear in the prompt
+PROMPT_SECTIONS = ["Entry Points:", "Folder Summaries:", "Call Graph:", "Key Functions:", "Modules:", "Dependencies:", "Repository Structure:"]
+
+# Fields read from the analysis artifacts; everything else (source code above all) is skipped
+ANALYSIS_FIELDS = ('imports', 'module_docstring')
+SUMMARY_FIELDS = ('summary',)
+
 # Constants
-README_FOLDER = os.path.join(os.getcwd(), "README_FOLDER")
+# Where READMEs are written; model_api serves them from the same folder
+README_FOLDER = os.environ.get("README_FOLDER", os.path.join(os.getcwd(), "README_FOLDER"))
 os.makedirs(README_FOLDER, exist_ok=True)
 
+# Map-reduce mode: tokens per folder summary and concurrent map calls
+MAP_MAX_NEW_TOKENS = 256
+DEFAULT_MAP_WORKERS = 4
+
+_version_lock = threading.Lock()
+
+
+def _atomic_write(path: str, content: str):
+    """Write a file through a temporary file and a rename, so readers never see it half-written."""
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def readme_version_path(readme_path: str) -> str:
+    """Return the path of a README's version record."""
+    return f"{readme_path}.version.json"
+
+
+def read_readme_version(readme_path: str) -> Dict[str, Any]:
+    """
+    Return the version record of a README.
+    
+    The record has the 'version' (increases whenever the content changes), the
+    'source' of the content ('model' or 'fallback'), whether a model README is
+    still 'pending', and when the content was 'updated_at'.
+    """
+    try:
+        with open(readme_version_path(readme_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': 0, 'source': None, 'pending': False, 'updated_at': None}
+
+
+def update_readme_version(readme_path: str, bump: bool = False, **fields) -> Dict[str, Any]:
+    """Update fields of a README's version record; ``bump`` marks new content with a new version."""
+    with _version_lock:
+        record = read_readme_version(readme_path)
+        record.update(fields)
+        if bump:
+            # Millisecond timestamps keep versions increasing across processes
+            record['version'] = max(record['version'] + 1, int(time.time() * 1000))
+            record['updated_at'] = time.time()
+        _atomic_write(readme_version_path(readme_path), json.dumps(record))
+    return record
+
+
+def spawn_background(argv: List[str], log_path: str) -> subprocess.Popen:
+    """Run this script again with ``argv``, detached so it outlives the process that waits for us."""
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    with open(log_path, 'a', encoding='utf-8') as log:
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__)] + argv,
+                                stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **kwargs)
+
 class LlamaREADMEGenerator:
     """Generate README using Llama 2 model based on repository analysis."""
     
-    def __init__(self, repo_url: str, hf_token: str = None):
+    def __init__(self, repo_url: str, hf_token: str = None, backend: str = "hf-api",
+                 model_path: str = None, timeout: float = None, context_window: int = DEFAULT_CONTEXT_WINDOW,
+                 max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS, tokenizer: str = None,
+                 map_workers: int = DEFAULT_MAP_WORKERS):
         """
         Initialize the README generator with repository URL and optional HuggingFace token.
         
         Args:
             repo_url: URL to the GitHub repository
             hf_token: HuggingFace API token for accessing Llama model
+            backend: Inference backend ('hf-api', 'transformers' or 'llama-cpp')
+            model_path: Local model for the transformers and llama-cpp backends
+            timeout: Seconds to wait for the hosted API to respond
+            context_window: Model context size in tokens, shared by prompt and output
+            max_new_tokens: Tokens reserved for the generated README
+            tokenizer: Tokenizer used to measure the prompt (defaults to the local
+                       transformers model; otherwise token counts are estimated)
+            map_workers: Concurrent folder summaries in map-reduce mode (hosted API only)
         """
         self.repo_url = repo_url
         self.repo_name = repo_url.split('/')[-1]
         self.hf_token = hf_token
+        self.backend_name = backend
+        self.model_path = model_path
+        self.timeout = (DEFAULT_TIMEOUT[0], timeout) if timeout else DEFAULT_TIMEOUT
+        self.context_window = context_window
+        self.max_new_tokens = max_new_tokens
+        if tokenizer is None and backend == "transformers":
+            tokenizer = model_path
+        self.tokenizer_name = tokenizer
+        self.map_workers = max(1, map_workers)
         
         # Paths to analysis files
         self.repo_analysis_path = os.path.join("REPO_ANALYSIS_FOLDER", f"{self.repo_name}.json")
         self.function_summaries_path = os.path.join("FUNCTION_SUMMARIES_FOLDER", f"{self.repo_name}.json")
         self.callgraph_path = os.path.join("CALLGRAPHS_FOLDER", f"{self.repo_name}.dot")
+        self.callgraph_graph_path = os.path.join("CALLGRAPHS_FOLDER", f"{self.repo_name}.graph.json")
         
         # Output path for README
         self.readme_output_path = os.path.join(README_FOLDER, f"llama_{self.repo_name}.md")
-        
-        # Hugging Face API endpoint
-        self.api_url = "https://api-inference.huggingface.co/models/meta-llama/Llama-2-7b-chat-hf"
-        self.headers = {
-            "Authorization": f"Bearer {self.hf_token}",
-            "Content-Type": "application/json"
-        }
+        # Streamed README text is appended here until generation completes
+        self.readme_partial_path = f"{self.readme_output_path}.partial"
     
     def load_analysis_data(self) -> Dict[str, Any]:
-        """Load and combine all repository analysis data for input to the model."""
+        """
+        Load and combine all repository analysis data for input to the model.
+        
+        The analysis and summary files are streamed, keeping only the fields the
+        prompt uses; function source code in them is skipped without being loaded.
+        """
         data = {
             "repo_url": self.repo_url,
             "repo_name": self.repo_name
@@ -59,8 +170,8 @@ class LlamaREADMEGenerator:
         
         # Load repository structure and analysis
         if os.path.exists(self.repo_analysis_path):
-            with open(self.repo_analysis_path, 'r', encoding='utf-8') as f:
-                data["repo_analysis"] = json.load(f)
+            # {folder: {file: {...}}}
+            data["repo_analysis"] = load_fields(self.repo_analysis_path, 2, ANALYSIS_FIELDS)
             print("Repository analysis data loaded successfully.")
         else:
             print(f"Warning: Repository analysis file not found at {self.repo_analysis_path}")
@@ -68,36 +179,166 @@ class LlamaREADMEGenerator:
         
         # Load function summaries
         if os.path.exists(self.function_summaries_path):
-            with open(self.function_summaries_path, 'r', encoding='utf-8') as f:
-                data["function_summaries"] = json.load(f)
+            # {folder: {file: {function: {...}}}}
+            data["function_summaries"] = load_fields(self.function_summaries_path, 3, SUMMARY_FIELDS)
             print("Function summaries loaded successfully.")
         else:
             print(f"Warning: Function summaries file not found at {self.function_summaries_path}")
             data["function_summaries"] = {}
         
-        # Load call graph file as text
-        if os.path.exists(self.callgraph_path):
-            with open(self.callgraph_path, 'r', encoding='utf-8') as f:
-                data["callgraph"] = f.read()
+        # Load the call graph model with its function rankings; the raw DOT file is
+        # far too verbose for the prompt, so the graph goes in as a digest instead
+        if os.path.exists(self.callgraph_graph_path):
+            with open(self.callgraph_graph_path, 'r', encoding='utf-8') as f:
+                data["callgraph_graph"] = json.load(f)
+            # Entry points get their own prompt section
+            data["callgraph_digest"] = build_digest(data["callgraph_graph"], entry_points=0)
             print("Call graph data loaded successfully.")
         else:
-            print(f"Warning: Call graph file not found at {self.callgraph_path}")
-            data["callgraph"] = ""
+            print(f"Warning: Call graph file not found at {self.callgraph_graph_path}")
+            data["callgraph_graph"] = {}
+            data["callgraph_digest"] = ""
         
         return data
     
-    def generate_prompt(self, data: Dict[str, Any]) -> str:
-        """Generate a well-crafted prompt for Llama based on analysis data."""
-        # Extract key structural information for a more concise prompt
-        # Get folder structure
-        folders = list(data['repo_analysis'].keys()) if 'repo_analysis' in data else []
+    def rank_key_functions(self, data: Dict[str, Any], key_functions: List[Dict[str, str]],
+                           limit: int = 10, score: str = "pagerank") -> List[Dict[str, str]]:
+        """
+        Order summarized functions by their call graph ranking.
         
-        # Count Python files
-        python_file_count = 0
-        for folder in folders:
-            python_file_count += len(data['repo_analysis'].get(folder, {}))
+        Functions are taken from the precomputed ranking (highest score first)
+        until ``limit`` summarized functions are found; unranked functions fill
+        any remaining slots in their original order.
+        
+        Args:
+            data: Analysis data from load_analysis_data
+            key_functions: Summarized functions with 'path', 'name' and 'summary'
+            limit: Number of functions to return
+            score: Ranking to use ('pagerank', 'in_degree' or 'betweenness')
             
-        # Extract key functions
+        Returns:
+            Up to ``limit`` functions, most important first
+        """
+        graph = data.get('callgraph_graph') or {}
+        ranking = graph.get('rankings', {}).get(score, [])
+        nodes = graph.get('nodes', {})
+        
+        by_location = {(func['path'].replace('\\', '/'), func['name']): func for func in key_functions}
+        selected = []
+        seen = set()
+        for node_id, _ in ranking:
+            if len(selected) >= limit:
+                break
+            node = nodes.get(node_id, {})
+            location = (node.get('file', '').replace('\\', '/'), node.get('name'))
+            if location in by_location and location not in seen:
+                seen.add(location)
+                selected.append(by_location[location])
+        
+        for func in key_functions:
+            if len(selected) >= limit:
+                break
+            location = (func['path'].replace('\\', '/'), func['name'])
+            if location not in seen:
+                seen.add(location)
+                selected.append(func)
+        
+        return selected
+    
+    def dependency_names(self, data: Dict[str, Any]) -> List[str]:
+        """Return the third-party modules imported by the repository, most used first."""
+        local_names = set()
+        for folder, files in data.get('repo_analysis', {}).items():
+            local_names.update(part for part in re.split(r'[\\/]', folder) if part not in ('', '.'))
+            local_names.update(os.path.splitext(file_name)[0] for file_name in files)
+        stdlib = getattr(sys, 'stdlib_module_names', set())
+        
+        counts = {}
+        for files in data.get('repo_analysis', {}).values():
+            for file_info in files.values():
+                for imported in file_info.get('imports', []):
+                    # Entries look like "os", "from pkg.mod import name" or "import name"
+                    parts = imported.split()
+                    module = parts[1] if parts[0] in ('from', 'import') and len(parts) > 1 else parts[0]
+                    top_level = module.split('.')[0]
+                    if top_level and top_level not in local_names and top_level not in stdlib:
+                        counts[top_level] = counts.get(top_level, 0) + 1
+        
+        return sorted(counts, key=lambda name: (-counts[name], name))
+    
+    def pack_context(self, data: Dict[str, Any], key_functions: List[Dict[str, str]], budget: int,
+                     folder_summaries: Optional[Dict[str, str]] = None) -> str:
+        """
+        Pack the most informative analysis data into ``budget`` tokens.
+        
+        Items are valued roughly as: the top entry points, then folder summaries
+        from the map step (if any), then the call graph
+        digest and the dependency list, then functions and module docstrings by call graph rank (each list
+        loses value as it goes down, so they interleave), then folders.
+        """
+        packer = PromptPacker(budget, TokenCounter(self.tokenizer_name))
+        graph = data.get('callgraph_graph') or {}
+        nodes = graph.get('nodes', {})
+        summaries = {(func['path'].replace('\\', '/'), func['name']): func['summary'] for func in key_functions}
+        
+        # Entry points by PageRank; values decay so a long route list can't crowd out everything else
+        entry_points = graph.get('entry_points', {})
+        ordered = sorted(entry_points, key=lambda node_id: -nodes.get(node_id, {}).get('scores', {}).get('pagerank', 0.0))
+        for rank, node_id in enumerate(ordered):
+            node = nodes.get(node_id, {})
+            location = (node.get('file', '').replace('\\', '/'), node.get('name'))
+            summary = summaries.get(location)
+            line = f"- {location[1]} ({location[0]}, {entry_points[node_id]})"
+            packer.add("Entry Points:", f"{line}: {summary}" if summary else line, 100 - rank)
+        
+        if data.get('callgraph_digest'):
+            packer.add("Call Graph:", data['callgraph_digest'], 85)
+        
+        dependencies = self.dependency_names(data)
+        if dependencies:
+            packer.add("Dependencies:", ", ".join(dependencies), 90)
+        
+        # Every function is offered, most important first; the budget decides how many fit
+        for rank, func in enumerate(self.rank_key_functions(data, key_functions, limit=len(key_functions))):
+            packer.add("Key Functions:", f"- {func['name']} ({func['path']}): {func['summary']}", 80 - rank)
+        
+        # Modules are ordered by the summed PageRank of their functions
+        module_rank = {}
+        for node in nodes.values():
+            file_path = node.get('file', '').replace('\\', '/')
+            module_rank[file_path] = module_rank.get(file_path, 0.0) + node.get('scores', {}).get('pagerank', 0.0)
+        docstrings = []
+        for folder, files in data.get('repo_analysis', {}).items():
+            for file_name, file_info in files.items():
+                docstring = (file_info.get('module_docstring') or '').strip()
+                if docstring:
+                    path = f"{folder}/{file_name}" if folder != "." else file_name
+                    # The first paragraph usually says what the module is for
+                    docstrings.append((path, " ".join(docstring.split("\n\n")[0].split())))
+        docstrings.sort(key=lambda item: -module_rank.get(item[0].replace('\\', '/'), 0.0))
+        for rank, (path, docstring) in enumerate(docstrings):
+            packer.add("Modules:", f"- {path}: {docstring}", 75 - rank)
+        
+        # Folder summaries by the summed rank of their modules; they decay slowly since
+        # with hundreds of folders they carry most of what the README needs
+        folder_rank = {}
+        for file_path, score in module_rank.items():
+            folder = os.path.dirname(file_path) or "."
+            folder_rank[folder] = folder_rank.get(folder, 0.0) + score
+        ordered = sorted(folder_summaries or {}, key=lambda folder: (-folder_rank.get(folder.replace('\\', '/'), 0.0), folder))
+        for rank, folder in enumerate(ordered):
+            packer.add("Folder Summaries:", f"- {folder}: {' '.join(folder_summaries[folder].split())}", 95 - rank * 0.1)
+        
+        for rank, folder in enumerate(data.get('repo_analysis', {})):
+            packer.add("Repository Structure:", f"- {folder}", 40 - rank * 0.1)
+        
+        sections = packer.pack()
+        print(f"Packed {packer.used} of {budget} context tokens "
+              f"({packer.truncated} items truncated, {packer.dropped} left out)")
+        return PromptPacker.render(sections, PROMPT_SECTIONS)
+    
+    def collect_key_functions(self, data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Return every summarized function with its 'path', 'name' and 'summary'."""
         key_functions = []
         for folder, files in data.get('function_summaries', {}).items():
             for file_name, functions in files.items():
@@ -108,9 +349,30 @@ class LlamaREADMEGenerator:
                             'name': func_name,
                             'summary': func_info.get('summary', '')
                         })
+        return key_functions
+    
+    def generate_prompt(self, data: Dict[str, Any], folder_summaries: Optional[Dict[str, str]] = None) -> str:
+        """
+        Generate a well-crafted prompt for Llama based on analysis data.
+        
+        Args:
+            data: Analysis data from load_analysis_data
+            folder_summaries: Folder summaries from the map step, in map-reduce mode
+        """
+        # Extract key structural information for a more concise prompt
+        # Get folder structure
+        folders = list(data['repo_analysis'].keys()) if 'repo_analysis' in data else []
+        
+        # Count Python files
+        python_file_count = 0
+        for folder in folders:
+            python_file_count += len(data['repo_analysis'].get(folder, {}))
+            
+        # Extract key functions
+        key_functions = self.collect_key_functions(data)
         
         # Create a structured prompt for the Llama model
-        prompt = f"""<s>[INST] You are an expert software developer and documentation specialist. 
+        header = f"""<s>[INST] You are an expert software developer and documentation specialist. 
 Your task is to create a comprehensive, professional README.md file for the GitHub repository: {data['repo_url']}
 
 I have provided you with detailed analysis of the repository, including:
@@ -142,20 +404,8 @@ Make sure to:
 - Include a table of contents if the README is long
 - Maintain a professional tone
 
-Key Functions:
 """
-        
-        # Add key functions information (limited to 10 functions for brevity)
-        for i, func in enumerate(key_functions[:10]):
-            prompt += f"\n- {func['name']} ({func['path']}): {func['summary']}"
-        
-        # Add a sample of the repository analysis data 
-        prompt += f"""
-
-Here's an excerpt of the repository structure:
-```json
-{json.dumps(list(data['repo_analysis'].keys()), indent=2)}
-```
+        footer = f"""
 
 Based on all this information, generate a complete README.md file.
 [/INST]
@@ -163,46 +413,177 @@ Based on all this information, generate a complete README.md file.
 I'll create a comprehensive README.md file for the {data['repo_name']} repository based on the provided analysis.
 
 """
-        return prompt
+        # Whatever the fixed text and the README leave of the context window goes to analysis data
+        counter = TokenCounter(self.tokenizer_name)
+        budget = self.context_window - self.max_new_tokens - counter.count(header) - counter.count(footer)
+        context = self.pack_context(data, key_functions, max(budget, 0), folder_summaries)
+        
+        return header + context + footer
+    
+    def folder_data(self, data: Dict[str, Any], folder: str) -> Dict[str, Any]:
+        """Restrict analysis data to one folder, for that folder's map step."""
+        graph = data.get('callgraph_graph') or {}
+        nodes = graph.get('nodes', {})
+        folder_key = folder.replace('\\', '/')
+        entry_points = {node_id: reason for node_id, reason in graph.get('entry_points', {}).items()
+                        if (os.path.dirname(nodes.get(node_id, {}).get('file', '').replace('\\', '/')) or ".") == folder_key}
+        return dict(data,
+                    repo_analysis={folder: data.get('repo_analysis', {}).get(folder, {})},
+                    function_summaries={folder: data.get('function_summaries', {}).get(folder, {})},
+                    callgraph_graph=dict(graph, entry_points=entry_points),
+                    callgraph_digest="")
+    
+    def generate_map_prompt(self, data: Dict[str, Any], folder: str) -> str:
+        """Generate the prompt asking for a summary of one folder (the map step)."""
+        header = f"""<s>[INST] You are an expert software developer helping to write the README.md for the GitHub repository: {data['repo_url']}
+
+Describe what the folder "{folder}" contributes to the project in one paragraph of 3 to 5 sentences:
+its purpose, its main modules and functions, and how they are used. Write plain prose without headings.
+
+"""
+        footer = """
+
+[/INST]
+
+"""
+        folder_data = self.folder_data(data, folder)
+        counter = TokenCounter(self.tokenizer_name)
+        budget = self.context_window - MAP_MAX_NEW_TOKENS - counter.count(header) - counter.count(footer)
+        context = self.pack_context(folder_data, self.collect_key_functions(folder_data), max(budget, 0))
+        
+        return header + context + footer
+    
+    def summarize_folder(self, data: Dict[str, Any], folder: str) -> Tuple[str, bool]:
+        """
+        Summarize one folder, reusing the cached summary if its inputs haven't changed.
+        
+        Summaries live in the shared response cache, which expires and caps its entries.
+        
+        Returns:
+            The summary, and whether it came from the cache
+        
+        Raises:
+            InferenceError: If the backend fails
+        """
+        prompt = self.generate_map_prompt(data, folder)
+        request = {'model': self.model_path, 'prompt': prompt, 'max_new_tokens': MAP_MAX_NEW_TOKENS,
+                   'temperature': 0.7, 'top_p': 0.9}
+        generated = []
+        
+        def generate():
+            # The backend is only loaded on a cache miss
+            backend = get_backend(self.backend_name, hf_token=self.hf_token, model_path=self.model_path,
+                                  timeout=self.timeout)
+            generated.append(True)
+            return backend.generate(prompt, max_new_tokens=MAP_MAX_NEW_TOKENS, temperature=0.7, top_p=0.9)
+        
+        summary = get_cache().cached(f"llama/{self.backend_name}", request, generate)
+        return summary, not generated
+    
+    def map_folders(self, data: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Summarize every folder with summarized functions (the map step of map-reduce mode).
+        
+        Folders whose summary fails are left out of the README prompt.
+        
+        Raises:
+            InferenceError: If every folder failed
+        """
+        folders = [folder for folder, files in data.get('function_summaries', {}).items() if files]
+        # A local model already uses every core for one generation; only the hosted API gains from parallel calls
+        workers = self.map_workers if self.backend_name == "hf-api" else 1
+        print(f"Summarizing {len(folders)} folders with {workers} worker(s)...")
+        
+        start = time.time()
+        summaries = {}
+        cached = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.summarize_folder, data, folder): folder for folder in folders}
+            for future in as_completed(futures):
+                folder = futures[future]
+                try:
+                    summaries[folder], from_cache = future.result()
+                    cached += from_cache
+                except InferenceError as e:
+                    print(f"Could not summarize folder {folder}: {str(e)}")
+        
+        print(f"Summarized {len(summaries)} of {len(folders)} folders in {time.time() - start:.2f}s "
+              f"({cached} from cache)")
+        if folders and not summaries:
+            raise InferenceError("Every folder summary failed")
+        return summaries
     
     def run_llama_inference(self, prompt: str) -> str:
-        """Run inference with Llama model through the Hugging Face API."""
-        print("Running Llama inference to generate README...")
-        try:
-            # Prepare the payload for the API
-            payload = {
-                "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": 2048,
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "do_sample": True
-                }
-            }
-            
-            # Make the API request
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            
-            # Check for errors
-            if response.status_code != 200:
-                print(f"API Error: {response.status_code} - {response.text}")
-                return f"Error generating README: API returned status code {response.status_code}"
-            
-            # Extract generated text
-            result = response.json()
-            if isinstance(result, list) and len(result) > 0:
-                generated_text = result[0].get('generated_text', '')
-                # Remove the input prompt from the generated text
-                if generated_text.startswith(prompt):
-                    generated_text = generated_text[len(prompt):].strip()
-                return generated_text
-            else:
-                print(f"Unexpected API response format: {result}")
-                return "Error: Unexpected API response format"
-            
-        except Exception as e:
-            print(f"Error during Llama inference: {str(e)}")
-            return f"Error generating README: {str(e)}"
+        """
+        Run inference with the Llama model on the configured backend.
+        
+        Raises:
+            InferenceError: If the backend fails; the error is never returned as text
+        """
+        print(f"Running Llama inference on the {self.backend_name} backend to generate README...")
+        # Local backends load their weights once per process and reuse them afterwards
+        backend = get_backend(self.backend_name, hf_token=self.hf_token, model_path=self.model_path,
+                              timeout=self.timeout)
+        # The same prompt to the same model is answered from the shared response cache
+        request = {'model': self.model_path, 'prompt': prompt, 'max_new_tokens': self.max_new_tokens,
+                   'temperature': 0.7, 'top_p': 0.9}
+        return get_cache().cached(f"llama/{self.backend_name}", request,
+                                  lambda: backend.generate(prompt, max_new_tokens=self.max_new_tokens,
+                                                           temperature=0.7, top_p=0.9))
+    
+    def stream_llama_inference(self, prompt: str) -> Iterator[str]:
+        """
+        Stream the README text from the configured backend as it is generated.
+        
+        Raises:
+            InferenceError: If the backend fails, possibly after some text was yielded
+        """
+        print(f"Streaming Llama inference on the {self.backend_name} backend to generate README...")
+        backend = get_backend(self.backend_name, hf_token=self.hf_token, model_path=self.model_path,
+                              timeout=self.timeout)
+        return backend.stream(prompt, max_new_tokens=self.max_new_tokens, temperature=0.7, top_p=0.9)
+    
+    def stream_readme(self, data: Optional[Dict[str, Any]] = None,
+                      folder_summaries: Optional[Dict[str, str]] = None) -> Iterator[str]:
+        """
+        Generate the README as a stream of text chunks.
+        
+        Every chunk is appended to ``readme_partial_path`` and flushed as it
+        arrives, so other processes can show the README while it is written.
+        The partial file replaces the README once the stream completes, and is
+        removed if the stream fails or the caller stops early.
+        
+        Raises:
+            InferenceError: If the backend fails
+        """
+        if data is None:
+            data = self.load_analysis_data()
+        prompt = self.generate_prompt(data, folder_summaries)
+        
+        start = time.time()
+        written = False
+        with open(self.readme_partial_path, 'w', encoding='utf-8') as f:
+            try:
+                for chunk in self.stream_llama_inference(prompt):
+                    if not written:
+                        # Match the non-streaming output, which is stripped
+                        chunk = chunk.lstrip()
+                        if not chunk:
+                            continue
+                        print(f"First README text after {time.time() - start:.2f}s")
+                        written = True
+                    f.write(chunk)
+                    f.flush()
+                    yield chunk
+            except BaseException:
+                f.close()
+                os.remove(self.readme_partial_path)
+                raise
+        
+        os.replace(self.readme_partial_path, self.readme_output_path)
+        update_readme_version(self.readme_output_path, bump=True, source="model", pending=False)
+        print(f"README streamed in {time.time() - start:.2f}s")
+        print(f"README saved to: {self.readme_output_path}")
     
     def generate_fallback_readme(self, data: Dict[str, Any]) -> str:
         """Generate a fallback README if the Llama inference fails."""
@@ -249,11 +630,11 @@ pip install -r requirements.txt
 """
         return readme
     
-    def save_readme(self, content: str) -> str:
+    def save_readme(self, content: str, source: str = "model") -> str:
         """Save the generated README to a file and return the file path."""
         try:
-            with open(self.readme_output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            _atomic_write(self.readme_output_path, content)
+            update_readme_version(self.readme_output_path, bump=True, source=source, pending=False)
             print(f"README saved to: {self.readme_output_path}")
             return self.readme_output_path
         except Exception as e:
@@ -269,41 +650,174 @@ pip install -r requirements.txt
                 print("Failed to save README to any location")
                 return ""
     
-    def generate(self) -> str:
-        """Run the complete README generation process."""
-        print(f"Generating README for repository: {self.repo_url}")
+    def save_placeholder_readme(self, content: str) -> bool:
+        """
+        Save a README only if none exists yet, so a model README is never replaced.
         
-        # Load all analysis data
-        data = self.load_analysis_data()
+        Returns:
+            True if the README was saved
+        """
+        temp_path = f"{self.readme_output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        try:
+            # Linking fails if the README exists, with no window between checking and writing,
+            # and readers never see a partly written file
+            os.link(temp_path, self.readme_output_path)
+        except FileExistsError:
+            return False
+        except OSError:
+            # No hard links on this filesystem (FAT, SMB, some bind mounts): creating the
+            # file exclusively is just as atomic
+            try:
+                fd = os.open(self.readme_output_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+        finally:
+            os.remove(temp_path)
+        update_readme_version(self.readme_output_path, bump=True, source="fallback")
+        return True
+    
+    def generate_model_readme(self, data: Dict[str, Any], stream: bool = False, map_reduce: bool = False) -> str:
+        """
+        Generate the README with the model and save it.
+        
+        Raises:
+            InferenceError: If the backend fails
+        """
+        folder_summaries = self.map_folders(data) if map_reduce else None
+        
+        if stream:
+            for _ in self.stream_readme(data, folder_summaries):
+                pass
+            return self.readme_output_path
         
         # Generate prompt based on the data
-        prompt = self.generate_prompt(data)
+        prompt = self.generate_prompt(data, folder_summaries)
+        return self.save_readme(self.run_llama_inference(prompt))
+    
+    def upgrade_readme(self, data: Dict[str, Any], stream: bool = False, map_reduce: bool = False) -> Optional[str]:
+        """
+        Generate the README with the model in the background of a deadline.
         
-        # Run Llama inference
-        readme_content = self.run_llama_inference(prompt)
+        The model's README replaces whatever is stored. If generation fails, the
+        stored README is kept (the fallback is saved only if there is none).
         
-        # If the inference failed or returned an error message, use the fallback
-        if readme_content.startswith("Error"):
-            print("Llama inference failed. Using fallback README generation.")
-            readme_content = self.generate_fallback_readme(data)
+        Returns:
+            The README path, or None if generation failed
+        """
+        try:
+            return self.generate_model_readme(data, stream, map_reduce)
+        except InferenceError as e:
+            print(f"Error during Llama inference: {str(e)}")
+            if not self.save_placeholder_readme(self.generate_fallback_readme(data)):
+                print("Llama inference failed. Keeping the last README.")
+            return None
+        finally:
+            update_readme_version(self.readme_output_path, pending=False)
+    
+    def hold_readme(self, data: Dict[str, Any], deadline: float):
+        """Make sure there is a README to serve while the model misses its deadline."""
+        print(f"No README from the model within {deadline}s; it will replace the stored README when ready")
+        if not self.save_placeholder_readme(self.generate_fallback_readme(data)):
+            print("Serving the last README until then")
+        print(f"README saved to: {self.readme_output_path}")
+    
+    def generate(self, stream: bool = False, map_reduce: bool = False, deadline: Optional[float] = None) -> str:
+        """
+        Run the complete README generation process.
+        
+        Args:
+            stream: Write the README to README_FOLDER incrementally as tokens arrive
+            map_reduce: Summarize every folder first and write the README from the summaries
+            deadline: Seconds to wait for the model; after that a fallback (or the last
+                      README) is returned and the model's README replaces it when ready
+        """
+        print(f"Generating README for repository: {self.repo_url}")
+        
+        # Load all analysis data
+        data = self.load_analysis_data()
         
-        # Save README to file
-        readme_path = self.save_readme(readme_content)
+        if deadline is not None:
+            # Pending until the worker finishes, whether or not it beats the deadline
+            update_readme_version(self.readme_output_path, pending=True)
+            worker = threading.Thread(target=self.upgrade_readme, args=(data, stream, map_reduce),
+                                      name=f"readme-{self.repo_name}")
+            worker.start()
+            worker.join(deadline)
+            if worker.is_alive():
+                self.hold_readme(data, deadline)
+            return self.readme_output_path
         
-        return readme_path
+        # Run Llama inference, falling back to a template README if it fails
+        try:
+            return self.generate_model_readme(data, stream, map_reduce)
+        except InferenceError as e:
+            print(f"Error during Llama inference: {str(e)}")
+            print("Llama inference failed. Using fallback README generation.")
+            return self.save_readme(self.generate_fallback_readme(data), source="fallback")
 
 def main():
     parser = argparse.ArgumentParser(description='Generate README using Llama 2 based on repository analysis')
     parser.add_argument('repo_url', help='URL of the GitHub repository')
     parser.add_argument('--token', help='HuggingFace API token for accessing Llama model')
+    parser.add_argument('--backend', choices=BACKENDS, default=os.environ.get("LLAMA_BACKEND", "hf-api"),
+                        help='Inference backend (default: $LLAMA_BACKEND or hf-api)')
+    parser.add_argument('--model-path', default=os.environ.get("LLAMA_MODEL_PATH"),
+                        help='Local model for the transformers and llama-cpp backends (default: $LLAMA_MODEL_PATH)')
+    parser.add_argument('--timeout', type=float,
+                        help=f'Seconds to wait for the hosted API (default: {DEFAULT_TIMEOUT[1]})')
+    parser.add_argument('--context-window', type=int, default=DEFAULT_CONTEXT_WINDOW,
+                        help=f'Model context size in tokens (default: {DEFAULT_CONTEXT_WINDOW})')
+    parser.add_argument('--max-new-tokens', type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help=f'Tokens reserved for the generated README (default: {DEFAULT_MAX_NEW_TOKENS})')
+    parser.add_argument('--tokenizer', help='Tokenizer used to measure the prompt (default: the local model, '
+                                            'or an estimate for remote backends)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream tokens into README_FOLDER as they are generated')
+    parser.add_argument('--map-reduce', action='store_true',
+                        help='Summarize each folder first, then write the README from the summaries (for large repositories)')
+    parser.add_argument('--map-workers', type=int, default=DEFAULT_MAP_WORKERS,
+                        help=f'Folders summarized concurrently with the hosted API (default: {DEFAULT_MAP_WORKERS})')
+    parser.add_argument('--deadline', type=float,
+                        help='Seconds to wait for the model before returning a fallback README; '
+                             'the model keeps running in the background and replaces it when done')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ask the model again instead of reusing a cached response')
+    parser.add_argument('--background', action='store_true', help=argparse.SUPPRESS)
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        get_cache().bypass = True
+    
     # Initialize the generator
-    generator = LlamaREADMEGenerator(args.repo_url, args.token)
+    generator = LlamaREADMEGenerator(args.repo_url, args.token, backend=args.backend,
+                                     model_path=args.model_path, timeout=args.timeout,
+                                     context_window=args.context_window, max_new_tokens=args.max_new_tokens,
+                                     tokenizer=args.tokenizer, map_workers=args.map_workers)
+    
+    if args.background:
+        # The detached half of --deadline
+        generator.upgrade_readme(generator.load_analysis_data(), stream=args.stream, map_reduce=args.map_reduce)
+        return 0
     
-    # Generate README
-    readme_path = generator.generate()
+    if args.deadline is not None:
+        # Callers wait for this process to exit, so the model runs in a detached copy of it
+        update_readme_version(generator.readme_output_path, pending=True)
+        log_path = f"{generator.readme_output_path}.log"
+        worker = spawn_background(sys.argv[1:] + ['--background'], log_path)
+        try:
+            worker.wait(timeout=args.deadline)
+        except subprocess.TimeoutExpired:
+            generator.hold_readme(generator.load_analysis_data(), args.deadline)
+            print(f"Background generation log: {log_path}")
+        readme_path = generator.readme_output_path if os.path.exists(generator.readme_output_path) else ""
+    else:
+        # Generate README
+        readme_path = generator.generate(stream=args.stream, map_reduce=args.map_reduce)
     
     if readme_path:
         print(f"README generation completed. File saved to: {readme_path}")
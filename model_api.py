@@ -1,18 +1,28 @@
 from fastapi import FastAPI, HTTPException, Request, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any, Union
 import torch
 import transformers
-from transformers import AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM, StoppingCriteria, StoppingCriteriaList
+import asyncio
 import logging
 import time
 import os
+import gc
 import json
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from callgraph_service import get_service, DEFAULT_PAGE_SIZE
+from llama_inference import README_FOLDER, read_readme_version
+from model_batching import MicroBatcher, QueueFull
+from continuous_batching import ContinuousBatcher
+from model_streaming import TokenStream, sse_events
+from model_registry import ModelRegistry, ModelUnavailable, checkpoint_size
+import cpu_profile
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +31,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Without a GPU, models load with a CPU profile (dtype, int8 linear layers, thread counts)
+# instead of float16/8-bit; None when running on a GPU
+CPU_PROFILE = cpu_profile.configure()
+
 # Initialize FastAPI app
 app = FastAPI(title="Code Narrator AI Models API", 
               description="API for serving LLAMA and CodeT5 models for code analysis and enhancement")
@@ -70,10 +84,14 @@ MODEL_CONFIG = {
     }
 }
 
-# Global variables to store models
+# Global variables to store models; the registry below loads them on first use
 models = {}
 tokenizers = {}
 
+# Models that are never evicted (comma-separated MODEL_CONFIG names); they are loaded
+# in the background at startup
+MODEL_PINNED = [name for name in os.environ.get("MODEL_PINNED", "").split(",") if name]
+
 # Load model function
 def load_model(model_type):
     """Load a model of the specified type"""
@@ -90,30 +108,206 @@ def load_model(model_type):
         tokenizers[model_type] = tokenizer
         
         # Load model
-        model_args = {
-            "torch_dtype": torch.float16,
-            "device_map": config["device_map"]
-        }
-        
-        # Add 8-bit loading if specified
-        if config.get("load_8bit", False):
-            model_args["load_in_8bit"] = True
+        if CPU_PROFILE:
+            model = config["model_class"].from_pretrained(config["model_path"], **cpu_profile.load_args(CPU_PROFILE))
+            model = cpu_profile.prepare_model(model, CPU_PROFILE)
+        else:
+            model_args = {
+                "torch_dtype": torch.float16,
+                "device_map": config["device_map"]
+            }
             
-        model = config["model_class"].from_pretrained(config["model_path"], **model_args)
+            # Add 8-bit loading if specified
+            if config.get("load_8bit", False):
+                model_args["load_in_8bit"] = True
+                
+            model = config["model_class"].from_pretrained(config["model_path"], **model_args)
         
         # Store the model
         models[model_type] = model
+        if isinstance(batchers.get(model_type), ContinuousBatcher):
+            batchers[model_type].model = model
+            batchers[model_type].tokenizer = tokenizer
         logger.info(f"{model_type} model loaded successfully")
         
+        # Memory it takes, for the registry's budget
+        return cpu_profile.model_memory(model) if CPU_PROFILE else model.get_memory_footprint()
+        
     except Exception as e:
         logger.error(f"Failed to load {model_type} model: {e}")
         raise
 
+def unload_model(model_type):
+    """Drop a model and its tokenizer so their memory can be reclaimed"""
+    models.pop(model_type, None)
+    tokenizers.pop(model_type, None)
+    if isinstance(batchers.get(model_type), ContinuousBatcher):
+        batchers[model_type].model = None
+        batchers[model_type].tokenizer = None
+        batchers[model_type].prefix_cache.clear()
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    logger.info(f"{model_type} model unloaded")
+
+def estimate_model_memory(model_type):
+    """Estimate the memory a model will take from its checkpoint files"""
+    config = MODEL_CONFIG[model_type]
+    size = checkpoint_size(config["model_path"])
+    if CPU_PROFILE:
+        # Assuming 16-bit checkpoints; float32 doubles them while loading, before quantization
+        return size * 2 if CPU_PROFILE["dtype"] == "float32" else size
+    # Weights are loaded as float16 (checkpoints are usually float16 or float32), 8-bit halves that
+    return size // 2 if config.get("load_8bit", False) else size
+
+# Batched generation: each function runs one padded generate call for a list of prompts
+def generate_llama_batch(prompts: List[str], params: Dict[str, Any]) -> List[str]:
+    """Generate continuations for a batch of prompts with the LLAMA model"""
+    model = models["llama"]
+    tokenizer = tokenizers["llama"]
+    
+    # A decoder-only model continues from the last position, so shorter prompts are padded on the left
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+    
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=params["max_new_tokens"],
+            temperature=params["temperature"],
+            top_p=params["top_p"],
+            top_k=params["top_k"],
+            do_sample=params["temperature"] > 0.0,
+            pad_token_id=tokenizer.pad_token_id
+        )
+    
+    # Everything after the (padded) prompt is generated text
+    return tokenizer.batch_decode(outputs[:, inputs.input_ids.shape[1]:], skip_special_tokens=True)
+
+def generate_code_t5_batch(prompts: List[str], params: Dict[str, Any]) -> List[str]:
+    """Generate outputs for a batch of prompts with the CodeT5 model"""
+    model = models["code_t5"]
+    tokenizer = tokenizers["code_t5"]
+    
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+    
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_length=inputs.input_ids.shape[1] + params["max_tokens"],
+            do_sample=True,
+            temperature=0.7,
+            top_p=0.95
+        )
+    
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+# Streamed generation: one prompt at a time, tokens go to the streamer as they are produced
+class StreamCancelled(StoppingCriteria):
+    """Stop generating once the streaming client has gone away"""
+    def __init__(self, streamer: TokenStream):
+        self.streamer = streamer
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.streamer.cancelled, dtype=torch.bool, device=input_ids.device)
+
+def generate_llama_stream(prompt: str, params: Dict[str, Any], streamer: TokenStream):
+    """Generate a continuation of one prompt with the LLAMA model, streaming its tokens"""
+    model = models["llama"]
+    tokenizer = tokenizers["llama"]
+    
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    
+    with torch.no_grad():
+        model.generate(
+            **inputs,
+            max_new_tokens=params["max_new_tokens"],
+            temperature=params["temperature"],
+            top_p=params["top_p"],
+            top_k=params["top_k"],
+            do_sample=params["temperature"] > 0.0,
+            pad_token_id=tokenizer.eos_token_id if tokenizer.pad_token_id is None else tokenizer.pad_token_id,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([StreamCancelled(streamer)])
+        )
+
+def generate_code_t5_stream(prompt: str, params: Dict[str, Any], streamer: TokenStream):
+    """Generate the output for one prompt with the CodeT5 model, streaming its tokens"""
+    model = models["code_t5"]
+    tokenizer = tokenizers["code_t5"]
+    
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    # The decoder starts from its own start token, not the prompt
+    streamer.prompt_tokens = inputs.input_ids.shape[1]
+    
+    with torch.no_grad():
+        model.generate(
+            **inputs,
+            max_length=inputs.input_ids.shape[1] + params["max_tokens"],
+            do_sample=True,
+            temperature=0.7,
+            top_p=0.95,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([StreamCancelled(streamer)])
+        )
+
+batchers = {
+    "llama": MicroBatcher("llama", generate_llama_batch, run_stream=generate_llama_stream),
+    "code_t5": MicroBatcher("code_t5", generate_code_t5_batch, run_stream=generate_code_t5_stream)
+}
+
+# Seconds a client is asked to wait before retrying when a model is busy or can't be loaded
+QUEUE_FULL_RETRY_AFTER = 5
+
+def unavailable_error(e: Exception) -> HTTPException:
+    """Reject a request whose model queue is full or whose model can't be loaded"""
+    logger.warning(str(e))
+    return HTTPException(status_code=503, detail=str(e),
+                         headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)})
+
+async def stream_response(model_type: str, prompt: str, params: Dict[str, Any], start_time: float,
+                          final: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """Queue a streamed generation and return its tokens as server-sent events"""
+    streamer = TokenStream()
+    try:
+        await registry.acquire_async(model_type)
+    except ModelUnavailable as e:
+        raise unavailable_error(e)
+    try:
+        job = batchers[model_type].submit_stream(prompt, params, streamer)
+    except QueueFull as e:
+        registry.release(model_type)
+        raise unavailable_error(e)
+    # The model stays loaded until the generation is over
+    job.add_done_callback(lambda _: registry.release(model_type))
+    
+    return StreamingResponse(
+        sse_events(streamer, tokenizers[model_type], job, start_time, final),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# LLAMA requests join a running batch at every token ("continuous"), so long READMEs
+# don't hold up short requests; "micro" batches whole requests instead
+LLAMA_BATCHING = os.environ.get("LLAMA_BATCHING", "continuous")
+if LLAMA_BATCHING == "continuous":
+    # Gets its model when the registry loads it
+    batchers["llama"] = ContinuousBatcher(None, None)
+
+# Loads models on first use and evicts the least recently used idle one when another
+# wouldn't fit in MODEL_MEMORY_BUDGET_GB (default: 80% of physical memory)
+registry = ModelRegistry(MODEL_CONFIG.keys(), load_model, unload_model, estimate_model_memory,
+                         pinned=MODEL_PINNED)
+
 @app.on_event("startup")
 async def startup_event():
-    """Load all models on startup"""
-    for model_type in MODEL_CONFIG.keys():
-        load_model(model_type)
+    """Start loading pinned models in the background; others load on first use"""
+    loop = asyncio.get_running_loop()
+    for model_type in MODEL_PINNED:
+        loop.run_in_executor(None, registry.preload, model_type)
 
 # Health check endpoint
 @app.get("/health")
@@ -124,7 +318,16 @@ async def health_check():
         "models": {
             model_type: "loaded" if model_type in models else "not_loaded"
             for model_type in MODEL_CONFIG.keys()
-        }
+        },
+        "memory": registry.stats(),
+        "inference_profile": CPU_PROFILE or {"device": "cuda"},
+        "batching": {model_type: batcher.stats() for model_type, batcher in batchers.items()}
+    }
+    # Requests waiting or being generated, per model; inference runs on each
+    # batcher's own thread, so this endpoint answers even while they are busy
+    status["queue_depth"] = {
+        model_type: stats["queued"] + stats.get("running", 0) + stats.get("active", 0) + stats.get("streams", 0)
+        for model_type, stats in status["batching"].items()
     }
     return status
 
@@ -132,34 +335,18 @@ async def health_check():
 @app.post("/api/generate")
 async def generate_text(request: TextGenerationRequest):
     """Generate text using the LLAMA model"""
-    if "llama" not in models:
-        raise HTTPException(status_code=503, detail="LLAMA model not loaded")
-    
     try:
         logger.info(f"Processing text generation with prompt length: {len(request.prompt)}")
         start_time = time.time()
         
-        model = models["llama"]
-        tokenizer = tokenizers["llama"]
-        
-        # Tokenize input
-        inputs = tokenizer(request.prompt, return_tensors="pt").to(model.device)
-        
-        # Generate text
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs.input_ids,
-                max_new_tokens=request.max_tokens,
-                temperature=request.temperature,
-                top_p=request.top_p,
-                top_k=request.top_k,
-                do_sample=request.temperature > 0.0,
-                pad_token_id=tokenizer.eos_token_id
-            )
-        
-        # Decode the generated tokens
-        generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        response_text = generated_text[len(tokenizer.decode(inputs.input_ids[0], skip_special_tokens=True)):]
+        # Generate text, batched with concurrent requests that use the same parameters
+        async with registry.use("llama"):
+            response_text = await batchers["llama"].submit(request.prompt, {
+                "max_new_tokens": request.max_tokens,
+                "temperature": request.temperature,
+                "top_p": request.top_p,
+                "top_k": request.top_k
+            })
         
         processing_time = time.time() - start_time
         logger.info(f"Text generation completed in {processing_time:.2f}s")
@@ -168,59 +355,64 @@ async def generate_text(request: TextGenerationRequest):
             "generated_text": response_text,
             "processing_time": processing_time
         }
+    except (QueueFull, ModelUnavailable) as e:
+        raise unavailable_error(e)
     except Exception as e:
         logger.error(f"Error in text generation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Text generation failed: {str(e)}")
 
+@app.post("/api/generate/stream")
+async def generate_text_stream(request: TextGenerationRequest):
+    """Stream text generated by the LLAMA model as server-sent events
+    
+    Sends a "token" event for each piece of text, then a "done" event with
+    token counts and timings (or an "error" event).
+    """
+    logger.info(f"Streaming text generation with prompt length: {len(request.prompt)}")
+    return await stream_response("llama", request.prompt, {
+        "max_new_tokens": request.max_tokens,
+        "temperature": request.temperature,
+        "top_p": request.top_p,
+        "top_k": request.top_k
+    }, time.time())
+
+def build_code_prompt(request: CodeGenerationRequest) -> str:
+    """Create the CodeT5 prompt for a code task"""
+    prompt = request.code_snippet
+    
+    if request.task == "translate":
+        if not request.target_language:
+            raise HTTPException(status_code=400, detail="Target language is required for translation task")
+        prompt = f"Translate the following code to {request.target_language}: {request.code_snippet}"
+    
+    elif request.task == "summarize":
+        prompt = f"Summarize the following code: {request.code_snippet}"
+    
+    elif request.task == "explain":
+        prompt = f"Explain the following code: {request.code_snippet}"
+    
+    elif request.task == "refactor":
+        prompt = f"Refactor the following code: {request.code_snippet}"
+    
+    elif request.task != "complete":
+        raise HTTPException(status_code=400, detail=f"Unsupported task: {request.task}")
+    
+    return prompt
+
 # CodeT5 model inference endpoint
 @app.post("/api/code")
 async def process_code(request: CodeGenerationRequest):
     """Process code using the CodeT5 model"""
-    if "code_t5" not in models:
-        raise HTTPException(status_code=503, detail="CodeT5 model not loaded")
-    
     try:
         logger.info(f"Processing code for task: {request.task}")
         start_time = time.time()
         
-        model = models["code_t5"]
-        tokenizer = tokenizers["code_t5"]
-        
         # Create task-specific prompt
-        prompt = request.code_snippet
-        
-        if request.task == "translate":
-            if not request.target_language:
-                raise HTTPException(status_code=400, detail="Target language is required for translation task")
-            prompt = f"Translate the following code to {request.target_language}: {request.code_snippet}"
-        
-        elif request.task == "summarize":
-            prompt = f"Summarize the following code: {request.code_snippet}"
-        
-        elif request.task == "explain":
-            prompt = f"Explain the following code: {request.code_snippet}"
-        
-        elif request.task == "refactor":
-            prompt = f"Refactor the following code: {request.code_snippet}"
-        
-        elif request.task != "complete":
-            raise HTTPException(status_code=400, detail=f"Unsupported task: {request.task}")
-        
-        # Tokenize input
-        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        prompt = build_code_prompt(request)
         
-        # Generate code
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs.input_ids,
-                max_length=inputs.input_ids.shape[1] + request.max_tokens,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.95
-            )
-        
-        # Decode the generated tokens
-        generated_code = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        # Generate code, batched with concurrent requests
+        async with registry.use("code_t5"):
+            generated_code = await batchers["code_t5"].submit(prompt, {"max_tokens": request.max_tokens})
         
         processing_time = time.time() - start_time
         logger.info(f"Code processing completed in {processing_time:.2f}s")
@@ -230,17 +422,25 @@ async def process_code(request: CodeGenerationRequest):
             "task": request.task,
             "processing_time": processing_time
         }
+    except (QueueFull, ModelUnavailable) as e:
+        raise unavailable_error(e)
     except Exception as e:
         logger.error(f"Error in code processing: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Code processing failed: {str(e)}")
 
+@app.post("/api/code/stream")
+async def process_code_stream(request: CodeGenerationRequest):
+    """Stream the CodeT5 output for a code task as server-sent events"""
+    logger.info(f"Streaming code processing for task: {request.task}")
+    start_time = time.time()
+    prompt = build_code_prompt(request)
+    return await stream_response("code_t5", prompt, {"max_tokens": request.max_tokens}, start_time,
+                           {"task": request.task})
+
 # Generate comments for repository files using CodeT5
 @app.post("/api/generate-comments-ai")
 async def generate_comments_ai(request: FileCommentRequest):
     """Generate code comments for a specific file in a repository using CodeT5"""
-    if "code_t5" not in models:
-        raise HTTPException(status_code=503, detail="CodeT5 model not loaded")
-    
     try:
         logger.info(f"Generating comments for repo: {request.repo_url}, file: {request.file_path or 'all'}")
         
@@ -251,30 +451,15 @@ async def generate_comments_ai(request: FileCommentRequest):
         # You should integrate with your existing Python scripts that fetch code files
         # For now, we'll use a mock implementation
         
-        model = models["code_t5"]
-        tokenizer = tokenizers["code_t5"]
-        
         # Mock code content - in practice, fetch from GitHub
         code_content = "def example_function(x, y):\n    return x + y"
         
         # Prepare the prompt for code commenting
         prompt = f"Add explanatory comments to the following code:\n\n{code_content}"
         
-        # Tokenize input
-        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-        
         # Generate commented code
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs.input_ids,
-                max_length=inputs.input_ids.shape[1] + 512,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.95
-            )
-        
-        # Decode the generated tokens
-        commented_code = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        async with registry.use("code_t5"):
+            commented_code = await batchers["code_t5"].submit(prompt, {"max_tokens": 512})
         
         # In practice, you would store this to a file like in your existing app
         # For now, we'll just return it
@@ -284,6 +469,8 @@ async def generate_comments_ai(request: FileCommentRequest):
             "filename": request.file_path.split("/")[-1] if request.file_path else "example.py",
             "originalPath": request.file_path or "unknown"
         }
+    except (QueueFull, ModelUnavailable) as e:
+        raise unavailable_error(e)
     except Exception as e:
         logger.error(f"Error generating comments: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Comment generation failed: {str(e)}")
@@ -299,21 +486,16 @@ async def generate_comments_form(
     return await generate_comments_ai(request)
 
 # Integration with your existing README generation
-@app.post("/generate-readme-ai")
-async def generate_readme_ai(repo_url: str = Form(...)):
-    """Generate a README for a repository using LLAMA model"""
-    if "llama" not in models:
-        raise HTTPException(status_code=503, detail="LLAMA model not loaded")
-    
-    try:
-        logger.info(f"Generating AI README for repo: {repo_url}")
-        
-        # Here we would fetch repository info
-        # For this example, we'll use a mock implementation
-        repo_name = repo_url.split("/")[-1]
-        
-        # Prepare a prompt for README generation
-        prompt = f"""Create a comprehensive README.md for a GitHub repository named {repo_name}.
+README_PARAMS = {
+    "max_new_tokens": 1024,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 50
+}
+
+# Fixed instructions come first, so every README prompt starts with the same tokens
+# and reuses their cached keys and values (see prefix_cache.py)
+README_INSTRUCTIONS = """Create a comprehensive README.md for a GitHub repository.
         The README should include:
         1. A title and description
         2. Installation instructions
@@ -321,27 +503,32 @@ async def generate_readme_ai(repo_url: str = Form(...)):
         4. Features list
         5. Contribution guidelines
         """
+
+if isinstance(batchers["llama"], ContinuousBatcher):
+    batchers["llama"].prefix_cache.register(README_INSTRUCTIONS)
+
+def build_readme_prompt(repo_url: str) -> str:
+    """Create the LLAMA prompt for a repository README"""
+    # Here we would fetch repository info
+    # For this example, we'll use a mock implementation
+    repo_name = repo_url.split("/")[-1]
+    
+    return f"""{README_INSTRUCTIONS}
+        Repository name: {repo_name}
+        """
+
+@app.post("/generate-readme-ai")
+async def generate_readme_ai(repo_url: str = Form(...)):
+    """Generate a README for a repository using LLAMA model"""
+    try:
+        logger.info(f"Generating AI README for repo: {repo_url}")
         
-        model = models["llama"]
-        tokenizer = tokenizers["llama"]
-        
-        # Tokenize input
-        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        # Prepare a prompt for README generation
+        prompt = build_readme_prompt(repo_url)
         
         # Generate README
-        with torch.no_grad():
-            outputs = model.generate(
-                inputs.input_ids,
-                max_new_tokens=1024,
-                temperature=0.7,
-                top_p=0.9,
-                do_sample=True,
-                pad_token_id=tokenizer.eos_token_id
-            )
-        
-        # Decode the generated tokens
-        readme_content = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        readme_content = readme_content[len(tokenizer.decode(inputs.input_ids[0], skip_special_tokens=True)):]
+        async with registry.use("llama"):
+            readme_content = await batchers["llama"].submit(prompt, README_PARAMS)
         
         # In a real implementation, you might save this to a file
         
@@ -349,10 +536,87 @@ async def generate_readme_ai(repo_url: str = Form(...)):
             "readme": readme_content,
             "type": "ai-generated"
         }
+    except (QueueFull, ModelUnavailable) as e:
+        raise unavailable_error(e)
     except Exception as e:
         logger.error(f"Error generating README: {str(e)}")
         raise HTTPException(status_code=500, detail=f"README generation failed: {str(e)}")
 
+@app.post("/generate-readme-ai/stream")
+async def generate_readme_ai_stream(repo_url: str = Form(...)):
+    """Stream a README generated by the LLAMA model as server-sent events"""
+    logger.info(f"Streaming AI README for repo: {repo_url}")
+    return await stream_response("llama", build_readme_prompt(repo_url), README_PARAMS, time.time(),
+                           {"type": "ai-generated"})
+
+# Stored READMEs from llama_inference.py (in its README_FOLDER); with --deadline a fallback is
+# stored first and upgraded in the background, so the UI polls the status until "pending" is false
+def get_readme_path(repo_name: str) -> str:
+    """Return the stored README of a repository, or raise a 404"""
+    readme_path = os.path.join(README_FOLDER, f"llama_{os.path.basename(repo_name)}.md")
+    if not os.path.exists(readme_path):
+        raise HTTPException(status_code=404, detail=f"No README found for {repo_name}")
+    return readme_path
+
+@app.get("/api/readme/{repo_name}/status")
+def readme_status(repo_name: str):
+    """Return the version of the stored README and whether a better one is still being generated"""
+    return read_readme_version(get_readme_path(repo_name))
+
+@app.get("/api/readme/{repo_name}")
+def readme_content(repo_name: str):
+    """Return the stored README with its version"""
+    readme_path = get_readme_path(repo_name)
+    # Read the version first: the README is replaced before its version is bumped,
+    # so the content is never older than the version returned with it
+    status = read_readme_version(readme_path)
+    with open(readme_path, 'r', encoding='utf-8') as f:
+        status["readme"] = f.read()
+    return status
+
+# Call graph exploration endpoints (bounded subgraphs of the call graph artifact)
+CALLGRAPHS_FOLDER = os.environ.get("CALLGRAPHS_FOLDER", "CALLGRAPHS_FOLDER")
+
+def get_callgraph_service(repo_name: str):
+    """Return the call graph service for a repository, or raise a 404"""
+    # Only plain repository names are accepted, never paths
+    artifact_path = os.path.join(CALLGRAPHS_FOLDER, f"{os.path.basename(repo_name)}.graph.json")
+    if not os.path.exists(artifact_path):
+        raise HTTPException(status_code=404, detail=f"No call graph found for {repo_name}")
+    return get_service(artifact_path)
+
+# These are plain (not async) handlers so FastAPI runs them in its thread pool
+@app.get("/api/callgraph/{repo_name}/clusters")
+def callgraph_clusters(repo_name: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE):
+    """List module clusters of a call graph, most important first"""
+    return get_callgraph_service(repo_name).clusters(page, page_size)
+
+@app.get("/api/callgraph/{repo_name}/cluster")
+def callgraph_cluster(repo_name: str, module: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE):
+    """Expand one module cluster into its functions and the calls among them"""
+    try:
+        return get_callgraph_service(repo_name).cluster(module, page, page_size)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/callgraph/{repo_name}/neighborhood")
+def callgraph_neighborhood(repo_name: str, node: str, hops: int = 1, direction: str = "both"):
+    """Return the N-hop call neighborhood of a function"""
+    if direction not in ("callees", "callers", "both"):
+        raise HTTPException(status_code=400, detail=f"Unsupported direction: {direction}")
+    try:
+        return get_callgraph_service(repo_name).neighborhood(node, hops, direction)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/callgraph/{repo_name}/path")
+def callgraph_path(repo_name: str, source: str, target: str):
+    """Return the shortest call chain between two functions"""
+    try:
+        return get_callgraph_service(repo_name).path(source, target)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 # Mount your existing static files if needed
 try:
     app.mount("/static", StaticFiles(directory="static"), name="static")
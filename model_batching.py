@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Micro-batching for Model Inference
+
+Concurrent requests to the same model are collected for a few milliseconds
+(or until a batch is full) and run as one padded ``generate`` call, so
+throughput under load grows with the batch size instead of staying at one
+request per model call.
+
+Only requests with identical generation parameters share a batch. Batches run
+one at a time on a dedicated thread per model, keeping the event loop free;
+requests arriving while a batch runs form the next one.
+
+A streamed request (tokens sent as they are produced) can't share a padded
+batch; it runs alone on the same thread, in turn with the batches.
+
+Each model's queue is bounded: beyond ``max_queue`` waiting requests, new ones
+are rejected with QueueFull right away instead of piling up behind work that
+would take minutes to drain.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 8))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 5))
+DEFAULT_MAX_QUEUE = int(os.environ.get("BATCH_MAX_QUEUE", 64))
+
+
+class QueueFull(Exception):
+    """Raised when a model's request queue is at capacity."""
+
+
+class MicroBatcher:
+    """Collects concurrent generation requests for one model into batches."""
+
+    def __init__(self, name: str, run_batch: Callable[[List[str], Dict[str, Any]], List[str]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 max_queue: int = DEFAULT_MAX_QUEUE,
+                 run_stream: Optional[Callable[[str, Dict[str, Any], Any], None]] = None):
+        """
+        Args:
+            name: Model name, used in logs and for the worker thread
+            run_batch: Blocking function generating one output per prompt with the given parameters
+            max_batch_size: Largest number of requests run together
+            max_wait_ms: How long the first request of a batch waits for others to join
+            max_queue: Most requests waiting for a batch; more are rejected with QueueFull
+            run_stream: Blocking function generating one prompt and passing its tokens to a streamer
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.run_stream = run_stream
+        # One thread per model: batches of the same model run one after another
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{name}")
+        self.pending: List[Tuple[Tuple, str, asyncio.Future, float]] = []
+        self.running = 0
+        self.streams = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self._arrived = None
+        self._worker = None
+
+    def _start(self):
+        """Start the batching task on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._arrived = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, prompt: str, params: Dict[str, Any]) -> str:
+        """
+        Queue a prompt and wait for its output.
+
+        Args:
+            prompt: Model input
+            params: Generation parameters; only requests with equal parameters are batched together
+
+        Raises:
+            QueueFull: If ``max_queue`` requests are already waiting
+            Exception: Whatever the batch function raised for this request's batch
+        """
+        self._check_queue()
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((tuple(sorted(params.items())), prompt, future, time.monotonic()))
+        self._arrived.set()
+        return await future
+
+    def submit_stream(self, prompt: str, params: Dict[str, Any], streamer) -> asyncio.Future:
+        """
+        Queue a streamed generation on the model's thread and return its future.
+
+        Args:
+            prompt: Model input
+            params: Generation parameters
+            streamer: Receives the tokens as they are generated (see model_streaming.TokenStream)
+
+        Raises:
+            QueueFull: If ``max_queue`` requests are already waiting
+        """
+        self._check_queue()
+        self.streams += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self.run_stream, prompt, params, streamer)
+        future.add_done_callback(self._stream_done)
+        return future
+
+    def _stream_done(self, future):
+        self.streams -= 1
+
+    def _check_queue(self):
+        if len(self.pending) + self.streams >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(f"{self.name} queue is full ({self.max_queue} requests waiting)")
+
+    def _next_batch(self) -> Tuple[Tuple, List[Tuple[str, asyncio.Future]]]:
+        """Take the oldest request and up to ``max_batch_size`` - 1 others with the same parameters."""
+        key = self.pending[0][0]
+        batch, rest = [], []
+        for item in self.pending:
+            if item[0] == key and len(batch) < self.max_batch_size:
+                batch.append(item)
+            else:
+                rest.append(item)
+        self.pending = rest
+        # Requests whose caller went away don't need a slot
+        return key, [(prompt, future) for _, prompt, future, _ in batch if not future.done()]
+
+    def _ready(self) -> bool:
+        key = self.pending[0][0]
+        return sum(1 for item in self.pending if item[0] == key) >= self.max_batch_size
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._arrived.wait()
+            # Give concurrent requests a few milliseconds to join the oldest one
+            while not self._ready():
+                remaining = self.pending[0][3] + self.max_wait - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            key, batch = self._next_batch()
+            # Requests left behind (other parameters, or beyond the batch size) go next
+            if self.pending:
+                self._arrived.set()
+            else:
+                self._arrived.clear()
+            if not batch:
+                continue
+
+            start = time.time()
+            prompts = [prompt for prompt, _ in batch]
+            self.running = len(batch)
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.run_batch, prompts, dict(key))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.running = 0
+
+            self.batches += 1
+            self.batched_requests += len(batch)
+            logger.info(f"{self.name}: generated a batch of {len(batch)} in {time.time() - start:.2f}s")
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue length, requests being generated and batch statistics."""
+        return {
+            "queued": len(self.pending),
+            "running": self.running,
+            "streams": self.streams,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
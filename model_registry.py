@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Lazy Model Registry with a Memory Budget
+
+Models are loaded the first time a request needs them instead of at startup,
+and stay loaded while they fit in a memory budget. When loading a model would
+exceed the budget, the least recently used idle model is evicted first.
+Models in use by a request are never evicted (the new request waits for them
+to be released, up to a timeout), and neither are pinned models.
+
+The registry only does the bookkeeping: loading and unloading are callbacks,
+so the server keeps its own model and tokenizer storage. The memory a load
+needs is estimated from the checkpoint size on disk the first time, and from
+the footprint measured after loading on later reloads.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+WEIGHT_EXTENSIONS = ('.safetensors', '.bin', '.pt', '.pth')
+DEFAULT_WAIT_TIMEOUT = float(os.environ.get("MODEL_LOAD_WAIT_TIMEOUT", 60))
+
+
+class ModelUnavailable(Exception):
+    """Raised when a model can't be loaded, or there is no room for it within the budget."""
+
+
+def default_budget() -> int:
+    """Return the memory budget in bytes: MODEL_MEMORY_BUDGET_GB, or 80% of physical memory."""
+    if os.environ.get("MODEL_MEMORY_BUDGET_GB"):
+        return int(float(os.environ["MODEL_MEMORY_BUDGET_GB"]) * GB)
+    try:
+        return int(os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') * 0.8)
+    except (ValueError, OSError, AttributeError):
+        # No way to tell (e.g. Windows): don't limit
+        return 0
+
+
+def checkpoint_size(path: str) -> int:
+    """Return the size in bytes of the weight files in a model directory (0 if there are none)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.endswith(WEIGHT_EXTENSIONS):
+                total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class _Entry:
+    def __init__(self, name: str, pinned: bool):
+        self.name = name
+        self.pinned = pinned
+        self.state = "unloaded"  # or "loading", "loaded"
+        self.bytes = 0
+        self.in_use = 0
+        self.last_used = 0.0
+        self.loads = 0
+        self.evictions = 0
+
+
+class ModelRegistry:
+    """Loads models on demand and evicts the least recently used ones to stay within a memory budget."""
+
+    def __init__(self, names: Iterable[str], load: Callable[[str], int], unload: Callable[[str], None],
+                 estimate: Callable[[str], int], budget: Optional[int] = None, pinned: Iterable[str] = (),
+                 wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+        """
+        Args:
+            names: Models the registry manages
+            load: Loads a model and returns the memory it takes, in bytes
+            unload: Drops every reference to a model so its memory can be freed
+            estimate: Returns the memory a model is expected to take before it is loaded
+            budget: Memory all loaded models may take, in bytes (default: see ``default_budget``; 0 means no limit)
+            pinned: Models that are never evicted
+            wait_timeout: Seconds a load waits for busy models to be released before giving up
+        """
+        pinned = set(pinned)
+        self.entries: Dict[str, _Entry] = {name: _Entry(name, name in pinned) for name in names}
+        self.load = load
+        self.unload = unload
+        self.estimate = estimate
+        self.budget = default_budget() if budget is None else budget
+        self.wait_timeout = wait_timeout
+        # Sizes measured after loading, better than the estimate for the next reload
+        self.measured: Dict[str, int] = {}
+        self._cond = threading.Condition()
+
+    def _used(self) -> int:
+        return sum(entry.bytes for entry in self.entries.values() if entry.state != "unloaded")
+
+    def _make_room(self, name: str, needed: int):
+        """Evict idle, unpinned models (least recently used first) until ``needed`` bytes fit."""
+        deadline = time.monotonic() + self.wait_timeout
+        while self.budget and self._used() + needed > self.budget:
+            others = [entry for entry in self.entries.values() if entry.state != "unloaded" and entry.name != name]
+            idle = [entry for entry in others if entry.state == "loaded" and not entry.in_use and not entry.pinned]
+            if idle:
+                self._evict(min(idle, key=lambda entry: entry.last_used), name)
+                continue
+            if not others:
+                logger.warning(f"{name} needs {needed / GB:.1f} GB, more than the whole budget of "
+                               f"{self.budget / GB:.1f} GB; loading it anyway")
+                return
+            busy = [entry for entry in others if not entry.pinned]
+            remaining = deadline - time.monotonic()
+            if not busy or remaining <= 0:
+                raise ModelUnavailable(
+                    f"Not enough memory to load {name} ({needed / GB:.1f} GB): {self._used() / GB:.1f} of "
+                    f"{self.budget / GB:.1f} GB held by {', '.join(entry.name for entry in others)}")
+            # Wait for a busy model to be released (or finish loading)
+            self._cond.wait(remaining)
+
+    def _evict(self, entry: _Entry, needed_by: str):
+        logger.info(f"Evicting {entry.name} ({entry.bytes / GB:.1f} GB, idle for "
+                    f"{time.time() - entry.last_used:.0f}s) to make room for {needed_by}")
+        self.unload(entry.name)
+        entry.state = "unloaded"
+        entry.bytes = 0
+        entry.evictions += 1
+
+    def acquire(self, name: str):
+        """
+        Make sure a model is loaded and mark it in use until ``release``; blocks while loading.
+
+        Raises:
+            ModelUnavailable: If the model fails to load or can't fit within the budget
+        """
+        with self._cond:
+            entry = self.entries[name]
+            while entry.state == "loading":
+                self._cond.wait()
+            entry.in_use += 1
+            entry.last_used = time.time()
+            if entry.state == "loaded":
+                return
+            # Other requests for this model wait for this load instead of starting their own
+            entry.state = "loading"
+            try:
+                needed = self.measured.get(name) or self.estimate(name)
+                self._make_room(name, needed)
+            except Exception:
+                entry.state = "unloaded"
+                entry.in_use -= 1
+                self._cond.notify_all()
+                raise
+            # Count the model against the budget while it loads
+            entry.bytes = needed
+
+        logger.info(f"Loading {name} (about {needed / GB:.1f} GB; {self._used() / GB:.1f} of "
+                    f"{self.budget / GB:.1f} GB reserved)")
+        start = time.time()
+        try:
+            size = self.load(name)
+        except Exception as e:
+            with self._cond:
+                entry.state = "unloaded"
+                entry.bytes = 0
+                entry.in_use -= 1
+                self._cond.notify_all()
+            raise ModelUnavailable(f"Failed to load {name}: {str(e)}") from e
+
+        with self._cond:
+            entry.state = "loaded"
+            entry.bytes = self.measured[name] = size
+            entry.loads += 1
+            self._cond.notify_all()
+        logger.info(f"Loaded {name} in {time.time() - start:.1f}s ({size / GB:.1f} GB)")
+
+    def release(self, name: str):
+        """Mark one use of a model as finished, making it evictable once no request uses it."""
+        with self._cond:
+            entry = self.entries[name]
+            entry.in_use -= 1
+            entry.last_used = time.time()
+            self._cond.notify_all()
+
+    async def acquire_async(self, name: str):
+        """``acquire`` on a worker thread, so loading doesn't block the event loop."""
+        future = asyncio.get_running_loop().run_in_executor(None, self.acquire, name)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The caller went away; give the model back once the load finishes
+            future.add_done_callback(lambda f: None if f.cancelled() or f.exception() else self.release(name))
+            raise
+
+    @asynccontextmanager
+    async def use(self, name: str):
+        """Hold a model (loading it if needed) for the duration of an ``async with`` block."""
+        await self.acquire_async(name)
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def preload(self, name: str):
+        """Load a model ahead of its first request, logging instead of raising on failure."""
+        try:
+            self.acquire(name)
+            self.release(name)
+        except ModelUnavailable as e:
+            logger.error(str(e))
+
+    def stats(self) -> Dict:
+        """Return the budget, the memory in use and the state of every model."""
+        now = time.time()
+        with self._cond:
+            return {
+                "budget_gb": self.budget / GB,
+                "used_gb": self._used() / GB,
+                "models": {
+                    entry.name: {
+                        "state": entry.state,
+                        "memory_gb": entry.bytes / GB,
+                        "in_use": entry.in_use,
+                        "pinned": entry.pinned,
+                        "idle_seconds": now - entry.last_used if entry.last_used and not entry.in_use else 0.0,
+                        "loads": entry.loads,
+                        "evictions": entry.evictions
+                    }
+                    for entry in self.entries.values()
+                }
+            }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Token Streaming for Model Inference
+
+Passes tokens from a generation thread to the event loop as they are produced,
+so endpoints can send text to clients over server-sent events instead of
+returning only after the whole output is decoded.
+
+TokenStream follows the streamer interface of transformers' ``generate``
+(``put`` token ids, then ``end``), so it can be given to ``generate`` as
+``streamer=`` or fed by the continuous batcher. The first ``put`` carries the
+prompt (or a seq2seq model's decoder start token); it is counted and dropped,
+which strips the prompt by token ids instead of decoding it and cutting strings.
+"""
+
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+class TokenStream:
+    """Token ids produced on a generation thread, read with ``async for`` on the event loop."""
+
+    def __init__(self):
+        # Created by the handler, on the loop that will read it
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.prompt_tokens: Optional[int] = None
+        self.cancelled = False
+        self._prompt_seen = False
+
+    def put(self, value):
+        """Called from the generating thread: the prompt ids first, then new tokens."""
+        ids = value.tolist() if hasattr(value, "tolist") else value
+        if isinstance(ids, int):
+            ids = [ids]
+        elif ids and isinstance(ids[0], list):
+            # A batch of one
+            ids = ids[0]
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            if self.prompt_tokens is None:
+                self.prompt_tokens = len(ids)
+            return
+        self._send(ids)
+
+    def end(self):
+        """Called when generation is over; safe to call more than once."""
+        self._send(None)
+
+    def cancel(self):
+        """Ask the generating thread to stop early (the client went away)."""
+        self.cancelled = True
+
+    def _send(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop is closed; nobody is listening anymore
+            pass
+
+    async def __aiter__(self):
+        while True:
+            ids = await self.queue.get()
+            if ids is None:
+                return
+            yield ids
+
+
+class IncrementalDecoder:
+    """Turns a growing list of token ids into text pieces."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.ids: List[int] = []
+        self.sent = 0
+
+    def push(self, ids: List[int]) -> str:
+        """Add tokens and return the text they complete (possibly empty)."""
+        self.ids.extend(ids)
+        # Tokens are decoded together rather than one by one, so word spacing and
+        # characters spanning several tokens come out right
+        text = self.tokenizer.decode(self.ids, skip_special_tokens=True)
+        if text.endswith("\ufffd"):
+            # Half of a multi-byte character: wait for the rest
+            return ""
+        piece = text[self.sent:]
+        if text.endswith("\n"):
+            # Start over at each line break, so decoding stays cheap on long outputs
+            self.ids = []
+            self.sent = 0
+        else:
+            self.sent = len(text)
+        return piece
+
+    def flush(self) -> str:
+        """Return any text still held back."""
+        piece = self.tokenizer.decode(self.ids, skip_special_tokens=True)[self.sent:]
+        self.ids = []
+        self.sent = 0
+        return piece
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def sse_events(stream: TokenStream, tokenizer, job: asyncio.Future, start_time: float,
+                     final: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """
+    Yield ``token`` events as text is generated, then a ``done`` event.
+
+    Args:
+        stream: Tokens of the generation
+        tokenizer: Tokenizer of the generating model
+        job: Future of the generation; its exception, if any, becomes an ``error`` event
+        start_time: When the request arrived, for the timings
+        final: Extra fields for the ``done`` event
+
+    The ``done`` event carries the prompt and completion token counts, the time
+    to the first token, the total time and the generation speed.
+    """
+    # However the generation ends (including an exception before any token), stop reading
+    job.add_done_callback(lambda _: stream.end())
+    decoder = IncrementalDecoder(tokenizer)
+    completion_tokens = 0
+    first_token_time = None
+    try:
+        async for ids in stream:
+            if first_token_time is None:
+                first_token_time = time.time() - start_time
+            completion_tokens += len(ids)
+            piece = decoder.push(ids)
+            if piece:
+                yield sse_event("token", {"text": piece})
+        piece = decoder.flush()
+        if piece:
+            yield sse_event("token", {"text": piece})
+        await job
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
+    finally:
+        # A client that disconnects closes this generator; free the model for others
+        if not job.done():
+            stream.cancel()
+
+    processing_time = time.time() - start_time
+    yield sse_event("done", dict(final or {},
+                                 prompt_tokens=stream.prompt_tokens,
+                                 completion_tokens=completion_tokens,
+                                 time_to_first_token=first_token_time,
+                                 processing_time=processing_time,
+                                 tokens_per_second=completion_tokens / processing_time if processing_time else 0.0))
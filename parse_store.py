@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Shared Parsed-Module Store
+
+Parses Python source once and keeps the result on disk so repo_analyzer.py,
+generate_callgraph.py and comments.py never parse the same file twice, even
+though they run as separate processes.
+
+Parse results are keyed by the git blob SHA-1 of the file content, the parser
+version and the Python version (the ``ast`` module differs between Python
+releases). A result holds everything the three tools need:
+
+- symbols: functions and classes in ``ast.walk`` order, with spans, arguments,
+  docstrings, the enclosing class of methods, the enclosing scope of every
+  definition and a hash of each body
+- imports: import statements in ``ast.walk`` order
+- callgraph: the FunctionVisitor output used to build call graphs, plus
+  decorators, ``__main__`` block calls and ``__all__`` exports
+
+Bump PARSER_VERSION whenever the shape of a parse result changes.
+"""
+
+import os
+import ast
+import sys
+import json
+import types
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+PARSER_VERSION = 4
+
+# Shared by every tool, wherever it is started from
+current_dir = os.path.dirname(os.path.abspath(__file__))
+PARSE_STORE_FOLDER = os.environ.get("PARSE_STORE_FOLDER", os.path.join(current_dir, "PARSE_STORE_FOLDER"))
+
+# Number of call site line numbers kept per caller/callee pair
+MAX_CALL_SITE_LINES = 5
+
+# Parse results kept in memory by this process, least recently used evicted first
+MEMORY_CACHE_ENTRIES = int(os.environ.get("PARSE_STORE_MEMORY_ENTRIES", 2048))
+
+# Parse results already loaded by this process, keyed like the files on disk
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+class FunctionVisitor(ast.NodeVisitor):
+    """AST visitor that extracts functions and methods within classes."""
+
+    def __init__(self):
+        self.functions = []
+        self.classes = {}
+        self.current_class = None
+        self.imports = {}
+        self.function_calls = {}
+        self.call_sites = {}
+        self.current_function = None
+        self.decorators = {}
+        self.main_calls = []
+        self.exports = []
+
+    def visit_Import(self, node):
+        """Process import statements."""
+        for name in node.names:
+            self.imports[name.asname or name.name] = name.name
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node):
+        """Process from...import statements."""
+        module = node.module or ''
+        for name in node.names:
+            import_name = name.asname or name.name
+            self.imports[import_name] = f"{module}.{name.name}" if module else name.name
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        """Process function definitions."""
+        if self.current_class:
+            # This is a method in a class
+            self.classes[self.current_class].append(node.name)
+        else:
+            # This is a standalone function
+            self.functions.append(node.name)
+
+        # Track the current function to record calls
+        prev_function = self.current_function
+        if self.current_class:
+            self.current_function = f"{self.current_class}.{node.name}"
+        else:
+            self.current_function = node.name
+
+        # Initialize the function calls list for this function
+        if self.current_function not in self.function_calls:
+            self.function_calls[self.current_function] = []
+            self.call_sites[self.current_function] = {}
+        
+        # Decorators mark routes and other framework entry points
+        decorators = [_call_name(decorator) for decorator in node.decorator_list]
+        if any(decorators):
+            self.decorators[self.current_function] = [name for name in decorators if name]
+
+        # Continue traversing the AST
+        self.generic_visit(node)
+
+        # Restore the previous function context
+        self.current_function = prev_function
+
+    def visit_AsyncFunctionDef(self, node):
+        """Handle async functions the same way as regular functions."""
+        self.visit_FunctionDef(node)
+
+    def visit_ClassDef(self, node):
+        """Process class definitions."""
+        # Store the current class name
+        class_name = node.name
+        self.classes[class_name] = []
+
+        # Save the previous class context
+        prev_class = self.current_class
+        self.current_class = class_name
+
+        # Visit all nodes in the class body
+        self.generic_visit(node)
+
+        # Restore the previous class context
+        self.current_class = prev_class
+
+    def visit_If(self, node):
+        """Record the calls made by a module-level ``if __name__ == '__main__':`` block."""
+        if self.current_function is None and self.current_class is None and _is_main_guard(node.test):
+            for child in node.body:
+                for call in ast.walk(child):
+                    if isinstance(call, ast.Call):
+                        func_name = _call_name(call.func)
+                        if func_name:
+                            self.main_calls.append(func_name)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        """Record a module-level ``__all__`` list."""
+        if self.current_function is None and self.current_class is None:
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == '__all__' and isinstance(node.value, (ast.List, ast.Tuple)):
+                    self.exports = [element.value for element in node.value.elts
+                                    if isinstance(element, ast.Constant) and isinstance(element.value, str)]
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        """Process function calls."""
+        if self.current_function:
+            # Try to get the function name being called
+            func_name = _call_name(node.func)
+
+            if func_name:
+                self.function_calls[self.current_function].append(func_name)
+
+                # Aggregate repeated calls to the same name into one call site entry
+                site = self.call_sites[self.current_function].setdefault(func_name, {'count': 0, 'lines': []})
+                site['count'] += 1
+                if len(site['lines']) < MAX_CALL_SITE_LINES:
+                    site['lines'].append(node.lineno)
+
+        # Continue traversing the call's arguments
+        self.generic_visit(node)
+
+
+def _call_name(func):
+    """
+    Return the name a call (or decorator) refers to.
+
+    ``f()`` gives ``f``, ``obj.method()`` gives ``obj.method`` and deeper
+    attribute chains like ``a.b.c()`` give ``...c``. Decorators written as
+    calls (``@app.get("/")``) are named after the called function.
+    """
+    if isinstance(func, ast.Call):
+        return _call_name(func.func)
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        if isinstance(func.value, ast.Name):
+            # Could be a method call on an object or a module.function call
+            return f"{func.value.id}.{func.attr}"
+        # This handles more complex cases like a.b.c()
+        return f"...{func.attr}"
+    return None
+
+
+def _is_main_guard(test):
+    """Check whether an ``if`` test is ``__name__ == '__main__'``."""
+    return (isinstance(test, ast.Compare)
+            and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+            and len(test.comparators) == 1
+            and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == '__main__')
+
+
+def blob_hash(content: bytes) -> str:
+    """Return the git blob SHA-1 of some file content (what ``git hash-object`` prints)."""
+    digest = hashlib.sha1()
+    digest.update(b"blob %d\0" % len(content))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def _body_hash(node) -> str:
+    """
+    Hash the AST of a function or class, ignoring positions and formatting.
+
+    A class is hashed without its methods, which are hashed on their own, so
+    editing one method doesn't mark the whole class as changed.
+    """
+    if isinstance(node, ast.ClassDef):
+        parts = node.bases + node.keywords + node.decorator_list + [
+            child for child in node.body if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+        dump = node.name + ''.join(ast.dump(part) for part in parts)
+    else:
+        dump = ast.dump(node)
+    return hashlib.sha1(dump.encode('utf-8')).hexdigest()
+
+
+def _span(node) -> Dict[str, int]:
+    """Return the source span of an AST node."""
+    return {
+        'lineno': node.lineno,
+        'end_lineno': node.end_lineno,
+        'col_offset': node.col_offset,
+        'end_col_offset': node.end_col_offset
+    }
+
+
+def parse_source(source: str) -> Dict[str, Any]:
+    """
+    Parse Python source into a JSON-serializable parse result.
+
+    Syntax errors don't raise: the result carries an ``error`` message and
+    empty symbol lists, so callers can report the error the way they used to.
+
+    Args:
+        source: Python source code
+
+    Returns:
+        Dictionary with module docstring, symbols, imports and call graph data
+    """
+    result = {
+        'parser_version': PARSER_VERSION,
+        'error': None,
+        'module_docstring': None,
+        'symbols': [],
+        'imports': [],
+        'callgraph': {'functions': [], 'classes': {}, 'function_calls': {}, 'call_sites': {}, 'imports': {},
+                      'decorators': {}, 'main_calls': [], 'exports': []}
+    }
+
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+
+    result['module_docstring'] = ast.get_docstring(tree)
+
+    # Methods are the functions defined directly in a class body
+    method_class = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                method_class[id(child)] = node.name
+
+    # Dotted names of the functions and classes around each definition (None at module
+    # level), so a nested function isn't mistaken for a top-level one of the same name
+    scopes = {}
+
+    def record_scopes(parent, scope):
+        for child in ast.iter_child_nodes(parent):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                scopes[id(child)] = scope
+                record_scopes(child, f"{scope}.{child.name}" if scope else child.name)
+            else:
+                record_scopes(child, scope)
+
+    record_scopes(tree, None)
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for name in node.names:
+                result['imports'].append({'kind': 'import', 'module': name.name, 'name': None, 'alias': name.asname})
+        elif isinstance(node, ast.ImportFrom):
+            for name in node.names:
+                result['imports'].append({'kind': 'from', 'module': node.module or '', 'name': name.name,
+                                          'alias': name.asname, 'level': node.level})
+        elif isinstance(node, ast.ClassDef):
+            result['symbols'].append(dict(_span(node), type='class', name=node.name,
+                                          docstring=ast.get_docstring(node), scope=scopes.get(id(node)),
+                                          body_hash=_body_hash(node)))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            result['symbols'].append(dict(_span(node), type='function', name=node.name,
+                                          is_async=isinstance(node, ast.AsyncFunctionDef),
+                                          args=[arg.arg for arg in node.args.args],
+                                          docstring=ast.get_docstring(node),
+                                          class_name=method_class.get(id(node)),
+                                          scope=scopes.get(id(node)),
+                                          body_hash=_body_hash(node)))
+
+    visitor = FunctionVisitor()
+    visitor.visit(tree)
+    result['callgraph'] = {
+        'functions': visitor.functions,
+        'classes': visitor.classes,
+        'function_calls': visitor.function_calls,
+        'call_sites': visitor.call_sites,
+        'imports': visitor.imports,
+        'decorators': visitor.decorators,
+        'main_calls': visitor.main_calls,
+        'exports': visitor.exports
+    }
+    return result
+
+
+def _store_key(blob: str) -> str:
+    """Key a blob by parser and Python version."""
+    return f"{blob}-v{PARSER_VERSION}-py{sys.version_info.major}{sys.version_info.minor}"
+
+
+def _store_path(key: str) -> str:
+    """Return the on-disk path of a parse result, fanned out by hash prefix."""
+    return os.path.join(PARSE_STORE_FOLDER, key[:2], f"{key}.json")
+
+
+def _remember(key: str, result: Dict[str, Any]):
+    """Keep a parse result in memory, evicting the least recently used beyond the cap."""
+    with _memory_lock:
+        _memory_cache[key] = result
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def load_cached(blob: str) -> Optional[Dict[str, Any]]:
+    """Return the stored parse result for a blob SHA, or None if it was never parsed."""
+    key = _store_key(blob)
+    with _memory_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    path = _store_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        # A corrupt entry is treated as missing and re-parsed
+        return None
+
+    _remember(key, result)
+    return result
+
+
+def store(blob: str, result: Dict[str, Any]):
+    """Save a parse result for a blob SHA in memory and on disk."""
+    key = _store_key(blob)
+    _remember(key, result)
+
+    path = _store_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent processes never read half a result
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: could not save parse result to {path}: {e}", file=sys.stderr)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_parsed_bytes(content: bytes) -> Dict[str, Any]:
+    """Return the parse result for raw file content, parsing it only on a cache miss."""
+    blob = blob_hash(content)
+    result = load_cached(blob)
+    if result is None:
+        # A file that isn't valid UTF-8 is parsed with replacement characters, as in
+        # callgraph_history, rather than failing the caller
+        result = parse_source(content.decode('utf-8', errors='replace'))
+        result['blob'] = blob
+        store(blob, result)
+    return result
+
+
+def load_parsed_source(source: str) -> Dict[str, Any]:
+    """Return the parse result for a source string."""
+    return load_parsed_bytes(source.encode('utf-8'))
+
+
+def load_parsed_file(file_path: str) -> Dict[str, Any]:
+    """Return the parse result for a Python file on disk."""
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    return load_parsed_bytes(content)
+
+
+def source_segment(source: str, symbol: Dict[str, Any]) -> Optional[str]:
+    """Return the source text of a symbol, like ``ast.get_source_segment``."""
+    return ast.get_source_segment(source, types.SimpleNamespace(**{
+        key: symbol[key] for key in ('lineno', 'end_lineno', 'col_offset', 'end_col_offset')
+    }))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Prefix KV Cache for Causal Language Models
+
+Templated prompts share long fixed beginnings (an instruction block followed
+by the part that changes). In a causal model the keys and values of a token
+depend only on the tokens before it, so the KV cache computed for a shared
+prefix is valid for every prompt starting with it: prefilling such a prompt
+only needs to run the tokens after the prefix.
+
+Prefixes are matched on token ids, never on text, so a prompt whose
+tokenization differs at the prefix boundary simply reuses a shorter prefix.
+Which prefixes get stored:
+
+- registered prefixes (e.g. an instruction block), the first time a prompt
+  starting with them is seen;
+- frequently seen ones: the longest beginning a prompt shares with one of the
+  recent prompts, if it is long enough to be worth keeping.
+
+Both are sliced from the KV cache the prompt's own prefill just computed, so
+storing costs a copy, not a forward pass. Entries are evicted least recently
+used first to stay within a memory bound.
+"""
+
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_MB = float(os.environ.get("PREFIX_CACHE_MB", 512))
+# Shorter shared beginnings aren't worth an entry
+DEFAULT_MIN_TOKENS = int(os.environ.get("PREFIX_CACHE_MIN_TOKENS", 32))
+# Prompts remembered for spotting shared beginnings
+DEFAULT_RECENT = 32
+
+
+def _common_length(a: List[int], b: List[int]) -> int:
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class PrefixCache:
+    """LRU cache of per-layer (key, value) tensors for prompt prefixes, bounded in bytes."""
+
+    def __init__(self, max_mb: float = DEFAULT_MAX_MB, min_tokens: int = DEFAULT_MIN_TOKENS,
+                 recent: int = DEFAULT_RECENT):
+        """
+        Args:
+            max_mb: Memory the cached tensors may take
+            min_tokens: Shortest prefix worth caching
+            recent: Number of recent prompts compared with new ones to find shared beginnings
+        """
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.min_tokens = min_tokens
+        self.entries: "OrderedDict[Tuple[int, ...], Tuple[Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.recent: deque = deque(maxlen=recent)
+        self.registered: List[str] = []
+        self._registered_ids: List[List[int]] = []
+        self._tokenizer = None
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self._lock = threading.Lock()
+
+    def register(self, text: str):
+        """Cache the KV of ``text`` the first time a prompt starting with it is prefilled."""
+        with self._lock:
+            if text not in self.registered:
+                self.registered.append(text)
+                self._tokenizer = None
+
+    def lookup(self, ids: List[int]) -> Tuple[int, Optional[Any]]:
+        """
+        Find the longest cached prefix of a prompt.
+
+        Returns:
+            The prefix length and its per-layer (key, value) tensors, or (0, None).
+            At least one prompt token is always left to run, for the next-token logits.
+        """
+        with self._lock:
+            best = None
+            for key in self.entries:
+                if len(key) < len(ids) and (best is None or len(key) > len(best)) and tuple(ids[:len(key)]) == key:
+                    best = key
+            if best is None:
+                self.misses += 1
+                return 0, None
+            self.entries.move_to_end(best)
+            self.hits += 1
+            self.reused_tokens += len(best)
+            return len(best), self.entries[best][0]
+
+    def remember(self, ids: List[int], past, tokenizer, reused: int = 0):
+        """
+        Store the prefix of a just-prefilled prompt worth caching, if any.
+
+        Args:
+            ids: Prompt token ids
+            past: Per-layer (key, value) tensors of the whole prompt, [1, heads, length, head_dim]
+            tokenizer: Tokenizer of the model, for the registered prefixes
+            reused: Length of the cached prefix the prompt already started from
+        """
+        with self._lock:
+            length = self._worth_caching(ids, tokenizer)
+            self.recent.append(ids)
+            # Leave one token to run; a prompt that started from a cached prefix needs to
+            # extend it by a worthwhile amount
+            length = min(length, len(ids) - 1)
+            if length < reused + self.min_tokens or tuple(ids[:length]) in self.entries:
+                return
+            prefix = tuple((key[:, :, :length].clone(), value[:, :, :length].clone()) for key, value in past)
+            size = sum(key.numel() * key.element_size() + value.numel() * value.element_size()
+                       for key, value in prefix)
+            if size > self.max_bytes:
+                return
+            self.entries[tuple(ids[:length])] = (prefix, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def _worth_caching(self, ids: List[int], tokenizer) -> int:
+        """Return the length of the longest registered or recently seen prefix of ``ids``."""
+        if tokenizer is not self._tokenizer:
+            # The last token of a registered prefix may merge with the text that follows
+            self._registered_ids = [tokenizer(text).input_ids[:-1] for text in self.registered]
+            self._tokenizer = tokenizer
+        length = 0
+        for prefix in self._registered_ids:
+            if len(prefix) > length and ids[:len(prefix)] == prefix:
+                length = len(prefix)
+        for previous in self.recent:
+            length = max(length, _common_length(ids, previous))
+        return length
+
+    def clear(self):
+        """Drop every entry (e.g. when the model is unloaded)."""
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.recent.clear()
+            self._tokenizer = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit counts, tokens not recomputed and memory used."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "memory_mb": self.bytes / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "reused_tokens": self.reused_tokens,
+                "registered": len(self.registered)
+            }
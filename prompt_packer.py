@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Prompt Packer
+
+Fills a prompt with as much useful context as fits in the model's context
+window. Candidate items (entry points, top-ranked functions, module docstrings,
+dependencies, folders...) are given an information value. The packer adds them
+greedily from the most to the least valuable, truncating an item that doesn't
+fit whole at a word boundary, and stops spending tokens once the budget is used.
+
+Tokens are counted with the model's own tokenizer when it can be loaded, and
+estimated from the text length otherwise.
+"""
+
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+# Characters per token used when no tokenizer is available (code is denser than prose)
+CHARS_PER_TOKEN = 3.5
+
+# Items that would be truncated below this many tokens are skipped instead
+MIN_ITEM_TOKENS = 12
+
+TRUNCATION_MARK = "..."
+
+# Tokenizers already loaded by this process (None when loading failed)
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+
+def _load_tokenizer(tokenizer_name):
+    """Load a tokenizer once per process, returning None if it isn't available."""
+    with _tokenizers_lock:
+        if tokenizer_name not in _tokenizers:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizers[tokenizer_name] = AutoTokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                print(f"Tokenizer {tokenizer_name} unavailable ({str(e)[:100]}); estimating token counts")
+                _tokenizers[tokenizer_name] = None
+        return _tokenizers[tokenizer_name]
+
+
+class TokenCounter:
+    """Counts and truncates text in model tokens."""
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.tokenizer = _load_tokenizer(tokenizer_name) if tokenizer_name else None
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in a text."""
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Shorten a text to at most ``max_tokens`` tokens, ending on a whole word."""
+        if self.count(text) <= max_tokens:
+            return text
+
+        budget = max_tokens - self.count(TRUNCATION_MARK)
+        if self.tokenizer is not None:
+            ids = self.tokenizer.encode(text, add_special_tokens=False)
+            shortened = self.tokenizer.decode(ids[:max(budget, 0)], skip_special_tokens=True)
+        else:
+            shortened = text[:int(max(budget, 0) * CHARS_PER_TOKEN)]
+
+        # Drop the last, possibly cut, word
+        if ' ' in shortened:
+            shortened = shortened.rsplit(' ', 1)[0]
+        return shortened.rstrip(' ,;:') + TRUNCATION_MARK
+
+
+class PromptPacker:
+    """Greedily packs valued items into sections within a token budget."""
+
+    def __init__(self, budget: int, counter: Optional[TokenCounter] = None):
+        """
+        Args:
+            budget: Number of tokens the packed sections may use
+            counter: Token counter (defaults to the length estimate)
+        """
+        self.budget = budget
+        self.counter = counter or TokenCounter()
+        self.items = []
+        self.used = self.truncated = self.dropped = 0
+
+    def add(self, section: str, text: str, value: float):
+        """Offer an item for a section; higher values are packed first."""
+        if text:
+            self.items.append((value, len(self.items), section, text))
+
+    def pack(self) -> Dict[str, List[str]]:
+        """
+        Pack the items.
+
+        Returns:
+            Dictionary mapping section headers to their packed lines, most valuable first
+        """
+        sections = defaultdict(list)
+        remaining = self.budget
+        self.truncated = 0
+        self.dropped = 0
+
+        items = sorted(self.items, key=lambda item: (-item[0], item[1]))
+        for index, (value, _, section, text) in enumerate(items):
+            if remaining < MIN_ITEM_TOKENS:
+                # The budget is spent: leave the rest out without counting them
+                self.dropped += len(items) - index
+                break
+
+            # A section costs its header once, plus a newline per line
+            header_cost = 0 if section in sections else self.counter.count(section) + 2
+            cost = header_cost + self.counter.count(text) + 1
+            if cost <= remaining:
+                sections[section].append(text)
+                remaining -= cost
+                continue
+
+            room = remaining - header_cost - 1
+            if room >= MIN_ITEM_TOKENS:
+                shortened = self.counter.truncate(text, room)
+                shortened_cost = self.counter.count(shortened)
+                # Decoding and re-encoding truncated tokens can come out longer than asked for
+                if shortened_cost <= room:
+                    sections[section].append(shortened)
+                    remaining -= header_cost + shortened_cost + 1
+                    self.truncated += 1
+                    continue
+            self.dropped += 1
+
+        self.used = self.budget - remaining
+        return dict(sections)
+
+    @staticmethod
+    def render(sections: Dict[str, List[str]], order: List[str]) -> str:
+        """Render packed sections in a fixed order, skipping empty ones."""
+        blocks = [section + "\n" + "\n".join(sections[section]) for section in order if sections.get(section)]
+        return "\n\n".join(blocks)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Reachability Analysis
+
+Finds the functions and methods that can actually run, starting from the entry
+points of a repository, so repo_analyzer.py can spend model time on live code
+before (or instead of) dead helpers and test scaffolding.
+
+Entry points are detected from:
+- ``if __name__ == '__main__':`` blocks
+- console scripts and entry points declared in setup.py, setup.cfg or pyproject.toml
+- FastAPI/Flask route decorators (``@app.get``, ``@router.post``, ``@bp.route``, ...)
+- public package exports (``__all__``, or the public names of an ``__init__.py``)
+
+Reachability follows the call edges of the generate_callgraph.py call graph
+model, plus two rules the name-based call graph misses: ``self.method()`` calls
+inside a class, and classes being reached as a whole (once a class is
+constructed or one of its methods runs, any other method may be called on the
+instance).
+
+Usage:
+  python reachability.py /path/to/repo
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from collections import defaultdict, deque
+
+from generate_callgraph import build_call_graph, analyze_python_file, build_module_index, resolve_callee
+
+
+# Last part of a decorator name that marks a web framework handler
+ROUTE_DECORATORS = {
+    'route', 'get', 'post', 'put', 'patch', 'delete', 'head', 'options', 'websocket', 'api_route',
+    'on_event', 'middleware', 'exception_handler', 'errorhandler',
+    'before_request', 'after_request', 'teardown_request',
+}
+
+# Packaging files that can declare console scripts
+PACKAGING_FILES = ('setup.py', 'setup.cfg', 'pyproject.toml')
+
+# name = package.module:function, as written in all three packaging files
+ENTRY_POINT = re.compile(r'''([\w.-]+)\s*=\s*["']?([\w.]+):([\w.]+)''')
+
+
+def _is_route(decorator):
+    """Check whether a decorator name looks like ``app.get`` or ``bp.route``."""
+    return '.' in decorator and decorator.split('.')[-1] in ROUTE_DECORATORS
+
+
+def _caller_node(caller, file_node, analysis):
+    """Return the node id of a function or method recorded by FunctionVisitor."""
+    caller_parts = caller.split('.')
+    if len(caller_parts) > 1 and caller_parts[0] in analysis['classes']:
+        return f"{file_node}_{caller_parts[0]}->{caller_parts[1]}", caller_parts[0]
+    return f"{file_node}->{caller}", None
+
+
+def resolve_name(name, file_node, analysis, module_index, nodes, caller_class=None):
+    """
+    Return the function, method or class node a name refers to, or None.
+
+    Extends ``resolve_callee`` with ``self.method`` calls and class names, so
+    constructing a class reaches its class node.
+    """
+    name_parts = name.split('.')
+    if caller_class and len(name_parts) == 2 and name_parts[0] in ('self', 'cls'):
+        target = f"{file_node}_{caller_class}->{name_parts[1]}"
+        return target if target in nodes else None
+    if name in analysis['classes']:
+        return f"{file_node}_{name}"
+
+    target = resolve_callee(name, file_node, analysis, module_index)
+    if target is None:
+        return None
+    if target in nodes:
+        return target
+
+    # Imported classes resolve like functions (file->Name) but live at file_Name
+    target_file, attr = target.rsplit('->', 1)
+    class_node = f"{target_file}_{attr}"
+    return class_node if class_node in nodes else None
+
+
+def load_analyses(repo_path, graph):
+    """Return (file_node, analysis) pairs for the files of a call graph model."""
+    analyses = []
+    for node_id, node in graph['nodes'].items():
+        if node['kind'] == 'file':
+            # Parse results come from the parse store, so this doesn't parse again
+            analyses.append((node_id, analyze_python_file(os.path.join(repo_path, node['file']))))
+    return analyses
+
+
+def console_scripts(repo_path):
+    """Return (module, attribute) pairs declared as entry points in packaging files."""
+    scripts = []
+    for file_name in PACKAGING_FILES:
+        path = os.path.join(repo_path, file_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        scripts.extend((module, attr) for _, module, attr in ENTRY_POINT.findall(content))
+    return scripts
+
+
+def find_entry_points(repo_path, graph, analyses, module_index):
+    """
+    Detect the entry points of a repository.
+
+    Returns:
+        Dictionary mapping node ids to the reason they are an entry point
+    """
+    nodes = graph['nodes']
+    entry_points = {}
+
+    def add(node_id, reason):
+        if node_id and node_id in nodes:
+            entry_points.setdefault(node_id, reason)
+
+    for file_node, analysis in analyses:
+        # Calls made under if __name__ == '__main__':
+        for name in analysis.get('main_calls', []):
+            add(resolve_name(name, file_node, analysis, module_index, nodes), '__main__ block')
+
+        # Web framework handlers
+        for function, decorators in analysis.get('decorators', {}).items():
+            if any(_is_route(decorator) for decorator in decorators):
+                add(_caller_node(function, file_node, analysis)[0], 'route')
+
+        # Public package exports
+        if file_node.split('.')[-1] == '__init__':
+            exports = analysis.get('exports') or [
+                name for name in list(analysis['functions']) + list(analysis['classes']) + list(analysis['imports'])
+                if not name.startswith('_')
+            ]
+            for name in exports:
+                add(resolve_name(name, file_node, analysis, module_index, nodes), 'package export')
+
+    for module, attr in console_scripts(repo_path):
+        target_file = module_index.get(module)
+        if target_file is None:
+            continue
+        attr_parts = attr.split('.')
+        if len(attr_parts) == 2:
+            add(f"{target_file}_{attr_parts[0]}->{attr_parts[1]}", 'console script')
+        else:
+            add(f"{target_file}->{attr}", 'console script')
+
+    return entry_points
+
+
+def call_successors(graph, analyses, module_index):
+    """
+    Return the callees of every function and method as a dict of sets.
+
+    Call edges come from the call graph model, plus ``self.method()`` calls and
+    class constructions (which point at the class node).
+    """
+    nodes = graph['nodes']
+    successors = defaultdict(set)
+    for edge in graph['edges']:
+        if edge['kind'] == 'calls':
+            successors[edge['source']].add(edge['target'])
+
+    for file_node, analysis in analyses:
+        for caller, callees in analysis['call_sites'].items():
+            caller_node, caller_class = _caller_node(caller, file_node, analysis)
+            for callee in callees:
+                target = resolve_name(callee, file_node, analysis, module_index, nodes, caller_class)
+                if target is not None:
+                    successors[caller_node].add(target)
+    return successors
+
+
+def reachable_nodes(graph, analyses, module_index, entry_points):
+    """
+    Return every function, method and class node reachable from the entry points.
+
+    Reaching a method reaches its class and reaching a class reaches all of its
+    methods.
+    """
+    nodes = graph['nodes']
+    successors = call_successors(graph, analyses, module_index)
+    for edge in graph['edges']:
+        if edge['kind'] == 'contains' and nodes[edge['source']]['kind'] == 'class':
+            # class -> method, and back
+            successors[edge['source']].add(edge['target'])
+            successors[edge['target']].add(edge['source'])
+
+    reachable = set(entry_points)
+    queue = deque(entry_points)
+    while queue:
+        current = queue.popleft()
+        for target in successors.get(current, ()):
+            if target not in reachable:
+                reachable.add(target)
+                queue.append(target)
+    return reachable
+
+
+def analyze_reachability(repo_path):
+    """
+    Compute the live code of a repository.
+
+    Returns:
+        Dictionary with the call graph model, the detected entry points (node id
+        to reason) and the set of reachable node ids
+    """
+    graph = build_call_graph(repo_path)
+    analyses = load_analyses(repo_path, graph)
+    module_index = build_module_index(file_node for file_node, _ in analyses)
+
+    entry_points = find_entry_points(repo_path, graph, analyses, module_index)
+    reachable = reachable_nodes(graph, analyses, module_index, entry_points)
+    return {'graph': graph, 'entry_points': entry_points, 'reachable': reachable}
+
+
+def reachable_functions(repo_path):
+    """
+    Return the live functions of a repository as (relative file path, name) pairs.
+
+    Methods are listed by their bare name, the way repo_analyzer.py keys them.
+    Returns None when no entry point was detected, since everything would look dead.
+    """
+    result = analyze_reachability(repo_path)
+    if not result['entry_points']:
+        return None
+
+    live = set()
+    for node_id in result['reachable']:
+        node = result['graph']['nodes'][node_id]
+        if node['kind'] in ('function', 'method'):
+            live.add((os.path.normpath(node['file']), node['name']))
+    return live
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List the functions reachable from the entry points of a repository')
+    parser.add_argument('repo_path', help='Path to the repository')
+
+    args = parser.parse_args()
+
+    result = analyze_reachability(args.repo_path)
+    nodes = result['graph']['nodes']
+    callables = {node_id for node_id, node in nodes.items() if node['kind'] in ('function', 'method')}
+    live = sorted(node_id for node_id in result['reachable'] if node_id in callables)
+
+    print(json.dumps({
+        'entry_points': result['entry_points'],
+        'reachable': live,
+        'total_functions': len(callables),
+        'reachable_functions': len(live)
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,9 @@ import datetime
 import requests
 from dotenv import load_dotenv
 
+from callgraph_digest import load_digest
+from response_cache import cached_post_json, get_cache
+
 # Load environment variables from .env file
 load_dotenv()
 FASTAPI_AUTH = os.getenv("FASTAPI_AUTH")
@@ -19,6 +22,7 @@ if not FASTAPI_AUTH:
 current_dir = os.path.dirname(os.path.abspath(__file__))
 README_FOLDER = os.path.join(current_dir, "README_FOLDER")
 LLAMA_README_FOLDER = os.path.join(os.path.expanduser("~"), "Documents", "7th Semester", "FYP", "Sample-App-FYP", "README_FOLDER")
+CALLGRAPHS_FOLDER = os.getenv("CALLGRAPHS_FOLDER", os.path.join(os.path.expanduser("~"), "Documents", "7th Semester", "FYP", "Sample-App-FYP", "CALLGRAPHS_FOLDER"))
 DB_PATH = os.path.join(README_FOLDER, "readme_database.db")
 SIMPLE_DB_PATH = os.path.join(README_FOLDER, "simple_readme_database.db")
 
@@ -333,10 +337,7 @@ def simplify_readme_without_call_graph(llama_readme, repo_url, repo_name):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        result = response.json()
+        result = cached_post_json(url, headers, data)
         
         if "choices" in result and len(result["choices"]) > 0:
             return result["choices"][0]["message"]["content"]
@@ -414,10 +415,7 @@ def generate_readme_with_call_graph(repo_url, repo_name, commit_info=None):
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = cached_post_json(url, headers, data)
             
             if "choices" in result and len(result["choices"]) > 0:
                 return result["choices"][0]["message"]["content"]
@@ -501,6 +499,11 @@ def improve_readme_with_call_graph(llama_readme, repo_url, repo_name):
     Return the complete improved README content.
     """
     
+    # A compact digest of the call graph lets the usage examples follow the real entry points
+    call_graph_digest = load_digest(os.path.join(CALLGRAPHS_FOLDER, f"{repo_name}.graph.json"))
+    if call_graph_digest:
+        user_prompt += f"\n\nStructure of the code from its call graph:\n{call_graph_digest}"
+    
     url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Content-Type": "application/json",
@@ -517,10 +520,7 @@ def improve_readme_with_call_graph(llama_readme, repo_url, repo_name):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        result = response.json()
+        result = cached_post_json(url, headers, data)
         
         if "choices" in result and len(result["choices"]) > 0:
             return result["choices"][0]["message"]["content"]
@@ -590,10 +590,7 @@ def generate_readme_without_call_graph(repo_url, repo_name, commit_info=None):
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = cached_post_json(url, headers, data)
             
             if "choices" in result and len(result["choices"]) > 0:
                 return result["choices"][0]["message"]["content"]
@@ -762,10 +759,7 @@ def update_readme(old_readme, repo_url, repo_name, commit_message, files_changed
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        
-        result = response.json()
+        result = cached_post_json(url, headers, data)
         
         if "choices" in result and len(result["choices"]) > 0:
             return result["choices"][0]["message"]["content"]
@@ -898,6 +892,9 @@ if __name__ == "__main__":
             simple = True
         elif arg.lower() in ['--no-callgraph', '-nc']:
             with_callgraph = False
+        elif arg.lower() == '--no-cache':
+            # Ask the model again instead of reusing a cached response
+            get_cache().bypass = True
     
     # For normal generation and with_callgraph, both use the improved version
     # Only simple README uses the simplified version
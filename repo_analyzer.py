@@ -1,29 +1,36 @@
 #!/usr/bin/env python3
 import os
 import re
-import ast
 import json
 import tempfile
 import shutil
+import time
 import argparse
 from git import Repo
 from typing import Dict, List, Tuple, Any
 import torch
 from transformers import T5ForConditionalGeneration, AutoTokenizer
 
+from parse_store import load_parsed_file
+from reachability import reachable_functions
+from callgraph_history import analyze_history, save_history
+
 class GitHubPythonAnalyzer:
     """Analyzes a GitHub repository and extracts function definitions from Python files."""
     
-    def __init__(self, repo_url: str, use_finetuned: bool = True):
+    def __init__(self, repo_url: str, use_finetuned: bool = True, reachable_mode: str = None):
         """
         Initialize the analyzer with a GitHub repository URL.
         
         Args:
             repo_url: URL to the GitHub repository
             use_finetuned: Whether to use the personally fine-tuned model
+            reachable_mode: 'first' to summarize functions reachable from entry points
+                            before the rest, 'only' to skip unreachable functions, or None
         """
         self.repo_url = repo_url
         self.use_finetuned = use_finetuned
+        self.reachable_mode = reachable_mode
         
         # Get repository name from URL for file naming
         self.repo_name = repo_url.split('/')[-1]
@@ -46,6 +53,10 @@ class GitHubPythonAnalyzer:
         self.analysis_results = {}
         self.model_results = {}
         
+        # Commit range charted by analyze_history (None skips it)
+        self.history_range = None
+        self.history_max_commits = None
+        
         # Path to fine-tuned model
         self.finetuned_model_path = os.path.join(os.path.expanduser('~'), 'Documents', '7th Semester', 'FYP', 
                                               'Sample-App-FYP', 'code-summarization-lora-manual')
@@ -140,41 +151,32 @@ class GitHubPythonAnalyzer:
         functions = {}
         imports = []
         classes = []
+        module_docstring = None
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            # Parse results are shared with the call graph and commenter through the parse store
+            parsed = load_parsed_file(file_path)
+            if parsed['error']:
+                raise SyntaxError(parsed['error'])
             
-            tree = ast.parse(content)
+            module_docstring = parsed['module_docstring']
             
             # Extract imports
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.append(name.name)
-                elif isinstance(node, ast.ImportFrom):
-                    module = node.module or ''
-                    for name in node.names:
-                        if module:
-                            imports.append(f"from {module} import {name.name}")
-                        else:
-                            imports.append(f"import {name.name}")
-                elif isinstance(node, ast.ClassDef):
-                    classes.append(node.name)
-                elif isinstance(node, ast.FunctionDef):
-                    func_name = node.name
-                    
-                    # Get function arguments
-                    args = []
-                    for arg in node.args.args:
-                        args.append(arg.arg)
-                    
-                    # Extract function docstring if available
-                    docstring = ast.get_docstring(node)
-                    
-                    functions[func_name] = {
-                        'arguments': args,
-                        'docstring': docstring
+            for imported in parsed['imports']:
+                if imported['kind'] == 'import':
+                    imports.append(imported['module'])
+                elif imported['module']:
+                    imports.append(f"from {imported['module']} import {imported['name']}")
+                else:
+                    imports.append(f"import {imported['name']}")
+            
+            for symbol in parsed['symbols']:
+                if symbol['type'] == 'class':
+                    classes.append(symbol['name'])
+                elif not symbol['is_async']:
+                    functions[symbol['name']] = {
+                        'arguments': symbol['args'],
+                        'docstring': symbol['docstring']
                     }
         except Exception as e:
             print(f"Error parsing {file_path}: {str(e)}")
@@ -182,7 +184,8 @@ class GitHubPythonAnalyzer:
         return {
             'functions': functions,
             'imports': imports,
-            'classes': classes
+            'classes': classes,
+            'module_docstring': module_docstring
         }
     
     def extract_function_code(self, file_path: str, function_name: str) -> str:
@@ -200,13 +203,14 @@ class GitHubPythonAnalyzer:
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
             
-            tree = ast.parse(content)
+            # Reuse the stored spans instead of parsing the file again for every function
+            parsed = load_parsed_file(file_path)
             
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) and node.name == function_name:
+            for symbol in parsed['symbols']:
+                if symbol['type'] == 'function' and not symbol['is_async'] and symbol['name'] == function_name:
                     # Get the function source code
-                    func_start = node.lineno - 1  # Line numbers are 1-indexed
-                    func_end = node.end_lineno
+                    func_start = symbol['lineno'] - 1  # Line numbers are 1-indexed
+                    func_end = symbol['end_lineno']
                     
                     # Get the function lines
                     lines = content.splitlines()[func_start:func_end]
@@ -280,38 +284,111 @@ class GitHubPythonAnalyzer:
             print("Processing functions with CodeT5 model...")
             
         model_results = {}
+        jobs = []
         
         for folder_path, files in self.analysis_results.items():
             model_results[folder_path] = {}
             
             for file_name, file_info in files.items():
                 model_results[folder_path][file_name] = {}
-                full_path = os.path.join(self.temp_dir, folder_path, file_name)
                 
-                # Process each function in the file
                 for func_name in file_info.get('functions', {}):
-                    print(f"Processing function: {func_name} in {folder_path}/{file_name}")
-                    
-                    # Extract function code
-                    func_code = self.extract_function_code(full_path, func_name)
-                    
-                    if func_code:
-                        # Generate summary with T5
-                        summary = self.summarize_function_with_t5(func_code)
-                        
-                        # Store the results
-                        model_results[folder_path][file_name][func_name] = {
-                            'code': func_code,
-                            'summary': summary
-                        }
+                    jobs.append((folder_path, file_name, func_name))
+        
+        live = self.find_live_functions() if self.reachable_mode else None
+        if live is not None:
+            def is_live(job):
+                return (os.path.normpath(os.path.join(job[0], job[1])), job[2]) in live
+            
+            live_count = sum(1 for job in jobs if is_live(job))
+            print(f"{live_count} of {len(jobs)} functions are reachable from entry points")
+            if self.reachable_mode == 'only':
+                skipped = len(jobs) - live_count
+                jobs = [job for job in jobs if is_live(job)]
+            else:
+                skipped = 0
+                # Stable sort: reachable functions first, each group in file order
+                jobs.sort(key=lambda job: not is_live(job))
+        else:
+            live_count = skipped = 0
+        
+        summary_time = 0.0
+        summary_count = 0
+        
+        # Process each function
+        for i, (folder_path, file_name, func_name) in enumerate(jobs):
+            print(f"Processing function: {func_name} in {folder_path}/{file_name}")
+            full_path = os.path.join(self.temp_dir, folder_path, file_name)
+            
+            # Extract function code
+            func_code = self.extract_function_code(full_path, func_name)
+            
+            if func_code:
+                # Generate summary with T5
+                start = time.time()
+                summary = self.summarize_function_with_t5(func_code)
+                summary_time += time.time() - start
+                summary_count += 1
+                
+                # Store the results
+                model_results[folder_path][file_name][func_name] = {
+                    'code': func_code,
+                    'summary': summary
+                }
+            
+            if self.reachable_mode == 'first' and i + 1 == live_count:
+                # Live code is done; save it before starting on the rest
+                self.save_model_results(model_results)
         
         # Save the model results
         self.model_results = model_results
+        self.save_model_results(model_results)
+        
+        if skipped:
+            avoided = summary_time / summary_count * skipped if summary_count else 0.0
+            print(f"Skipped {skipped} unreachable functions ({skipped / (skipped + len(jobs)):.0%}), "
+                  f"avoiding about {avoided:.1f}s of inference")
+    
+    def find_live_functions(self):
+        """
+        Find the functions reachable from the repository's entry points.
+        
+        Returns:
+            Set of (relative file path, function name) pairs, or None if no
+            entry point was found (every function is summarized then)
+        """
+        try:
+            live = reachable_functions(self.temp_dir)
+        except Exception as e:
+            print(f"Error computing reachable functions: {str(e)}")
+            return None
+        
+        if live is None:
+            print("No entry points found; summarizing all functions")
+        return live
+    
+    def save_model_results(self, model_results):
+        """Save function summaries to the model output file."""
         with open(self.model_output_file, 'w', encoding='utf-8') as f:
             json.dump(model_results, f, indent=2)
         
         print(f"Model summaries saved to {self.model_output_file}")
     
+    def analyze_history(self):
+        """Chart functions and calls across the history range, reusing parse results per file blob."""
+        print(f"Analyzing history {self.history_range}...")
+        try:
+            history = analyze_history(self.temp_dir, self.history_range, self.history_max_commits)
+        except Exception as e:
+            print(f"Error analyzing history: {str(e)}")
+            return
+        
+        history_file = os.path.join(self.repo_analysis_dir, f"{self.repo_name}.history.json")
+        save_history(history, history_file)
+        print(f"Analyzed {len(history['commits'])} commits ({history['distinct_blobs']} distinct Python files, "
+              f"{history['parsed_blobs']} newly parsed)")
+        print(f"History saved to {history_file}")
+    
     def save_results(self):
         """Save the analysis results to a JSON file."""
         with open(self.output_file, 'w', encoding='utf-8') as f:
@@ -323,6 +400,8 @@ class GitHubPythonAnalyzer:
         try:
             self.analyze_repository()
             self.save_results()
+            if self.history_range:
+                self.analyze_history()
             self.process_functions_with_model()
             # Skip adding docstrings to files
         finally:
@@ -336,6 +415,12 @@ def main():
                         help='Use pre-trained model instead of fine-tuned model')
     parser.add_argument('--output-dir', help='Directory to save function summaries')
     parser.add_argument('--analysis-dir', help='Directory to save analysis results')
+    parser.add_argument('--reachable', choices=['first', 'only'],
+                        help='Summarize functions reachable from entry points first, or only those')
+    parser.add_argument('--history', metavar='RANGE',
+                        help='Also chart functions and calls over a commit range (e.g. HEAD or v1.0..HEAD)')
+    parser.add_argument('--max-commits', type=int,
+                        help='Only chart the newest N commits of the --history range')
     
     args = parser.parse_args()
     
@@ -355,8 +440,10 @@ def main():
     print(f"Using {model_type} CodeT5 model")
     print(f"Repository will be cloned to the Downloads folder")
     print(f"Note: Docstring generation to files is disabled")
+    if args.reachable:
+        print(f"Reachability mode: summarizing reachable functions {args.reachable}")
 
-    analyzer = GitHubPythonAnalyzer(repo_url, use_finetuned=use_finetuned)
+    analyzer = GitHubPythonAnalyzer(repo_url, use_finetuned=use_finetuned, reachable_mode=args.reachable)
     
     # Use custom output directories if provided
     if args.output_dir:
@@ -366,6 +453,10 @@ def main():
     if args.analysis_dir:
         print(f"Using custom repo analysis directory: {args.analysis_dir}")
         analyzer.repo_analysis_dir = args.analysis_dir
+    
+    if args.history:
+        analyzer.history_range = args.history
+        analyzer.history_max_commits = args.max_commits
         
     analyzer.run()
 
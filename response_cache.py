@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+
+A SQLite cache shared by every script that calls a language model, so the
+same request (repeated UI clicks, reprocessing a repository) is answered in
+milliseconds instead of paying for another model call.
+
+Entries are keyed by a hash of the endpoint and the full request: model,
+messages or prompt, and sampling parameters. They expire after a TTL, and the
+least recently used entries are evicted beyond a size cap. Hit and miss
+counters are kept in the database, so they add up across processes.
+
+Setting bypass (RESPONSE_CACHE_BYPASS=1, or --no-cache on the scripts) skips
+cache reads but still stores the fresh response.
+
+Usage:
+  python response_cache.py stats
+  python response_cache.py clear
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+from http_client import get_client
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(current_dir, "RESPONSE_CACHE", "responses.db"))
+DEFAULT_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))
+
+
+def cache_key(endpoint, request):
+    """Return the cache key of a request: a hash of the endpoint and the canonical request JSON."""
+    canonical = json.dumps([endpoint, request], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache of model responses with a TTL, a size cap and hit/miss counters."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, bypass=None):
+        """
+        Args:
+            path: SQLite database file
+            ttl: Seconds an entry stays valid
+            max_entries: Entries kept before the least recently used are evicted
+            bypass: Skip cache reads (default: the RESPONSE_CACHE_BYPASS environment variable)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = os.getenv("RESPONSE_CACHE_BYPASS", "") == "1" if bypass is None else bypass
+        # One connection for the cache's lifetime: closing the last connection to a WAL
+        # database checkpoints it, which would cost a disk sync on every lookup
+        self._lock = threading.Lock()
+        self.conn = self.setup_database()
+
+    def setup_database(self):
+        """Create the cache database and tables if they don't exist, and return a connection to it"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Several scripts may use the cache at once; wait for locks instead of failing
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        cursor = conn.cursor()
+        # Readers don't block the writer (and vice versa) in WAL mode, and commits
+        # don't wait for a disk sync (a power loss can drop the latest entries, nothing more)
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            endpoint TEXT,
+            response TEXT,
+            created_at REAL,
+            last_used REAL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER
+        )
+        ''')
+        conn.commit()
+        return conn
+
+    def _count(self, cursor, name):
+        cursor.execute("INSERT INTO counters (name, value) VALUES (?, 1) "
+                       "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+
+    def get(self, key):
+        """Return the cached response for a key, or None (counting a hit or a miss)."""
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT response FROM responses WHERE key = ? AND created_at > ?", (key, now - self.ttl))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count(cursor, "hits" if row else "misses")
+            self.conn.commit()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, endpoint, response):
+        """Store a response, evicting expired and least recently used entries beyond the cap."""
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("INSERT OR REPLACE INTO responses (key, endpoint, response, created_at, last_used) "
+                           "VALUES (?, ?, ?, ?, ?)", (key, endpoint, json.dumps(response), now, now))
+            cursor.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            cursor.execute("SELECT COUNT(*) FROM responses")
+            excess = cursor.fetchone()[0] - self.max_entries
+            if excess > 0:
+                cursor.execute("DELETE FROM responses WHERE key IN "
+                               "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,))
+            self.conn.commit()
+
+    def cached(self, endpoint, request, compute, bypass=None):
+        """
+        Return the response to a request, calling ``compute`` only on a cache miss.
+
+        Args:
+            endpoint: Where the request goes (URL or backend name)
+            request: JSON-serializable request: model, messages/prompt and sampling parameters
+            compute: Function making the actual call; exceptions propagate and nothing is cached
+            bypass: Skip the cache read for this call (default: the cache's bypass flag)
+
+        Returns:
+            The cached or freshly computed response
+        """
+        key = cache_key(endpoint, request)
+        if not (self.bypass if bypass is None else bypass):
+            response = self.get(key)
+            if response is not None:
+                return response
+
+        response = compute()
+        if response is not None:
+            self.put(key, endpoint, response)
+        return response
+
+    def stats(self):
+        """Return the hit/miss counters and the number of stored entries."""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT name, value FROM counters")
+            counters = dict(cursor.fetchall())
+            cursor.execute("SELECT COUNT(*) FROM responses")
+            entries = cursor.fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': entries
+        }
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM responses")
+            cursor.execute("DELETE FROM counters")
+            self.conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the response cache shared by this process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def cached_post_json(url, headers, payload, bypass=None):
+    """
+    POST a JSON request (e.g. an OpenAI chat completion) through the response cache.
+
+    The key covers the URL and the whole payload (model, messages and sampling
+    parameters), never the headers, so API keys don't end up in the cache.
+
+    Raises:
+        requests.RequestException: If the call fails (nothing is cached)
+    """
+    def post():
+        response = get_client().post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    return get_cache().cached(url, payload, post, bypass)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the LLM response cache')
+    parser.add_argument('command', choices=['stats', 'clear'])
+    parser.add_argument('--path', default=DEFAULT_CACHE_PATH, help=f'Cache database (default: {DEFAULT_CACHE_PATH})')
+
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.command == 'clear':
+        cache.clear()
+        print(f"Cleared {args.path}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Call graph ranking scores on a small known graph, and ranking speed on a large one."""
+
+import os
+import sys
+import json
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from callgraph_ranking import rank_graph, top_k
+from generate_callgraph import generate_dot_file, graph_artifact_path
+
+
+# Reference values from networkx (pagerank with weight='count',
+# betweenness_centrality with normalized=False) on the same graph
+EXPECTED = {
+    'm->a': {'pagerank': 0.3131762946219912, 'in_degree': 2.0, 'betweenness': 6.0},
+    'm->b': {'pagerank': 0.20659278054468644, 'in_degree': 2.0, 'betweenness': 3.0},
+    'm->c': {'pagerank': 0.30505035232512423, 'in_degree': 5.0, 'betweenness': 3.0},
+    'm->d': {'pagerank': 0.11692814532373205, 'in_degree': 1.0, 'betweenness': 0.0},
+    'm->e': {'pagerank': 0.02912621359223301, 'in_degree': 0.0, 'betweenness': 0.0},
+    'm_C->run': {'pagerank': 0.02912621359223301, 'in_degree': 0.0, 'betweenness': 0.0},
+}
+
+
+def _known_graph():
+    nodes = {'m': {'kind': 'file'}, 'm_C': {'kind': 'class'}}
+    edges = [{'source': 'm', 'target': 'm_C', 'kind': 'contains'}]
+    for name in 'abcde':
+        nodes[f'm->{name}'] = {'kind': 'function'}
+        edges.append({'source': 'm', 'target': f'm->{name}', 'kind': 'contains'})
+    nodes['m_C->run'] = {'kind': 'method'}
+    edges.append({'source': 'm_C', 'target': 'm_C->run', 'kind': 'contains'})
+    for source, target, count in [('a', 'b', 2), ('a', 'c', 1), ('b', 'c', 1), ('c', 'a', 1),
+                                  ('d', 'c', 3), ('b', 'd', 1)]:
+        edges.append({'source': f'm->{source}', 'target': f'm->{target}', 'kind': 'calls', 'count': count})
+    edges.append({'source': 'm_C->run', 'target': 'm->a', 'kind': 'calls', 'count': 1})
+    # Calls to nodes that aren't ranked are ignored
+    edges.append({'source': 'm->a', 'target': 'm_C', 'kind': 'calls', 'count': 4})
+    return {'name': 'known', 'nodes': nodes, 'edges': edges}
+
+
+@pytest.mark.parametrize('score', ['pagerank', 'in_degree', 'betweenness'])
+def test_scores_match_reference_values(score):
+    graph = _known_graph()
+
+    rankings = rank_graph(graph)
+
+    assert len(rankings[score]) == len(EXPECTED)
+    for node_id, value in rankings[score]:
+        assert value == pytest.approx(EXPECTED[node_id][score], abs=1e-7)
+        assert graph['nodes'][node_id]['scores'][score] == value
+    assert 'scores' not in graph['nodes']['m'] and 'scores' not in graph['nodes']['m_C']
+
+
+def test_rankings_are_sorted_with_ties_in_graph_order():
+    rankings = rank_graph(_known_graph())
+
+    assert [node_id for node_id, _ in rankings['in_degree']] == ['m->c', 'm->a', 'm->b', 'm->d', 'm->e', 'm_C->run']
+    assert top_k(rankings, 2) == ['m->a', 'm->c']
+    assert top_k(rankings, 1, score='betweenness') == ['m->a']
+
+
+def test_graph_artifact_stores_sorted_rankings(tmp_path):
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    (repo / 'util.py').write_text('def helper():\n    return 1\n\n\ndef other():\n    return helper()\n')
+    (repo / 'main.py').write_text('from util import helper, other\n\n\ndef run():\n    helper()\n    other()\n'
+                                  '\n\nif __name__ == "__main__":\n    run()\n')
+    output_file = str(tmp_path / 'repo.dot')
+
+    generate_dot_file(str(repo), output_file)
+
+    with open(graph_artifact_path(output_file), encoding='utf-8') as f:
+        rankings = json.load(f)['rankings']
+    assert set(rankings) == {'pagerank', 'in_degree', 'betweenness'}
+    for ranking in rankings.values():
+        assert {node_id for node_id, _ in ranking} == {'main->run', 'util->helper', 'util->other'}
+        scores = [score for _, score in ranking]
+        assert scores == sorted(scores, reverse=True)
+    assert rankings['in_degree'][0] == ['util->helper', 2.0]
+
+
+def test_ranking_100k_nodes_under_a_second():
+    rng = np.random.default_rng(1)
+    n, m = 100_000, 400_000
+    nodes = {f'm->f{i}': {'kind': 'function'} for i in range(n)}
+    edges = [{'source': f'm->f{source}', 'target': f'm->f{target}', 'kind': 'calls', 'count': 1}
+             for source, target in zip(rng.integers(0, n, m).tolist(), rng.integers(0, n, m).tolist())]
+    graph = {'name': 'large', 'nodes': nodes, 'edges': edges}
+
+    # Best of three, so a busy machine doesn't fail the test
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        rank_graph(graph)
+        timings.append(time.perf_counter() - start)
+
+    assert min(timings) < 1.0
@@ -0,0 +1,154 @@
+"""Call graph service queries on a synthetic artifact: pagination, cluster summaries and path search."""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import callgraph_service
+from callgraph_service import CallGraphService, MAX_PAGE_SIZE, CLUSTER_TOP_DEPENDENCIES
+
+
+def _function(module, name, pagerank=0.0):
+    return f"{module}->{name}", {'kind': 'function', 'label': f"{name}()", 'module': module,
+                                 'file': module.replace('.', '/') + '.py', 'package': module.rsplit('.', 1)[0],
+                                 'scores': {'pagerank': pagerank}}
+
+
+def _calls(*pairs, count=1):
+    return [{'source': source, 'target': target, 'kind': 'calls', 'count': count} for source, target in pairs]
+
+
+def _write_artifact(tmp_path, nodes, edges, name='graph'):
+    path = tmp_path / f'{name}.graph.json'
+    path.write_text(json.dumps({'name': name, 'nodes': nodes, 'edges': edges}))
+    return str(path)
+
+
+@pytest.fixture
+def hub_service(tmp_path):
+    """A hub module calling twelve leaf modules, leaf i with i + 1 call sites."""
+    nodes = dict([_function('pkg.hub', 'run', pagerank=0.5)])
+    edges = []
+    for i in range(12):
+        node_id, node = _function(f'pkg.leaf{i:02d}', 'work', pagerank=0.01 * i)
+        nodes[node_id] = node
+        edges += _calls(('pkg.hub->run', node_id), count=i + 1)
+    return CallGraphService(_write_artifact(tmp_path, nodes, edges))
+
+
+@pytest.fixture
+def chain_service(tmp_path):
+    """f0 -> f1 -> ... -> f30 in one module, plus an unreachable island."""
+    nodes = dict(_function('pkg.chain', f'f{i}') for i in range(31))
+    nodes.update([_function('pkg.chain', 'island')])
+    edges = _calls(*[(f'pkg.chain->f{i}', f'pkg.chain->f{i + 1}') for i in range(30)])
+    return CallGraphService(_write_artifact(tmp_path, nodes, edges))
+
+
+def test_cluster_dependencies_are_capped_with_the_total_count(hub_service):
+    summary = hub_service.cluster_summaries['pkg.hub']
+
+    assert summary['dependency_count'] == 12
+    assert len(summary['dependencies']) == CLUSTER_TOP_DEPENDENCIES
+    # Most called first
+    assert summary['dependencies'][0] == {'module': 'pkg.leaf11', 'count': 12}
+    assert [dependency['count'] for dependency in summary['dependencies']] == list(range(12, 2, -1))
+
+
+def test_clusters_are_ordered_by_pagerank_and_paginated(hub_service):
+    first = hub_service.clusters(page=1, page_size=5)
+
+    assert first['total'] == 13
+    assert [cluster['id'] for cluster in first['clusters']] == \
+        ['pkg.hub', 'pkg.leaf11', 'pkg.leaf10', 'pkg.leaf09', 'pkg.leaf08']
+    assert len(hub_service.clusters(page=3, page_size=5)['clusters']) == 3
+    assert hub_service.clusters(page=4, page_size=5)['clusters'] == []
+
+
+def test_page_arguments_are_clamped(hub_service):
+    assert hub_service.clusters(page=0)['page'] == 1
+    assert hub_service.clusters(page=-3, page_size=0)['page_size'] == 1
+    assert hub_service.clusters(page_size=10 ** 6)['page_size'] == MAX_PAGE_SIZE
+    assert hub_service.cluster('pkg.hub', page='2', page_size='1')['page'] == 2
+
+
+def test_cluster_rejects_unknown_modules(hub_service):
+    with pytest.raises(KeyError):
+        hub_service.cluster('pkg.missing')
+
+
+def test_path_finds_the_shortest_chain(chain_service):
+    result = chain_service.path('pkg.chain->f0', 'pkg.chain->f5')
+
+    assert result['found'] and not result['truncated']
+    assert [node['id'] for node in result['nodes']] == [f'pkg.chain->f{i}' for i in range(6)]
+    assert len(result['edges']) == 5
+
+
+def test_path_beyond_the_depth_limit_is_truncated(chain_service):
+    result = chain_service.path('pkg.chain->f0', 'pkg.chain->f30', max_depth=20)
+
+    assert not result['found']
+    assert result['truncated']
+
+
+def test_missing_path_is_not_truncated(chain_service):
+    # Deep enough to search the whole chain
+    result = chain_service.path('pkg.chain->f0', 'pkg.chain->island', max_depth=50)
+
+    assert not result['found']
+    assert not result['truncated']
+
+
+def test_path_visit_limit_is_truncated(chain_service, monkeypatch):
+    monkeypatch.setattr(callgraph_service, 'MAX_PATH_VISITS', 10)
+
+    result = chain_service.path('pkg.chain->f0', 'pkg.chain->f30', max_depth=100)
+
+    assert not result['found']
+    assert result['truncated']
+
+
+def test_neighborhood_is_limited_in_hops_and_nodes(chain_service):
+    result = chain_service.neighborhood('pkg.chain->f10', hops=2)
+
+    assert {node['id']: node['distance'] for node in result['nodes']} == {
+        'pkg.chain->f10': 0, 'pkg.chain->f11': 1, 'pkg.chain->f9': 1, 'pkg.chain->f12': 2, 'pkg.chain->f8': 2}
+    assert not result['truncated']
+    assert chain_service.neighborhood('pkg.chain->f10', hops=5, limit=3)['truncated']
+
+
+@pytest.fixture
+def empty_service_cache(monkeypatch):
+    monkeypatch.setattr(callgraph_service, '_services', type(callgraph_service._services)())
+    monkeypatch.setattr(callgraph_service, 'MAX_CACHED_SERVICES', 2)
+
+
+def test_service_cache_keeps_the_most_recently_used_artifacts(tmp_path, empty_service_cache):
+    paths = [_write_artifact(tmp_path, dict([_function('pkg.mod', 'f')]), [], name=f'repo{i}') for i in range(3)]
+    first = callgraph_service.get_service(paths[0])
+    second = callgraph_service.get_service(paths[1])
+    # Using the first again makes the second the least recently used
+    assert callgraph_service.get_service(paths[0]) is first
+
+    callgraph_service.get_service(paths[2])
+
+    assert list(callgraph_service._services) == [paths[0], paths[2]]
+    assert callgraph_service.get_service(paths[1]) is not second
+
+
+def test_service_cache_rebuilds_changed_artifacts(tmp_path, empty_service_cache):
+    path = _write_artifact(tmp_path, dict([_function('pkg.mod', 'f')]), [])
+    old = callgraph_service.get_service(path)
+    _write_artifact(tmp_path, dict([_function('pkg.mod', 'f'), _function('pkg.mod', 'g')]), [])
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+
+    new = callgraph_service.get_service(path)
+
+    assert new is not old and 'pkg.mod->g' in new.nodes
+    assert len(callgraph_service._services) == 1
+    assert callgraph_service.get_service(path) is new
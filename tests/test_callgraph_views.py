@@ -0,0 +1,131 @@
+"""Call graph views: collapsing, top-k pruning, leaf removal and edge caps."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from callgraph_views import apply_view, cap_edges, collapse, drop_leaves, estimate_view_size, top_k
+from generate_callgraph import build_graph_from_analyses
+from parse_store import parse_source
+
+
+SOURCES = {
+    'pkg/core.py': '''
+from pkg.util import tokenize, clean
+
+
+def parse(text):
+    tokens = tokenize(text)
+    tokens = tokenize(clean(text))
+    return tokens
+
+
+class Engine:
+    def run(self, text):
+        return parse(text)
+''',
+    'pkg/util.py': '''
+def tokenize(text):
+    return text.split()
+
+
+def clean(text):
+    return text.strip()
+''',
+    'tools/cli.py': '''
+from pkg.core import parse
+from pkg.util import clean
+
+
+def main():
+    parse(clean("x"))
+    parse("y")
+''',
+}
+
+
+@pytest.fixture
+def graph():
+    files = [(path, parse_source(source)['callgraph']) for path, source in SOURCES.items()]
+    return build_graph_from_analyses('repo', files)
+
+
+def _calls(graph):
+    return {(edge['source'], edge['target']): edge['count'] for edge in graph['edges'] if edge['kind'] == 'calls'}
+
+
+def test_collapse_to_modules_merges_call_edges(graph):
+    view = collapse(graph, 'module')
+
+    assert {node_id: (node['kind'], node['size']) for node_id, node in view['nodes'].items()} == {
+        'pkg.core': ('module', 2), 'pkg.util': ('module', 2), 'tools.cli': ('module', 1)}
+    # Engine.run -> parse stays inside pkg.core and is dropped
+    assert _calls(view) == {('tools.cli', 'pkg.core'): 2, ('tools.cli', 'pkg.util'): 1, ('pkg.core', 'pkg.util'): 3}
+
+
+def test_collapse_to_packages_sums_member_scores(graph):
+    for node_id, score in [('pkg.core->parse', 0.5), ('pkg.util->clean', 0.25), ('tools.cli->main', 0.125)]:
+        graph['nodes'][node_id]['scores'] = {'pagerank': score}
+
+    view = collapse(graph, 'package')
+
+    assert set(view['nodes']) == {'pkg', 'tools'}
+    assert view['nodes']['pkg']['scores'] == {'pagerank': 0.75}
+    assert _calls(view) == {('tools', 'pkg'): 3}
+
+
+def test_collapse_rejects_unknown_level(graph):
+    with pytest.raises(ValueError):
+        collapse(graph, 'class')
+
+
+def test_top_k_keeps_highest_fan_in_and_breaks_ties_by_id(graph):
+    view = top_k(graph, 2)
+
+    # parse has 3 incoming calls; clean and tokenize tie with 2 and clean sorts first
+    assert set(view['nodes']) == {'pkg.core->parse', 'pkg.util->clean', 'pkg.core', 'pkg.util'}
+    assert _calls(view) == {('pkg.core->parse', 'pkg.util->clean'): 1}
+
+
+def test_top_k_keeps_the_containers_of_kept_methods(graph):
+    graph['nodes']['pkg.core_Engine->run']['scores'] = {'pagerank': 1.0}
+
+    view = top_k(graph, 1, rank_by='pagerank')
+
+    assert set(view['nodes']) == {'pkg.core_Engine->run', 'pkg.core_Engine', 'pkg.core'}
+
+
+def test_cap_edges_keeps_heaviest_calls_per_node(graph):
+    view = cap_edges(graph, 1)
+
+    assert _calls(view) == {('tools.cli->main', 'pkg.core->parse'): 2,
+                            ('pkg.core->parse', 'pkg.util->tokenize'): 2,
+                            ('pkg.core_Engine->run', 'pkg.core->parse'): 1}
+    assert view['nodes'] == graph['nodes']
+    assert [edge for edge in view['edges'] if edge['kind'] == 'contains'] == \
+        [edge for edge in graph['edges'] if edge['kind'] == 'contains']
+
+
+def test_drop_leaves_removes_utilities_that_call_nothing(graph):
+    view = drop_leaves(graph)
+
+    assert 'pkg.util->tokenize' not in view['nodes'] and 'pkg.util->clean' not in view['nodes']
+    # Called but calling something, or calling but never called
+    assert 'pkg.core->parse' in view['nodes'] and 'tools.cli->main' in view['nodes']
+    assert _calls(view) == {('tools.cli->main', 'pkg.core->parse'): 2, ('pkg.core_Engine->run', 'pkg.core->parse'): 1}
+
+
+def test_apply_view_returns_a_new_graph_without_rankings(graph):
+    graph['rankings'] = {'pagerank': []}
+    edge_count = len(graph['edges'])
+
+    view = apply_view(graph, collapse_to='module', top_k_nodes=2, max_edges_per_node=1)
+
+    assert set(view['nodes']) == {'pkg.core', 'pkg.util'}
+    assert _calls(view) == {('pkg.core', 'pkg.util'): 3}
+    assert 'rankings' not in view and view['name'] == 'repo'
+    assert len(graph['edges']) == edge_count and 'pkg.core->parse' in graph['nodes']
+    assert estimate_view_size(view)['nodes'] == 2 and estimate_view_size(view)['edges'] == 1
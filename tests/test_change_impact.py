@@ -0,0 +1,39 @@
+"""Regression tests for change_impact.py symbol snapshots."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from change_impact import snapshot_symbols, diff_snapshots
+from parse_store import parse_source
+
+
+BEFORE = '''
+def helper():
+    return 1
+
+
+def outer():
+    def helper():
+        return 2
+    return helper()
+'''
+
+AFTER = BEFORE.replace('return 1', 'return 10')
+
+
+def _snapshot(source):
+    return {'symbols': snapshot_symbols('pkg_mod', 'pkg/mod.py', parse_source(source))}
+
+
+def test_nested_function_does_not_shadow_top_level_function():
+    symbols = _snapshot(BEFORE)['symbols']
+
+    assert set(symbols) == {'pkg_mod->helper', 'pkg_mod->outer', 'pkg_mod->outer.helper'}
+
+
+def test_modified_top_level_function_with_nested_namesake_is_reported():
+    diff = diff_snapshots(_snapshot(BEFORE), _snapshot(AFTER))
+
+    assert diff == {'added': [], 'removed': [], 'modified': ['pkg_mod->helper']}
@@ -0,0 +1,112 @@
+"""Continuous batching must produce the same greedy outputs as one-at-a-time generate."""
+
+import os
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from continuous_batching import ContinuousBatcher, DEFAULT_PARAMS, _Sequence
+from prefix_cache import PrefixCache
+
+
+MODEL = "hf-internal-testing/tiny-random-LlamaForCausalLM"
+
+PROMPTS = ["def add(a, b):", "Summarize this repository in one sentence.", "import os\nimport sys\n",
+           "The call graph shows", "README", "class Parser:\n    def parse(self, text):"]
+
+
+@pytest.fixture(scope="module")
+def model_and_tokenizer():
+    try:
+        tokenizer = transformers.AutoTokenizer.from_pretrained(MODEL)
+        model = transformers.AutoModelForCausalLM.from_pretrained(MODEL, torch_dtype=torch.float32)
+    except OSError as e:
+        pytest.skip(f"{MODEL} is not available: {e}")
+    model.eval()
+    return model, tokenizer
+
+
+def _generate(model, tokenizer, prompt, max_new_tokens):
+    input_ids = tokenizer(prompt, return_tensors="pt").input_ids
+    with torch.no_grad():
+        output = model.generate(input_ids, attention_mask=torch.ones_like(input_ids), max_new_tokens=max_new_tokens,
+                                do_sample=False, pad_token_id=tokenizer.eos_token_id)
+    return tokenizer.decode(output[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+
+def _run_schedule(batcher, schedule):
+    """
+    Drive the decode loop by hand: ``schedule`` maps a step number to the
+    (prompt, max_new_tokens) requests queued just before that step.
+    """
+    futures = []
+    step = 0
+    while step <= max(schedule) or batcher.active or not batcher.queue.empty():
+        for prompt, max_new_tokens in schedule.get(step, []):
+            future = Future()
+            params = dict(DEFAULT_PARAMS, max_new_tokens=max_new_tokens, temperature=0)
+            batcher.queue.put_nowait(_Sequence(prompt, params, future))
+            futures.append((prompt, max_new_tokens, future))
+        batcher._admit(block=False)
+        if batcher.active:
+            batcher._step()
+        step += 1
+    return futures
+
+
+def test_requests_joining_and_leaving_mid_decode_match_generate(model_and_tokenizer):
+    model, tokenizer = model_and_tokenizer
+    batcher = ContinuousBatcher(model, tokenizer, max_batch_size=3, name="test")
+    schedule = {
+        0: [(PROMPTS[0], 40)],
+        # Longer prompt joins a running batch: the batch is padded on the left
+        5: [(PROMPTS[1], 12), (PROMPTS[4], 3)],
+        # Queued until a slot frees up; leaves before the first request
+        8: [(PROMPTS[3], 6), (PROMPTS[2], 24)],
+        # Joins after earlier sequences left and padding columns were trimmed
+        20: [(PROMPTS[5], 10)],
+    }
+
+    futures = _run_schedule(batcher, schedule)
+
+    for prompt, max_new_tokens, future in futures:
+        assert future.result(timeout=0) == _generate(model, tokenizer, prompt, max_new_tokens), prompt
+    assert batcher.completed == len(futures)
+    assert not batcher.active and batcher.past is None
+
+
+def test_prefix_reuse_matches_generate(model_and_tokenizer):
+    model, tokenizer = model_and_tokenizer
+    prefix = "You write README files for Python repositories. Describe the repository below.\n"
+    prefix_cache = PrefixCache(min_tokens=4)
+    prefix_cache.register(prefix)
+    batcher = ContinuousBatcher(model, tokenizer, max_batch_size=2, name="test", prefix_cache=prefix_cache)
+    schedule = {
+        0: [(prefix + "Repository: parser", 8)],
+        3: [(prefix + "Repository: call graph tools", 10)],
+        4: [(prefix + "Repository: x", 5)],
+    }
+
+    futures = _run_schedule(batcher, schedule)
+
+    for prompt, max_new_tokens, future in futures:
+        assert future.result(timeout=0) == _generate(model, tokenizer, prompt, max_new_tokens), prompt
+    assert prefix_cache.stats()["hits"] >= 2
+
+
+def test_decode_thread_matches_generate(model_and_tokenizer):
+    model, tokenizer = model_and_tokenizer
+    batcher = ContinuousBatcher(model, tokenizer, max_batch_size=4, name="test")
+    lengths = [40, 5, 24, 60, 3, 12]
+
+    futures = [batcher.submit_nowait(prompt, {"max_new_tokens": length, "temperature": 0})
+               for prompt, length in zip(PROMPTS, lengths)]
+
+    for prompt, length, future in zip(PROMPTS, lengths, futures):
+        assert future.result(timeout=120) == _generate(model, tokenizer, prompt, length), prompt
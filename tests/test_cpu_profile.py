@@ -0,0 +1,140 @@
+"""CPU inference profile selection and its report in /health."""
+
+import os
+import io
+import sys
+import importlib
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cpu_profile
+
+
+AVX2_ONLY = {"fpu", "sse4_2", "avx", "avx2", "fma"}
+SAPPHIRE_RAPIDS = AVX2_ONLY | {"avx512f", "avx512_bf16", "amx_bf16", "amx_tile"}
+GRAVITON3 = {"fp", "asimd", "sve", "bf16", "i8mm"}
+
+
+@pytest.fixture
+def cpu(monkeypatch):
+    """Pretend to run on a CPU with the given flags, 8 physical cores and the x86 quantized engine."""
+    for name in ("CPU_DTYPE", "CPU_QUANTIZE", "CPU_THREADS", "CPU_INTEROP_THREADS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(cpu_profile, "physical_cores", lambda: 8)
+    monkeypatch.setattr(cpu_profile, "quantized_engine", lambda: "x86")
+
+    def set_flags(flags):
+        monkeypatch.setattr(cpu_profile, "cpu_flags", lambda: set(flags))
+    return set_flags
+
+
+@pytest.mark.parametrize("flags", [SAPPHIRE_RAPIDS, GRAVITON3])
+def test_bf16_cpu_gets_bfloat16_weights(cpu, flags):
+    cpu(flags)
+
+    profile = cpu_profile.select_profile()
+
+    assert profile["bf16_supported"]
+    assert profile["dtype"] == "bfloat16"
+    assert not profile["quantize"]
+
+
+def test_cpu_without_bf16_gets_float32_with_int8_linear_layers(cpu):
+    cpu(AVX2_ONLY)
+
+    profile = cpu_profile.select_profile()
+
+    assert not profile["bf16_supported"]
+    assert profile["dtype"] == "float32"
+    assert profile["quantize"]
+    assert profile["quantized_engine"] == "x86"
+
+
+def test_no_quantized_engine_means_no_quantization(cpu, monkeypatch):
+    cpu(AVX2_ONLY)
+    monkeypatch.setattr(cpu_profile, "quantized_engine", lambda: None)
+
+    profile = cpu_profile.select_profile()
+
+    assert profile["dtype"] == "float32"
+    assert not profile["quantize"]
+
+
+def test_quantize_override_picks_float32_on_bf16_cpu(cpu, monkeypatch):
+    cpu(SAPPHIRE_RAPIDS)
+    monkeypatch.setenv("CPU_QUANTIZE", "1")
+
+    profile = cpu_profile.select_profile()
+
+    assert profile["dtype"] == "float32"
+    assert profile["quantize"]
+
+
+def test_dtype_and_quantize_overrides(cpu, monkeypatch):
+    cpu(AVX2_ONLY)
+    monkeypatch.setenv("CPU_DTYPE", "bfloat16")
+
+    assert cpu_profile.select_profile()["dtype"] == "bfloat16"
+    assert not cpu_profile.select_profile()["quantize"]
+
+    monkeypatch.setenv("CPU_DTYPE", "float32")
+    monkeypatch.setenv("CPU_QUANTIZE", "0")
+
+    assert not cpu_profile.select_profile()["quantize"]
+
+
+def test_thread_counts(cpu, monkeypatch):
+    cpu(AVX2_ONLY)
+
+    assert cpu_profile.select_profile()["threads"] == 8
+    assert cpu_profile.select_profile()["interop_threads"] == 1
+
+    monkeypatch.setenv("CPU_THREADS", "3")
+
+    assert cpu_profile.select_profile()["threads"] == 3
+
+
+def test_apply_threads_sets_torch_thread_pools(cpu, monkeypatch):
+    cpu(AVX2_ONLY)
+    monkeypatch.setenv("CPU_THREADS", "2")
+    previous = torch.get_num_threads()
+    profile = cpu_profile.select_profile()
+
+    try:
+        cpu_profile.apply_threads(profile)
+
+        assert torch.get_num_threads() == 2
+        # Inter-op threads can only be set once per process; the profile reports what is in place
+        assert profile["interop_threads"] == torch.get_num_interop_threads()
+    finally:
+        torch.set_num_threads(previous)
+
+
+def test_physical_cores_ignores_hyperthreads(monkeypatch):
+    cpuinfo = "processor\t: 0\nsiblings\t: 16\ncpu cores\t: 8\n"
+    monkeypatch.setattr(cpu_profile, "open", lambda path: io.StringIO(cpuinfo), raising=False)
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+
+    assert cpu_profile.physical_cores() == 8
+
+
+def test_health_reports_inference_profile(cpu, monkeypatch):
+    pytest.importorskip("transformers")
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("MODEL_DEVICE", "cpu")
+    model_api = importlib.import_module("model_api")
+    client = TestClient(model_api.app)
+    cpu(AVX2_ONLY)
+    profile = cpu_profile.select_profile()
+
+    monkeypatch.setattr(model_api, "CPU_PROFILE", profile)
+    assert client.get("/health").json()["inference_profile"] == profile
+
+    monkeypatch.setattr(model_api, "CPU_PROFILE", None)
+    assert client.get("/health").json()["inference_profile"] == {"device": "cuda"}
@@ -0,0 +1,93 @@
+"""The streaming JSON reader must agree with json.load whatever the chunk size."""
+
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_stream import load_fields
+
+
+DOCUMENT = {
+    "src": {
+        "parser.py": {
+            "parse": {
+                "summary": "Parses \"quoted\" text\\with escapes\n\tand tabs",
+                "code": "def parse(text):\n    return {'a': [1, 2], \"b\": \"}]\"}  # brackets in strings",
+                "line": 12,
+                "ratio": -1.5e-3,
+                "big": 12345678901234567890,
+                "flags": [True, False, None],
+                "nested": {"deep": [{"x": "]"}, [], {}]},
+            },
+            "tokenize": {"summary": "café ☃ \U0001F600", "code": "", "line": 0},
+        },
+        "empty.py": {},
+        "notes": "not an object, skipped",
+    },
+    "tests": {
+        "test_parser.py": {
+            "test_parse": {"code": "assert parse('{') == {}", "summary": None, "line": 1e3},
+        },
+    },
+}
+
+
+def _expected(document, depth, fields):
+    """What load_fields should return, computed from the fully decoded document."""
+    result = {}
+    for key, value in document.items():
+        if not isinstance(value, dict):
+            continue
+        if depth > 1:
+            result[key] = _expected(value, depth - 1, fields)
+        else:
+            result[key] = {field: value[field] for field in value if field in fields}
+    return result
+
+
+@pytest.fixture(params=[True, False], ids=['indented', 'compact'])
+def document_file(request, tmp_path):
+    path = tmp_path / 'summaries.json'
+    if request.param:
+        text = json.dumps(DOCUMENT, indent=2)
+    else:
+        # ensure_ascii=False keeps raw non-ASCII characters; separators leave no whitespace
+        text = json.dumps(DOCUMENT, ensure_ascii=False, separators=(',', ':'))
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64 * 1024])
+@pytest.mark.parametrize('fields', [{'summary'}, {'summary', 'line', 'ratio', 'big', 'flags', 'nested'}, set()])
+def test_matches_json_load(document_file, chunk_size, fields):
+    with open(document_file, encoding='utf-8') as f:
+        expected = _expected(json.load(f), 3, fields)
+
+    assert load_fields(document_file, 3, fields, chunk_size=chunk_size) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64 * 1024])
+def test_shallower_depth_reads_whole_files(document_file, chunk_size):
+    with open(document_file, encoding='utf-8') as f:
+        expected = _expected(json.load(f), 2, {'parse', 'tokenize'})
+
+    assert load_fields(document_file, 2, {'parse', 'tokenize'}, chunk_size=chunk_size) == expected
+
+
+@pytest.mark.parametrize('text', [
+    '{"src": {"a.py": {"f": {"summary": "cut',
+    '{"src": {"a.py": {"f": {"code": "x", "summary": 1}}}',
+    '{"src": {"a.py": {"f": {"summary": 1}}}} {}',
+    '{"src" {"a.py": {}}}',
+])
+@pytest.mark.parametrize('chunk_size', [1, 64 * 1024])
+def test_invalid_json_raises(tmp_path, text, chunk_size):
+    path = tmp_path / 'broken.json'
+    path.write_text(text, encoding='utf-8')
+
+    with pytest.raises(json.JSONDecodeError):
+        load_fields(str(path), 3, {'summary'}, chunk_size=chunk_size)
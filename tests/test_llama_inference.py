@@ -0,0 +1,97 @@
+"""llama_inference storage: the fallback README never replaces an existing one, and map results are cached."""
+
+import os
+import sys
+
+import pytest
+
+# The inference backends post through http_client, which needs requests
+pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llama_inference
+import response_cache
+from llama_inference import LlamaREADMEGenerator, read_readme_version
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def generator(tmp_path):
+    generator = LlamaREADMEGenerator("https://github.com/owner/repo")
+    generator.readme_output_path = str(tmp_path / "llama_repo.md")
+    return generator
+
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _no_hard_links(source, link_name):
+    raise PermissionError(1, "Operation not permitted")
+
+
+@pytest.mark.parametrize("hard_links", [True, False], ids=["link", "no-link"])
+def test_placeholder_is_saved_once(generator, tmp_path, monkeypatch, hard_links):
+    if not hard_links:
+        monkeypatch.setattr(os, "link", _no_hard_links)
+
+    assert generator.save_placeholder_readme("fallback")
+    assert not generator.save_placeholder_readme("second fallback")
+
+    assert _read(generator.readme_output_path) == "fallback"
+    assert read_readme_version(generator.readme_output_path)["source"] == "fallback"
+    # No temporary files left behind
+    assert sorted(os.listdir(tmp_path)) == ["llama_repo.md", "llama_repo.md.version.json"]
+
+
+@pytest.mark.parametrize("hard_links", [True, False], ids=["link", "no-link"])
+def test_placeholder_never_replaces_a_model_readme(generator, monkeypatch, hard_links):
+    if not hard_links:
+        monkeypatch.setattr(os, "link", _no_hard_links)
+    with open(generator.readme_output_path, "w", encoding="utf-8") as f:
+        f.write("model README")
+
+    assert not generator.save_placeholder_readme("fallback")
+    assert _read(generator.readme_output_path) == "model README"
+
+
+class FakeBackend:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return f"summary of {prompt}"
+
+
+@pytest.fixture
+def map_step(generator, tmp_path, monkeypatch):
+    """Map steps answered by a fake backend, cached in a temporary response cache."""
+    backend = FakeBackend()
+    cache = ResponseCache(str(tmp_path / "responses.db"), max_entries=2, bypass=False)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    monkeypatch.setattr(llama_inference, "get_backend", lambda *args, **kwargs: backend)
+    monkeypatch.setattr(generator, "generate_map_prompt", lambda data, folder: f"prompt for {folder}")
+    return backend, cache
+
+
+def test_map_results_come_from_the_response_cache(generator, map_step):
+    backend, cache = map_step
+
+    assert generator.summarize_folder({}, "src") == ("summary of prompt for src", False)
+    assert generator.summarize_folder({}, "src") == ("summary of prompt for src", True)
+
+    assert backend.prompts == ["prompt for src"]
+    assert cache.stats()["entries"] == 1
+
+
+def test_map_results_are_capped_with_the_response_cache(generator, map_step):
+    backend, cache = map_step
+
+    for folder in ("a", "b", "c"):
+        generator.summarize_folder({}, folder)
+
+    assert cache.stats()["entries"] == 2
+    assert generator.summarize_folder({}, "a") == ("summary of prompt for a", False)
@@ -0,0 +1,129 @@
+"""Micro-batcher scheduling with a fake model: batch limits, parameter grouping and error fan-out."""
+
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_batching import MicroBatcher, QueueFull
+
+
+class FakeModel:
+    """Records every batch it runs and answers each prompt with its upper-cased text."""
+
+    def __init__(self, error=None, delay=0.0):
+        self.batches = []
+        self.error = error
+        self.delay = delay
+
+    def __call__(self, prompts, params):
+        self.batches.append((list(prompts), params))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [prompt.upper() for prompt in prompts]
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_full_batches_run_without_waiting_and_results_go_back_in_order():
+    model = FakeModel()
+    batcher = MicroBatcher("fake", model, max_batch_size=2, max_wait_ms=5000)
+
+    async def scenario():
+        start = time.monotonic()
+        results = await asyncio.gather(*(batcher.submit(f"p{i}", {"t": 0}) for i in range(4)))
+        return results, time.monotonic() - start
+
+    results, elapsed = _run(scenario())
+
+    assert results == ["P0", "P1", "P2", "P3"]
+    assert [prompts for prompts, _ in model.batches] == [["p0", "p1"], ["p2", "p3"]]
+    # Full batches don't wait for the deadline
+    assert elapsed < 1
+    assert batcher.stats()["mean_batch_size"] == 2
+
+
+def test_partial_batch_runs_at_the_wait_deadline():
+    model = FakeModel()
+    batcher = MicroBatcher("fake", model, max_batch_size=8, max_wait_ms=100)
+
+    async def scenario():
+        start = time.monotonic()
+        first = asyncio.ensure_future(batcher.submit("a", {}))
+        await asyncio.sleep(0.02)
+        # Joins the first request's batch before its deadline
+        second = await batcher.submit("b", {})
+        return await first, second, time.monotonic() - start
+
+    first, second, elapsed = _run(scenario())
+
+    assert (first, second) == ("A", "B")
+    assert [prompts for prompts, _ in model.batches] == [["a", "b"]]
+    assert 0.09 <= elapsed < 1
+
+
+def test_requests_after_the_deadline_form_the_next_batch():
+    model = FakeModel()
+    batcher = MicroBatcher("fake", model, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        first = asyncio.ensure_future(batcher.submit("a", {}))
+        await asyncio.sleep(0.2)
+        return await first, await batcher.submit("b", {})
+
+    assert _run(scenario()) == ("A", "B")
+    assert [prompts for prompts, _ in model.batches] == [["a"], ["b"]]
+
+
+def test_requests_with_different_params_are_batched_separately():
+    model = FakeModel()
+    batcher = MicroBatcher("fake", model, max_batch_size=8, max_wait_ms=20)
+    cold = {"temperature": 0.0, "max_new_tokens": 8}
+    warm = {"temperature": 0.7, "max_new_tokens": 8}
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a", cold), batcher.submit("b", warm),
+                                    batcher.submit("c", cold), batcher.submit("d", warm))
+
+    assert _run(scenario()) == ["A", "B", "C", "D"]
+    assert model.batches == [(["a", "c"], cold), (["b", "d"], warm)]
+
+
+def test_generate_exception_reaches_every_waiter_and_the_batcher_keeps_going():
+    model = FakeModel(error=RuntimeError("out of memory"))
+    batcher = MicroBatcher("fake", model, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        failed = await asyncio.gather(*(batcher.submit(f"p{i}", {}) for i in range(3)), return_exceptions=True)
+        model.error = None
+        return failed, await batcher.submit("next", {})
+
+    failed, after = _run(scenario())
+
+    assert len(failed) == 3
+    assert all(isinstance(error, RuntimeError) and str(error) == "out of memory" for error in failed)
+    assert after == "NEXT"
+
+
+def test_full_queue_rejects_new_requests():
+    model = FakeModel(delay=0.1)
+    batcher = MicroBatcher("fake", model, max_batch_size=1, max_wait_ms=0, max_queue=2)
+
+    async def scenario():
+        running = asyncio.ensure_future(batcher.submit("a", {}))
+        await asyncio.sleep(0.02)
+        waiting = [asyncio.ensure_future(batcher.submit(prompt, {})) for prompt in ("b", "c")]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await batcher.submit("d", {})
+        return await asyncio.gather(running, *waiting)
+
+    assert _run(scenario()) == ["A", "B", "C"]
+    assert batcher.stats()["rejected"] == 1
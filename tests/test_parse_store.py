@@ -0,0 +1,46 @@
+"""Parse store caching: the in-memory LRU cap and files that aren't valid UTF-8."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_store
+from parse_store import load_cached, load_parsed_bytes
+
+
+@pytest.fixture(autouse=True)
+def store_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_store, "PARSE_STORE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(parse_store, "_memory_cache", type(parse_store._memory_cache)())
+    return tmp_path
+
+
+def test_memory_cache_keeps_the_most_recently_used_results(monkeypatch):
+    monkeypatch.setattr(parse_store, "MEMORY_CACHE_ENTRIES", 2)
+    first, second, third = (load_parsed_bytes(f"def f{i}():\n    pass\n".encode()) for i in range(3))
+
+    assert len(parse_store._memory_cache) == 2
+    # Evicted from memory, but still on disk
+    assert load_cached(first['blob']) == first
+    assert load_cached(first['blob']) is not first
+    # Reloading the first made the second the least recently used
+    assert len(parse_store._memory_cache) == 2
+    assert load_cached(third['blob']) is third
+    assert load_cached(second['blob']) is not second
+
+
+def test_invalid_utf8_in_strings_is_replaced():
+    result = load_parsed_bytes(b"def ok():\n    return 'caf\xe9'\n")
+
+    assert not result['error']
+    assert [symbol['name'] for symbol in result['symbols']] == ['ok']
+
+
+def test_invalid_utf8_in_code_is_a_parse_error_not_an_exception():
+    result = load_parsed_bytes(b"def caf\xe9():\n    pass\n")
+
+    assert result['error']
+    assert load_cached(result['blob']) is result
@@ -0,0 +1,70 @@
+"""Prompt packing: items are packed by value and the token budget is never exceeded."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompt_packer import PromptPacker, TokenCounter, MIN_ITEM_TOKENS
+
+
+class WordCounter(TokenCounter):
+    """One token per word, recording every text it counts."""
+
+    def __init__(self):
+        super().__init__()
+        self.counted = []
+
+    def count(self, text):
+        self.counted.append(text)
+        return len(text.split())
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max_tokens])
+
+
+class OvershootingCounter(WordCounter):
+    """Truncates to two words more than asked, like a lossy decode/re-encode round trip."""
+
+    def truncate(self, text, max_tokens):
+        return " ".join(text.split()[:max_tokens + 2])
+
+
+def _words(n, word="w"):
+    return " ".join([word] * n)
+
+
+def test_items_are_packed_by_value_and_truncated_to_fit():
+    packer = PromptPacker(40, WordCounter())
+    packer.add("S", _words(10, "low"), 1)
+    packer.add("S", _words(10, "high"), 3)
+    packer.add("S", _words(30, "mid"), 2)
+
+    sections = packer.pack()
+
+    # Header (1 + 2) and 11 for the first item leave 26, of which 25 go to the truncated one
+    assert sections == {"S": [_words(10, "high"), _words(25, "mid")]}
+    assert (packer.used, packer.truncated, packer.dropped) == (40, 1, 1)
+
+
+def test_truncated_item_that_still_does_not_fit_is_dropped():
+    packer = PromptPacker(30, OvershootingCounter())
+    packer.add("S", _words(50), 1)
+
+    assert packer.pack() == {}
+    assert (packer.used, packer.truncated, packer.dropped) == (0, 0, 1)
+    assert packer.used <= packer.budget
+
+
+def test_remaining_items_are_not_counted_once_the_budget_is_spent():
+    counter = WordCounter()
+    packer = PromptPacker(MIN_ITEM_TOKENS + 5, counter)
+    packer.add("S", _words(MIN_ITEM_TOKENS), 10)
+    for i in range(20):
+        packer.add("S", f"unseen {i}", 1)
+
+    sections = packer.pack()
+
+    assert sections == {"S": [_words(MIN_ITEM_TOKENS)]}
+    assert packer.dropped == 20
+    assert not any(text.startswith("unseen") for text in counter.counted)
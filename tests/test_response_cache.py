@@ -0,0 +1,136 @@
+"""Response cache behavior on a temporary SQLite file: hits, misses, TTL, size cap and bypass."""
+
+import os
+import sys
+
+import pytest
+
+# response_cache posts through http_client, which needs requests
+pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache" / "responses.db")
+
+
+def _request(prompt, temperature=0.0):
+    return {"model": "test", "messages": [{"role": "user", "content": prompt}], "temperature": temperature}
+
+
+def test_miss_then_hit(cache_path, clock):
+    cache = ResponseCache(cache_path, bypass=False)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"text": "answer"}
+
+    assert cache.cached("chat", _request("q"), compute) == {"text": "answer"}
+    assert cache.cached("chat", _request("q"), compute) == {"text": "answer"}
+
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+
+def test_key_covers_endpoint_and_parameters_but_not_key_order():
+    request = _request("q")
+
+    assert cache_key("chat", request) == cache_key("chat", dict(reversed(list(request.items()))))
+    assert cache_key("chat", request) != cache_key("other", request)
+    assert cache_key("chat", request) != cache_key("chat", _request("q", temperature=0.7))
+
+
+def test_entries_expire_after_the_ttl(cache_path, clock):
+    cache = ResponseCache(cache_path, ttl=60, bypass=False)
+    cache.put("key", "chat", "old")
+
+    clock.now += 59
+    assert cache.get("key") == "old"
+
+    clock.now += 2
+    assert cache.get("key") is None
+    # The next write purges expired entries
+    cache.put("other", "chat", "new")
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_cap(cache_path, clock):
+    cache = ResponseCache(cache_path, max_entries=3, bypass=False)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(key, "chat", key)
+    clock.now += 1
+    # Reading a makes b the least recently used
+    assert cache.get("a") == "a"
+
+    clock.now += 1
+    cache.put("d", "chat", "d")
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.stats()["entries"] == 3
+
+
+def test_bypass_skips_reads_but_stores_fresh_responses(cache_path, clock):
+    cache = ResponseCache(cache_path, bypass=True)
+    cache.cached("chat", _request("q"), lambda: "first")
+
+    assert cache.cached("chat", _request("q"), lambda: "second") == "second"
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+    # A call that doesn't bypass reads what the bypassing call stored
+    assert cache.cached("chat", _request("q"), lambda: "third", bypass=False) == "second"
+
+
+def test_bypass_defaults_to_the_environment(cache_path, monkeypatch):
+    monkeypatch.setenv("RESPONSE_CACHE_BYPASS", "1")
+    assert ResponseCache(cache_path).bypass
+
+    monkeypatch.setenv("RESPONSE_CACHE_BYPASS", "0")
+    assert not ResponseCache(cache_path).bypass
+
+
+def test_failed_and_empty_responses_are_not_cached(cache_path, clock):
+    cache = ResponseCache(cache_path, bypass=False)
+
+    def fail():
+        raise RuntimeError("model down")
+
+    with pytest.raises(RuntimeError):
+        cache.cached("chat", _request("q"), fail)
+    assert cache.cached("chat", _request("q"), lambda: None) is None
+
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["misses"] == 2
+
+
+def test_counters_are_shared_across_instances_and_cleared(cache_path, clock):
+    first = ResponseCache(cache_path, bypass=False)
+    first.cached("chat", _request("q"), lambda: "answer")
+    second = ResponseCache(cache_path, bypass=False)
+    second.cached("chat", _request("q"), lambda: "unused")
+
+    assert first.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+    second.clear()
+    assert first.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}